@@ -0,0 +1,182 @@
+"""
+Kantra Diff
+Incident-level delta between two Kantra outputs, e.g. consecutive rounds.
+
+Every incident is fingerprinted by (rule_id, uri, lineNumber, snippet hash),
+where the snippet is the normalized code it matched (see
+kantra_loader.incident_snippet). Incidents are matched in two hash joins:
+
+  1. exact: same fingerprint in both outputs -> unchanged
+  2. drift: same (rule_id, uri, snippet hash) with the line number moved by
+     at most line_tolerance -> unchanged (reported as moved)
+
+What is left is fixed (only in the base output) or new (only in the current
+one). Both joins are dict lookups; the drift join then bisects the group's
+sorted lines, so a diff is O(n log n) in the incident count.
+
+match_fingerprints() is the same matching over plain fingerprint tuples, for
+callers that track incidents across rounds without loading full outputs.
+"""
+
+import hashlib
+from bisect import bisect_left
+
+
+DEFAULT_LINE_TOLERANCE = 3
+
+
+class SnippetHasher:
+    """Hashes snippets to 64-bit ints, once per distinct (interned) value
+
+    A missing snippet hashes to 0.
+    """
+
+    def __init__(self):
+        self._hashes = {None: 0}
+
+    def __call__(self, snippet):
+        digest = self._hashes.get(snippet)
+        if digest is None:
+            digest = self._hashes[snippet] = int.from_bytes(hashlib.blake2b(
+                snippet.encode('utf-8'), digest_size=8).digest(), 'big')
+        return digest
+
+
+def _find(parent, index):
+    """Root of index in a union-find array, compressing the path on the way"""
+    root = index
+    while parent[root] != root:
+        root = parent[root]
+    while parent[index] != root:
+        parent[index], index = root, parent[index]
+    return root
+
+
+class _DriftGroup:
+    """Base incidents of one (rule_id, uri, snippet hash), sorted by line
+
+    Matched entries are marked consumed rather than deleted. Two union-find
+    arrays skip over them: _after[i] leads to the first unconsumed entry at
+    or after i (len(lines) if none), _before[i] to the last one before i,
+    shifted by one (0 if none). Each match costs one bisect plus amortized
+    near-constant time, so the drift join stays O(n log n).
+    """
+
+    __slots__ = ('lines', 'indexes', '_after', '_before')
+
+    def __init__(self, entries):
+        entries.sort(key=lambda entry: entry[0])
+        self.lines = [line_number for line_number, _ in entries]
+        self.indexes = [index for _, index in entries]
+        self._after = list(range(len(entries) + 1))
+        self._before = list(range(len(entries) + 1))
+
+    def take_nearest(self, line_number, tolerance):
+        """Consume the unconsumed entry closest to line_number within tolerance
+
+        Returns its base index, or None. Ties go to the lower line.
+        """
+        position = bisect_left(self.lines, line_number)
+        best = None
+        for candidate in (_find(self._before, position) - 1, _find(self._after, position)):
+            if 0 <= candidate < len(self.lines):
+                distance = abs(self.lines[candidate] - line_number)
+                if distance <= tolerance and (best is None or distance < best[0]):
+                    best = (distance, candidate)
+        if best is None:
+            return None
+        match = best[1]
+        self._after[match] = match + 1
+        self._before[match + 1] = match
+        return self.indexes[match]
+
+    def remaining(self):
+        """Base indexes of the unconsumed entries"""
+        return [index for i, index in enumerate(self.indexes) if self._after[i] == i]
+
+
+def match_fingerprints(base, current, line_tolerance=DEFAULT_LINE_TOLERANCE):
+    """Match two lists of (rule_id, uri, line_number, snippet_digest) fingerprints
+
+    Args:
+        base: Fingerprints of the earlier run
+        current: Fingerprints of the later run
+        line_tolerance: How far an incident's line may move and still match
+
+    Returns a dict of index lists: 'exact' and 'moved' ((base_index,
+    current_index) pairs matched by the exact and the drift join), 'fixed'
+    (base indexes) and 'new' (current indexes).
+    """
+    exact = {}
+    for index, key in enumerate(base):
+        exact.setdefault(key, []).append(index)
+
+    matched = []
+    unmatched = []
+    for index, key in enumerate(current):
+        candidates = exact.get(key)
+        if candidates:
+            matched.append((candidates.pop(), index))
+        else:
+            unmatched.append(index)
+
+    # base incidents left over, grouped for the drift join and sorted by line
+    drift = {}
+    fixed = []
+    for (rule_id, uri, line_number, digest), indexes in exact.items():
+        if line_number is None:
+            fixed.extend(indexes)
+            continue
+        for index in indexes:
+            drift.setdefault((rule_id, uri, digest), []).append((line_number, index))
+    drift = {key: _DriftGroup(entries) for key, entries in drift.items()}
+
+    moved = []
+    new = []
+    for index in unmatched:
+        rule_id, uri, line_number, digest = current[index]
+        group = drift.get((rule_id, uri, digest))
+        base_index = None if group is None or line_number is None else group.take_nearest(
+            line_number, line_tolerance)
+        if base_index is None:
+            new.append(index)
+        else:
+            moved.append((base_index, index))
+
+    for group in drift.values():
+        fixed.extend(group.remaining())
+
+    return {'exact': matched, 'moved': moved, 'fixed': fixed, 'new': new}
+
+
+def diff_outputs(base, current, line_tolerance=DEFAULT_LINE_TOLERANCE):
+    """Classify the incidents of two KantraOutputs
+
+    Args:
+        base: KantraOutput of the earlier run (read with messages, for snippets)
+        current: KantraOutput of the later run
+        line_tolerance: How far an incident's line may move and still match
+
+    Returns a dict with 'fixed' (base Incidents), 'new' (current Incidents),
+    'unchanged' and 'moved' ((base, current) Incident pairs; moved pairs are
+    the unchanged ones whose line number differs).
+    """
+    snippet_hash = SnippetHasher()
+
+    def fingerprints(incidents):
+        return [(incident.rule_id, incident.uri, incident.line_number,
+                 snippet_hash(incident.snippet)) for incident in incidents]
+
+    base_incidents = list(base.iter_incidents())
+    current_incidents = list(current.iter_incidents())
+    matches = match_fingerprints(fingerprints(base_incidents), fingerprints(current_incidents),
+                                 line_tolerance)
+
+    moved = [(base_incidents[b], current_incidents[c]) for b, c in matches['moved']]
+    return {
+        'fixed': [base_incidents[b] for b in matches['fixed']],
+        'new': [current_incidents[c] for c in matches['new']],
+        'unchanged': [(base_incidents[b], current_incidents[c])
+                      for b, c in matches['exact']] + moved,
+        'moved': moved,
+    }
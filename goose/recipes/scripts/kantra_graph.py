@@ -0,0 +1,260 @@
+"""
+Kantra Graph
+Rule co-occurrence over affected files, to find issues that belong together.
+
+RuleFileMatrix holds the rule x file incidence matrix with one row per rule,
+stored as a Python int bitset over file ids. The shared files of two rules
+are then one AND plus one popcount over whole machine words, and only pairs
+that share at least one file are compared: the candidates of a rule are
+found through per-file bitsets over rule ids, the transposed matrix.
+
+Rules are related by the Jaccard similarity of their file sets,
+|A & B| / |A | B|. Clusters are the connected components of the pairs at or
+above a similarity threshold (UnionFind). plan_groups() cuts the same graph
+into bounded fix groups: related pairs are merged most similar first, and a
+merge that would exceed the maximum group size is skipped.
+"""
+
+import heapq
+
+
+DEFAULT_MIN_JACCARD = 0.5
+DEFAULT_TOP_PAIRS = 20
+DEFAULT_MIN_SHARED = 1
+DEFAULT_MAX_GROUP_RULES = 8
+
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+
+def _bitset(ids, size):
+    """Build an int with the given bit positions set"""
+    buffer = bytearray((size + 7) // 8)
+    for i in ids:
+        buffer[i >> 3] |= 1 << (i & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def _bit_positions(bits):
+    """Yield the set bit positions of bits, lowest first"""
+    digits = bin(bits)[:1:-1]  # binary digits, lowest bit first
+    position = digits.find('1')
+    while position >= 0:
+        yield position
+        position = digits.find('1', position + 1)
+
+
+class RuleFileMatrix:
+    """Rule x file incidence matrix as int bitsets
+
+    rule_ids and descriptions are in first-seen order; rows[i] has bit f set
+    when rule i affects files[f]. Rules that share a rule_id are merged.
+    """
+
+    def __init__(self, rule_files):
+        self.rule_ids = []
+        self.descriptions = []
+        self.files = []
+        file_ids = {}
+        rule_positions = {}
+        rule_file_ids = []
+
+        for rule_id, description, files in rule_files:
+            if not files:
+                continue
+            position = rule_positions.get(rule_id)
+            if position is None:
+                position = rule_positions[rule_id] = len(self.rule_ids)
+                self.rule_ids.append(rule_id)
+                self.descriptions.append(description)
+                rule_file_ids.append(set())
+            ids = rule_file_ids[position]
+            for path in files:
+                file_id = file_ids.get(path)
+                if file_id is None:
+                    file_id = file_ids[path] = len(self.files)
+                    self.files.append(path)
+                ids.add(file_id)
+
+        self.rows = [_bitset(ids, len(self.files)) for ids in rule_file_ids]
+        self.sizes = [len(ids) for ids in rule_file_ids]
+        self._rule_file_ids = rule_file_ids
+
+    def __len__(self):
+        return len(self.rule_ids)
+
+    def _columns(self):
+        """Per file, the bitset of rules affecting it (the transposed matrix)"""
+        columns = [[] for _ in self.files]
+        for position, ids in enumerate(self._rule_file_ids):
+            for file_id in ids:
+                columns[file_id].append(position)
+        return [_bitset(rules, len(self.rule_ids)) for rules in columns]
+
+    def _related(self):
+        """Yield (a, [b, ...]) with the rules b > a that share a file with rule a"""
+        columns = self._columns()
+        for a, ids in enumerate(self._rule_file_ids):
+            candidates = 0
+            for file_id in ids:
+                candidates |= columns[file_id]
+            yield a, [a + 1 + offset for offset in _bit_positions(candidates >> (a + 1))]
+
+    def cooccurrences(self):
+        """Yield (a, b, shared_files) for every pair of rules a < b sharing a file"""
+        rows = self.rows
+        for a, candidates in self._related():
+            row = rows[a]
+            for b in candidates:
+                yield a, b, _popcount(row & rows[b])
+
+    def jaccard_pairs(self, min_jaccard=0.0):
+        """Yield (jaccard, shared_files, a, b) for rule pairs with jaccard >= min_jaccard
+
+        The Jaccard similarity of two sets is at most the ratio of their
+        sizes, so pairs of very different sizes are dropped without
+        intersecting their rows.
+        """
+        rows, sizes = self.rows, self.sizes
+        for a, candidates in self._related():
+            row, size_a = rows[a], sizes[a]
+            for b in candidates:
+                size_b = sizes[b]
+                if min(size_a, size_b) < min_jaccard * max(size_a, size_b):
+                    continue
+                shared = _popcount(row & rows[b])
+                jaccard = shared / (size_a + size_b - shared)
+                if jaccard >= min_jaccard:
+                    yield jaccard, shared, a, b
+
+
+class UnionFind:
+    """Disjoint sets over 0..n-1 with union by size and path halving"""
+
+    def __init__(self, n):
+        self.parent = list(range(n))
+        self.size = [1] * n
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        """Merge the sets of a and b; returns the new root (or the shared one)"""
+        a, b = self.find(a), self.find(b)
+        if a == b:
+            return a
+        if self.size[a] < self.size[b]:
+            a, b = b, a
+        self.parent[b] = a
+        self.size[a] += self.size[b]
+        return a
+
+    def groups(self, min_size=2):
+        """Return the sets with at least min_size members, each sorted, in order of first member"""
+        members = {}
+        for item in range(len(self.parent)):
+            members.setdefault(self.find(item), []).append(item)
+        return [group for group in members.values() if len(group) >= min_size]
+
+
+def rule_graph(rule_files, min_jaccard=DEFAULT_MIN_JACCARD, top=DEFAULT_TOP_PAIRS):
+    """Build the co-occurrence result from (rule_id, description, files) tuples
+
+    Args:
+        rule_files: Iterable of (rule_id, description, files)
+        min_jaccard: Similarity at or above which two rules are related
+        top: Number of related pairs to list (most similar first)
+
+    Returns a dict with the top related 'pairs' and the 'clusters' of
+    related rules (most rules, then most files first), plus matrix dimensions.
+    """
+    matrix = RuleFileMatrix(rule_files)
+    union_find = UnionFind(len(matrix))
+    related = []
+    for pair in matrix.jaccard_pairs(min_jaccard):
+        union_find.union(pair[2], pair[3])
+        related.append(pair)
+
+    # most similar first, then most shared files, then Kantra order
+    best = heapq.nsmallest(top, related, key=lambda p: (-p[0], -p[1], p[2], p[3]))
+
+    clusters = []
+    for group in union_find.groups():
+        files = 0
+        for position in group:
+            files |= matrix.rows[position]
+        clusters.append({
+            'rules': [matrix.rule_ids[position] for position in group],
+            'file_count': _popcount(files),
+        })
+    clusters.sort(key=lambda cluster: (-len(cluster['rules']), -cluster['file_count']))
+
+    return {
+        'total_rules': len(matrix),
+        'total_files': len(matrix.files),
+        'min_jaccard': min_jaccard,
+        'related_pairs': len(related),
+        'pairs': [{
+            'rules': [matrix.rule_ids[a], matrix.rule_ids[b]],
+            'jaccard': round(jaccard, 3),
+            'shared_files': shared,
+            'file_counts': [matrix.sizes[a], matrix.sizes[b]],
+        } for jaccard, shared, a, b in best],
+        'clusters': clusters,
+    }
+
+
+def plan_groups(rule_files, min_jaccard=DEFAULT_MIN_JACCARD, min_shared=DEFAULT_MIN_SHARED,
+                max_rules=DEFAULT_MAX_GROUP_RULES):
+    """Partition rules into candidate fix groups of rules that affect the same files
+
+    Args:
+        rule_files: Iterable of (rule_id, description, files)
+        min_jaccard: Minimum Jaccard similarity for two rules to be grouped
+        min_shared: Minimum number of files two rules must share to be grouped
+        max_rules: Maximum number of rules in one group
+
+    Related pairs are merged with union-find, most similar first (Kruskal
+    order), skipping merges that would exceed max_rules; rules that join no
+    group stay on their own. Every rule with affected files is in exactly
+    one group; a file can belong to several groups.
+
+    Returns a list of groups, most files first, each a dict with 'rules'
+    ([(rule_id, description, file_count)], most files first), 'files'
+    (sorted paths) and 'shared_files' (files hit by two or more of its rules).
+    """
+    matrix = RuleFileMatrix(rule_files)
+    pairs = [pair for pair in matrix.jaccard_pairs(min_jaccard) if pair[1] >= min_shared]
+    pairs.sort(key=lambda p: (-p[0], -p[1], p[2], p[3]))
+
+    union_find = UnionFind(len(matrix))
+    for _, _, a, b in pairs:
+        root_a, root_b = union_find.find(a), union_find.find(b)
+        if root_a != root_b and union_find.size[root_a] + union_find.size[root_b] <= max_rules:
+            union_find.union(root_a, root_b)
+
+    groups = []
+    for members in union_find.groups(min_size=1):
+        once = twice = 0
+        for position in members:
+            row = matrix.rows[position]
+            twice |= once & row
+            once |= row
+        members.sort(key=lambda position: (-matrix.sizes[position], position))
+        groups.append({
+            'rules': [(matrix.rule_ids[position], matrix.descriptions[position],
+                       matrix.sizes[position]) for position in members],
+            'files': sorted(matrix.files[file_id] for file_id in _bit_positions(once)),
+            'shared_files': _popcount(twice),
+        })
+
+    groups.sort(key=lambda group: -len(group['files']))
+    return groups
@@ -0,0 +1,443 @@
+"""
+Kantra Index
+Query indexes over parsed Kantra output.
+
+SQLite index: build_sqlite_index() stores an output.yaml as rulesets, rules,
+incidents, labels and links tables. Incidents are indexed by uri, rule, category
+and lineNumber, plus a reversed-path column so that "path ends with X" file
+lookups are a B-tree range scan instead of a pass over every violation.
+
+File index: FileIndex maps each affected path to the rules and incidents
+that touch it, and resolves a target file through a trie of reversed path
+components, so "viewLayout.tsx" or "components/viewLayout/viewLayout.tsx" is
+found without scanning every incident, and ambiguous names report every match.
+Paths that are one project file under different prefixes share a project key
+(kantra_compact.project_paths), so such aliases are not ambiguous.
+Per file, it also keeps the incidents sorted by line number, so the incidents
+within a line range are found by bisection.
+"""
+
+import os
+from bisect import bisect_left, bisect_right
+
+from kantra_compact import project_paths
+
+
+SQLITE_SUFFIX = '.sqlite'
+SQLITE_SCHEMA_VERSION = 1
+
+SQLITE_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE rulesets (
+    id INTEGER PRIMARY KEY,
+    name TEXT,
+    description TEXT
+);
+CREATE TABLE rules (
+    id INTEGER PRIMARY KEY,
+    ruleset_id INTEGER NOT NULL REFERENCES rulesets(id),
+    rule_id TEXT NOT NULL,
+    description TEXT,
+    category TEXT,
+    effort INTEGER
+);
+CREATE TABLE messages (
+    id INTEGER PRIMARY KEY,
+    text TEXT NOT NULL
+);
+CREATE TABLE incidents (
+    id INTEGER PRIMARY KEY,
+    rule_id INTEGER NOT NULL REFERENCES rules(id),
+    uri TEXT,
+    path TEXT,
+    path_rev TEXT,
+    line_number INTEGER,
+    category TEXT,
+    message_id INTEGER REFERENCES messages(id)
+);
+CREATE TABLE labels (
+    rule_id INTEGER NOT NULL REFERENCES rules(id),
+    label TEXT NOT NULL
+);
+CREATE TABLE links (
+    rule_id INTEGER NOT NULL REFERENCES rules(id),
+    url TEXT,
+    title TEXT
+);
+CREATE INDEX idx_rules_rule_id ON rules(rule_id);
+CREATE INDEX idx_incidents_uri ON incidents(uri);
+CREATE INDEX idx_incidents_path_rev ON incidents(path_rev);
+CREATE INDEX idx_incidents_rule_id ON incidents(rule_id);
+CREATE INDEX idx_incidents_category ON incidents(category);
+CREATE INDEX idx_incidents_line_number ON incidents(line_number);
+CREATE INDEX idx_labels_label ON labels(label);
+"""
+
+
+class KantraIndexError(Exception):
+    """Raised when a SQLite index is missing or was built by another version"""
+
+
+def sqlite_index_path(output_file):
+    """Return the default SQLite index path for an output.yaml"""
+    return f"{output_file}{SQLITE_SUFFIX}"
+
+
+def _uri_path(uri):
+    if isinstance(uri, str) and uri.startswith('file://'):
+        return uri[7:] or None
+    return None
+
+
+def _prefix_upper_bound(prefix):
+    """Smallest string greater than every string starting with prefix"""
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _path_components(path):
+    """Split a path (or target file) into its components, dropping './' and '/' prefixes"""
+    while path.startswith('./') or path.startswith('/'):
+        path = path[1:] if path.startswith('/') else path[2:]
+    return path.split('/')
+
+
+class FileIndex:
+    """Inverted path index over a KantraOutput
+
+    files maps path -> {rule position: [incident positions]}, with rules
+    kept in Kantra order. The trie is keyed by reversed path components;
+    every node keeps the paths below it, so a suffix lookup costs one step
+    per component of the target. Line indexes are built per path on the
+    first range query.
+    """
+
+    def __init__(self, output):
+        self.output = output
+        self.files = {}
+        self._trie = ({}, [])  # (children, paths ending below this node)
+        self._lines = {}  # path -> (sorted line numbers, [(rule position, incident position)])
+        self._project_keys = None
+
+        for position, rule in enumerate(output.rules):
+            for incident_position, incident in enumerate(rule.incidents):
+                path = incident.file_path
+                if path:
+                    rules = self.files.get(path)
+                    if rules is None:
+                        rules = self.files[path] = {}
+                        self._insert(path)
+                    rules.setdefault(position, []).append(incident_position)
+
+    def _insert(self, path):
+        node = self._trie
+        for component in reversed(_path_components(path)):
+            node = node[0].setdefault(component, ({}, []))
+            node[1].append(path)
+
+    def lookup(self, target_file):
+        """Return the sorted paths that target_file refers to
+
+        Matches whole trailing path components first ("viewLayout.tsx" matches
+        ".../viewLayout/viewLayout.tsx" but not ".../myviewLayout.tsx"). If
+        nothing matches on component boundaries, falls back to a plain
+        "path ends with target" check over the distinct paths.
+        """
+        components = _path_components(target_file or '')
+        if components == ['']:
+            return []
+
+        node = self._trie
+        for component in reversed(components):
+            node = node[0].get(component)
+            if node is None:
+                break
+        else:
+            return sorted(node[1])
+
+        suffix = '/'.join(components)
+        return sorted(path for path in self.files if path.endswith(suffix))
+
+    @property
+    def project_keys(self):
+        """{path: project-relative key} for every path (see kantra_compact.project_paths)"""
+        if self._project_keys is None:
+            self._project_keys = project_paths(self.files)[1]
+        return self._project_keys
+
+    def _line_index(self, path):
+        index = self._lines.get(path)
+        if index is None:
+            entries = sorted(
+                (self.output.rules[position].incidents[i].line_number, position, i)
+                for position, incident_positions in self.files.get(path, {}).items()
+                for i in incident_positions
+                if self.output.rules[position].incidents[i].line_number is not None
+            )
+            index = self._lines[path] = ([entry[0] for entry in entries],
+                                         [entry[1:] for entry in entries])
+        return index
+
+    def range_incidents(self, paths, start, end):
+        """Yield (Rule, Incident) for incidents on lines start..end (inclusive) of paths
+
+        Ordered by path, then line number, then Kantra rule order. Incidents
+        without a line number are not part of any range.
+        """
+        for path in sorted(paths):
+            lines, entries = self._line_index(path)
+            for position, i in entries[bisect_left(lines, start):bisect_right(lines, end)]:
+                rule = self.output.rules[position]
+                yield rule, rule.incidents[i]
+
+    def rule_incidents(self, paths, rule_positions=None):
+        """Yield (Rule, [Incident]) for the given paths, in Kantra order
+
+        rule_positions, if given, limits the result to rules at those
+        positions of output.rules (e.g. from kantra_labels.LabelIndex).
+        """
+        positions = {}
+        for path in paths:
+            for position, incident_positions in self.files.get(path, {}).items():
+                if rule_positions is None or position in rule_positions:
+                    positions.setdefault(position, []).extend(incident_positions)
+
+        for position in sorted(positions):
+            rule = self.output.rules[position]
+            yield rule, [rule.incidents[i] for i in sorted(positions[position])]
+
+
+def _insert_output(conn, data):
+    """Insert a loaded output.yaml (list of rulesets) into an empty database"""
+    message_ids = {}
+
+    for ruleset in data:
+        if not isinstance(ruleset, dict):
+            continue
+
+        cursor = conn.execute(
+            'INSERT INTO rulesets (name, description) VALUES (?, ?)',
+            (ruleset.get('name', 'Unknown'), ruleset.get('description'))
+        )
+        ruleset_pk = cursor.lastrowid
+
+        violations = ruleset.get('violations')
+        if not isinstance(violations, dict):
+            continue
+
+        for rule_id, violation in violations.items():
+            if not isinstance(violation, dict):
+                continue
+
+            category = violation.get('category')
+            effort = violation.get('effort')
+            cursor = conn.execute(
+                'INSERT INTO rules (ruleset_id, rule_id, description, category, effort) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (ruleset_pk, rule_id, violation.get('description', 'No description'),
+                 category, effort if isinstance(effort, int) else None)
+            )
+            rule_pk = cursor.lastrowid
+
+            labels = violation.get('labels') or []
+            conn.executemany(
+                'INSERT INTO labels (rule_id, label) VALUES (?, ?)',
+                [(rule_pk, label) for label in labels if isinstance(label, str)]
+            )
+
+            links = violation.get('links') or []
+            conn.executemany(
+                'INSERT INTO links (rule_id, url, title) VALUES (?, ?, ?)',
+                [(rule_pk, link.get('url'), link.get('title'))
+                 for link in links if isinstance(link, dict)]
+            )
+
+            incidents = violation.get('incidents', [])
+            if not isinstance(incidents, list):
+                continue
+
+            rows = []
+            for incident in incidents:
+                if not isinstance(incident, dict):
+                    continue
+
+                uri = incident.get('uri')
+                path = _uri_path(uri)
+                message = incident.get('message')
+                message_id = None
+                if isinstance(message, str) and message:
+                    message_id = message_ids.get(message)
+                    if message_id is None:
+                        message_id = conn.execute(
+                            'INSERT INTO messages (text) VALUES (?)', (message,)
+                        ).lastrowid
+                        message_ids[message] = message_id
+
+                line_number = incident.get('lineNumber')
+                rows.append((
+                    rule_pk, uri if isinstance(uri, str) else None, path,
+                    path[::-1] if path else None,
+                    line_number if isinstance(line_number, int) else None,
+                    category, message_id
+                ))
+
+            conn.executemany(
+                'INSERT INTO incidents (rule_id, uri, path, path_rev, line_number, category, message_id) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                rows
+            )
+
+
+def build_sqlite_index(data, db_path, source_file):
+    """Write a SQLite index for loaded Kantra output
+
+    Args:
+        data: Parsed output.yaml (list of rulesets) from load_kantra_output()
+        db_path: Database file to create (replaced atomically if it exists)
+        source_file: The output.yaml the data came from, recorded for staleness checks
+
+    Returns a dict with row counts per table.
+    """
+    import sqlite3
+    import tempfile
+
+    stat = os.stat(source_file)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(db_path) + '.',
+                                    dir=os.path.dirname(os.path.abspath(db_path)))
+    os.close(fd)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.executescript(SQLITE_SCHEMA)
+            with conn:
+                conn.executemany('INSERT INTO meta (key, value) VALUES (?, ?)', [
+                    ('schema_version', str(SQLITE_SCHEMA_VERSION)),
+                    ('source', os.path.abspath(source_file)),
+                    ('source_size', str(stat.st_size)),
+                    ('source_mtime_ns', str(stat.st_mtime_ns)),
+                ])
+                _insert_output(conn, data)
+            conn.execute('ANALYZE')
+            counts = {
+                table: conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+                for table in ('rulesets', 'rules', 'incidents', 'labels', 'links')
+            }
+        finally:
+            conn.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return counts
+
+
+def open_sqlite_index(db_path):
+    """Open a SQLite index read-only
+
+    Returns (connection, stale) where stale is True if the source output.yaml
+    changed (or disappeared) since the index was built.
+    Raises KantraIndexError if the database is missing or has another schema version.
+    """
+    import sqlite3
+
+    if not os.path.exists(db_path):
+        raise KantraIndexError(f"Index not found: {db_path}")
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        meta = dict(conn.execute('SELECT key, value FROM meta'))
+    except sqlite3.DatabaseError as e:
+        conn.close()
+        raise KantraIndexError(f"Not a Kantra index: {db_path} ({e})")
+
+    if meta.get('schema_version') != str(SQLITE_SCHEMA_VERSION):
+        conn.close()
+        raise KantraIndexError(f"Index {db_path} was built by another version of this script")
+
+    try:
+        stat = os.stat(meta['source'])
+        stale = (str(stat.st_size) != meta['source_size']
+                 or str(stat.st_mtime_ns) != meta['source_mtime_ns'])
+    except OSError:
+        stale = True
+
+    return conn, stale
+
+
+def query_rule_files(conn):
+    """Yield (rule_id, description, files) for every rule, in Kantra order"""
+    rules = conn.execute('SELECT id, rule_id, description FROM rules ORDER BY id').fetchall()
+    files = {}
+    for rule_pk, path in conn.execute(
+            'SELECT DISTINCT rule_id, path FROM incidents WHERE path IS NOT NULL'):
+        files.setdefault(rule_pk, set()).add(path)
+
+    for rule_pk, rule_id, description in rules:
+        yield rule_id, description, files.get(rule_pk, set())
+
+
+def query_file_paths(conn, target_file):
+    """Return the sorted paths target_file refers to, using the reversed-path index
+
+    Same matching rules as FileIndex.lookup(): target_file is normalised
+    the same way, then whole trailing components match first, plain
+    "ends with" as a fallback.
+    """
+    components = _path_components(target_file or '')
+    prefix = '/'.join(components)[::-1]
+    if not prefix:
+        return []
+
+    candidates = [path for (path,) in conn.execute(
+        'SELECT DISTINCT path FROM incidents WHERE path_rev >= ? AND path_rev < ?',
+        (prefix, _prefix_upper_bound(prefix))
+    )]
+
+    matches = [
+        path for path in candidates
+        if _path_components(path)[-len(components):] == components
+    ]
+    return sorted(matches or candidates)
+
+
+def query_project_keys(conn):
+    """Return {path: project-relative key} for every path in the index (see FileIndex)"""
+    return project_paths(
+        path for (path,) in conn.execute('SELECT DISTINCT path FROM incidents WHERE path IS NOT NULL')
+    )[1]
+
+
+def query_file_rule_messages(conn, paths):
+    """Yield (rule_id, description, messages) for rules with incidents in paths"""
+    if not paths:
+        return
+
+    placeholders = ', '.join('?' for _ in paths)
+    rows = conn.execute(
+        'SELECT r.id, r.rule_id, r.description, m.text '
+        'FROM incidents i '
+        'JOIN rules r ON r.id = i.rule_id '
+        'LEFT JOIN messages m ON m.id = i.message_id '
+        f'WHERE i.path_rev IN ({placeholders}) '
+        'ORDER BY r.id',
+        [path[::-1] for path in paths]
+    )
+
+    current = None
+    for rule_pk, rule_id, description, message in rows:
+        if current is None or current[0] != rule_pk:
+            if current is not None:
+                yield current[1:]
+            current = (rule_pk, rule_id, description, set())
+        if message:
+            current[3].add(message)
+
+    if current is not None:
+        yield current[1:]
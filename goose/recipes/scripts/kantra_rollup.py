@@ -0,0 +1,176 @@
+"""
+Kantra Rollup
+Incident, file and effort totals of a Kantra output by category, label and directory.
+
+compute_rollup() aggregates every dimension in one pass over the incidents:
+each rule resolves its category and label cells once, each distinct path its
+directory prefix cells once, and every incident then only adds to those
+cells. Effort is the rule's effort counted once per incident.
+
+The result is cached as plain JSON next to the output (output.yaml.rollup.json)
+together with the output's fingerprint, so dashboards and report tooling can
+read it without Python or re-parsing; load_rollup() recomputes it when the
+output changes.
+"""
+
+import json
+import os
+
+from kantra_compact import project_paths
+from kantra_loader import fingerprint_matches, output_fingerprint
+
+
+ROLLUP_SUFFIX = '.rollup.json'
+ROLLUP_VERSION = 3
+ROLLUP_DIMENSIONS = ('category', 'label', 'directory')
+NO_CATEGORY = '(none)'
+
+
+def rollup_path(output_file):
+    """Return the rollup cache path for an output.yaml"""
+    return f"{output_file}{ROLLUP_SUFFIX}"
+
+
+class _Cell:
+    __slots__ = ('incidents', 'effort', 'files')
+
+    def __init__(self):
+        self.incidents = 0
+        self.effort = 0
+        self.files = set()
+
+    def as_dict(self):
+        return {'incidents': self.incidents, 'files': len(self.files), 'effort': self.effort}
+
+
+def _directory_prefixes(relative_path):
+    """Return 'a', 'a/b', ... for the directories of a relative file path"""
+    parts = relative_path.split('/')[:-1]
+    return ['/'.join(parts[:depth]) for depth in range(1, len(parts) + 1)]
+
+
+def compute_rollup(output):
+    """Aggregate a KantraOutput by category, label and directory prefix
+
+    Files and directories are keyed by their path below their prefix root
+    (see kantra_compact.project_paths), so a file Kantra reports under two
+    prefixes counts once, and directories are listed at every depth.
+    Incidents without a file count towards totals, category and label, but
+    not towards any directory.
+
+    Returns a dict with 'roots', 'totals' and one {key: {'incidents',
+    'files', 'effort'}} mapping per dimension, largest first.
+    """
+    paths = {incident.file_path for incident in output.iter_incidents()}
+    paths.discard(None)
+    roots, keys = project_paths(paths)
+
+    totals = _Cell()
+    cells = {dimension: {} for dimension in ROLLUP_DIMENSIONS}
+    directory_cells = {}  # path -> (key, cells of its directory prefixes)
+
+    def cell(dimension, key):
+        found = cells[dimension].get(key)
+        if found is None:
+            found = cells[dimension][key] = _Cell()
+        return found
+
+    for rule in output.rules:
+        effort = rule.effort or 0
+        rule_cells = [totals, cell('category', rule.category or NO_CATEGORY)]
+        rule_cells.extend(cell('label', label) for label in dict.fromkeys(rule.labels))
+
+        for incident in rule.incidents:
+            path = incident.file_path
+            key = None
+            incident_cells = rule_cells
+            if path is not None:
+                found = directory_cells.get(path)
+                if found is None:
+                    found = directory_cells[path] = (keys[path], [
+                        cell('directory', prefix) for prefix in _directory_prefixes(keys[path])
+                    ])
+                key, path_cells = found
+                incident_cells = rule_cells + path_cells
+
+            for target in incident_cells:
+                target.incidents += 1
+                target.effort += effort
+                if key is not None:
+                    target.files.add(key)
+
+    result = {'roots': [root for root in roots if root], 'totals': totals.as_dict()}
+    for dimension in ROLLUP_DIMENSIONS:
+        ordered = sorted(cells[dimension].items(),
+                         key=lambda item: (-item[1].incidents, item[0]))
+        result[dimension] = {key: value.as_dict() for key, value in ordered}
+    return result
+
+
+def read_rollup(output_file):
+    """Return (rollup, fingerprint) for output_file's rollup cache
+
+    rollup is None if the cache is missing or stale. fingerprint is
+    output_file's current fingerprint (see kantra_loader.output_fingerprint).
+    """
+    try:
+        with open(rollup_path(output_file), 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+    except (OSError, ValueError):
+        cached = None
+
+    source = None
+    if isinstance(cached, dict) and cached.get('version') == ROLLUP_VERSION:
+        source = cached.get('source')
+        source = tuple(source) if isinstance(source, list) else None
+
+    fingerprint = output_fingerprint(output_file, source)
+    if not fingerprint_matches(source, fingerprint):
+        return None, fingerprint
+    return cached, fingerprint
+
+
+def write_rollup(output_file, fingerprint, rollup):
+    """Atomically write the rollup cache; returns False if it could not be written"""
+    import tempfile
+
+    target = rollup_path(output_file)
+    document = {'version': ROLLUP_VERSION, 'source': list(fingerprint), **rollup}
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(target) + '.',
+                                        dir=os.path.dirname(os.path.abspath(target)))
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(document, f, separators=(',', ':'))
+        os.replace(tmp_path, target)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_rollup(output_file, read_output, use_cache=True):
+    """Return (rollup, cache_status) for an output.yaml
+
+    read_output(output_file) supplies the KantraOutput when the rollup has to
+    be computed. cache_status is 'hit', 'written', 'unwritable' or 'disabled'.
+    """
+    if not use_cache:
+        return compute_rollup(read_output(output_file)), 'disabled'
+
+    cached, fingerprint = read_rollup(output_file)
+    if cached is not None:
+        rollup = {key: cached[key] for key in ('roots', 'totals') + ROLLUP_DIMENSIONS}
+        if tuple(cached['source']) != fingerprint:
+            write_rollup(output_file, fingerprint, rollup)
+        return rollup, 'hit'
+
+    rollup = compute_rollup(read_output(output_file))
+    written = write_rollup(output_file, fingerprint, rollup)
+    return rollup, 'written' if written else 'unwritable'
@@ -0,0 +1,259 @@
+"""
+Kantra Compact
+Token-budgeted encoding of kantra_output_helper.py results.
+
+Agent-facing results repeat the same long absolute path prefix, rule IDs and
+boilerplate messages many times. The compact encoding factors common path
+roots out of every file, moves rules, files and messages into dictionary tables
+at the top of the document, refers to them by short ids ('r0', 'f0', 'm0') in
+the body, and is written without indentation.
+
+Kantra may report one project under several absolute prefixes (the machine the
+analysis ran on and the container it ran in, say), whose only common root is
+'/'. Paths are therefore grouped by their leading component and each group
+gets its own root; a file is stored as [root index, path below that root].
+
+fit_to_budget() cuts a result down to a byte budget by keeping a prefix of
+its records (files for analyze, issues for file) and setting has_more.
+"""
+
+import json
+
+
+COMPACT_ENCODING = 'kantra-compact/2'
+
+
+def path_root(paths):
+    """Return the longest common directory prefix of paths, ending in '/' ('' if none)"""
+    paths = list(paths)
+    if not paths:
+        return ''
+
+    # the common prefix of the smallest and largest path is common to all
+    first, last = min(paths), max(paths)
+    length = 0
+    for a, b in zip(first, last):
+        if a != b:
+            break
+        length += 1
+
+    return first[:first.rfind('/', 0, length) + 1]
+
+
+def _leading_component(path):
+    """Return the first component of a path with its slashes ('/opt/', 'src/', '')"""
+    end = path.find('/', 1 if path.startswith('/') else 0)
+    return path[:end + 1] if end >= 0 else ''
+
+
+def path_roots(paths):
+    """Return the path_root() of each group of paths sharing a leading component, sorted"""
+    groups = {}
+    for path in paths:
+        groups.setdefault(_leading_component(path), []).append(path)
+    return sorted({path_root(group) for group in groups.values()})
+
+
+def split_root(path, roots):
+    """Return (index, rest) of path below the longest of roots it starts with
+
+    index is -1 and rest the whole path when no root matches.
+    """
+    best = -1
+    for index, root in enumerate(roots):
+        if path.startswith(root) and (best < 0 or len(root) > len(roots[best])):
+            best = index
+    return best, path[len(roots[best]):] if best >= 0 else path
+
+
+def project_paths(paths):
+    """Return (roots, {path: path below its root}) for paths (see path_roots)
+
+    The aliases of one file under different prefixes map to the same
+    project-relative key, as long as each prefix group has the same depth
+    below its project root.
+    """
+    paths = set(paths)
+    roots = path_roots(paths)
+    return roots, {path: split_root(path, roots)[1] for path in paths}
+
+
+class CompactTables:
+    """Assigns short ids to the rules, files and messages of a result"""
+
+    def __init__(self, roots=()):
+        self.roots = list(roots)
+        self.rules = {}     # (rule_id, description) -> 'r<n>'
+        self.files = {}     # path -> 'f<n>'
+        self.messages = {}  # text -> 'm<n>'
+
+    @staticmethod
+    def _id(table, key, prefix):
+        short_id = table.get(key)
+        if short_id is None:
+            short_id = table[key] = f"{prefix}{len(table)}"
+        return short_id
+
+    def rule(self, rule_id, description):
+        return self._id(self.rules, (rule_id, description), 'r')
+
+    def file(self, path):
+        return self._id(self.files, path, 'f')
+
+    def message(self, text):
+        return self._id(self.messages, text, 'm')
+
+    def header(self):
+        """Return the dictionary header: encoding, roots and the id tables"""
+        header = {'encoding': COMPACT_ENCODING, 'roots': self.roots}
+        header['rules'] = {
+            short_id: {'rule_id': rule_id, 'description': description}
+            for (rule_id, description), short_id in self.rules.items()
+        }
+        header['files'] = {
+            short_id: list(split_root(path, self.roots)) for path, short_id in self.files.items()
+        }
+        if self.messages:
+            header['messages'] = {short_id: text for text, short_id in self.messages.items()}
+        return header
+
+
+def analysis_roots(result):
+    """Path roots of the files of an analyze result"""
+    return path_roots(path for issue in result['issues'] for path in issue['files'])
+
+
+def compact_analysis(result, roots=None):
+    """Encode an analyze result (see summarize_issues) compactly
+
+    roots defaults to analysis_roots(result); pass the roots of the
+    untruncated result so every truncation of it shares them.
+    """
+    tables = CompactTables(analysis_roots(result) if roots is None else roots)
+
+    issues = []
+    for issue in result['issues']:
+        compact_issue = {
+            'rule': tables.rule(issue['rule_id'], issue['description']),
+            'file_count': issue['file_count'],
+        }
+        if 'files_offset' in issue:
+            compact_issue['files_offset'] = issue['files_offset']
+        compact_issue['files'] = [tables.file(path) for path in issue['files']]
+        issues.append(compact_issue)
+
+    document = tables.header()
+    document.update((key, value) for key, value in result.items() if key != 'issues')
+    document['issues'] = issues
+    return document
+
+
+def _compact_file_result(result, tables):
+    compact = {}
+    for key, value in result.items():
+        if key == 'matched_files':
+            compact[key] = [tables.file(path) for path in value]
+        elif key == 'issues':
+            compact[key] = [{
+                'rule': tables.rule(issue['rule_id'], issue['description']),
+                'messages': [tables.message(text) for text in issue['messages']]
+            } for issue in value]
+        else:
+            compact[key] = value
+    return compact
+
+
+def file_results_roots(results):
+    """Path roots of the matched files of file results"""
+    return path_roots(
+        path for result in results.values() for path in result.get('matched_files', ())
+    )
+
+
+def compact_file_results(results, roots=None):
+    """Encode file results ({target: result}, see summarize_file_issues) compactly
+
+    A single target's result fields follow the header directly, like the
+    plain output; several targets are keyed under 'results'. roots defaults
+    to file_results_roots(results).
+    """
+    tables = CompactTables(file_results_roots(results) if roots is None else roots)
+    compact = {target: _compact_file_result(result, tables) for target, result in results.items()}
+
+    document = tables.header()
+    if len(compact) == 1:
+        document.update(next(iter(compact.values())))
+    else:
+        document['results'] = compact
+    return document
+
+
+def analysis_units(result):
+    """Number of records fit_to_budget() can cut an analyze result into (its files)"""
+    return sum(len(issue['files']) for issue in result['issues'])
+
+
+def truncate_analysis(result, units):
+    """Keep the first units files of an analyze result, in order"""
+    issues = []
+    for issue in result['issues']:
+        if units <= 0:
+            break
+        kept = dict(issue, files=issue['files'][:units])
+        units -= len(kept['files'])
+        issues.append(kept)
+
+    truncated = dict(result, issues=issues)
+    truncated['has_more'] = (result.get('has_more', False)
+                             or analysis_units(truncated) < analysis_units(result))
+    return truncated
+
+
+def file_units(results):
+    """Number of records fit_to_budget() can cut file results into (their issues)"""
+    return sum(len(result.get('issues', ())) for result in results.values())
+
+
+def truncate_file_results(results, units):
+    """Keep the first units issues across file results, in target order"""
+    truncated = {}
+    for target, result in results.items():
+        if 'issues' not in result:
+            truncated[target] = result
+            continue
+        issues = result['issues'][:max(units, 0)]
+        units -= len(issues)
+        if len(issues) < len(result['issues']):
+            result = dict(result, issues=issues, returned=len(issues), has_more=True)
+        truncated[target] = result
+    return truncated
+
+
+def fit_to_budget(render, total_units, max_bytes):
+    """Return the longest rendering that fits in max_bytes
+
+    render(units) must return the text for the first units records, growing
+    with units. Binary-searches the largest units whose UTF-8 size is within
+    max_bytes; if not even zero records fit, the zero-record text is returned.
+    """
+    text = render(total_units)
+    if len(text.encode('utf-8')) <= max_bytes:
+        return text
+
+    low, high = 0, total_units - 1
+    best = render(0)
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = render(middle)
+        if len(candidate.encode('utf-8')) <= max_bytes:
+            best, low = candidate, middle + 1
+        else:
+            high = middle - 1
+    return best
+
+
+def dumps(document, compact=False):
+    """Serialize a result: indented JSON, or without whitespace when compact"""
+    if compact:
+        return json.dumps(document, separators=(',', ':'))
+    return json.dumps(document, indent=2)
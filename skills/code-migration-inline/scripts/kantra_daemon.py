@@ -0,0 +1,292 @@
+"""
+Kantra Daemon
+Resident query server for the Kantra helper scripts.
+
+'kantra_output_helper.py serve' keeps parsed output.yaml files in memory and
+answers queries over a Unix domain socket, so repeated analyze/file/persistent
+queries from the main agent and its subagents skip interpreter startup and
+parsing. The helper scripts use the daemon automatically when it is running
+and parse directly otherwise.
+
+Protocol: the client connects, sends one JSON object followed by a newline,
+and reads one JSON object until the server closes the connection.
+
+  request:  {"command": "<name>", "cwd": "<client cwd>", ...command arguments}
+  response: {"exit_code": 0, "stdout": "...", "stderr": "..."}
+
+stdout/stderr hold exactly what the direct command would have printed.
+Built-in commands: 'ping' and 'shutdown'.
+
+The default socket lives in a per-user directory with mode 0700 and is
+created with a 0077 umask, so other local users cannot connect to it or
+plant their own. Clients only talk to sockets owned by the current user.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+
+CONNECT_TIMEOUT = 1.0
+RESPONSE_TIMEOUT = 300.0
+
+
+def default_socket_dir():
+    """Return the per-user directory of the default socket in $TMPDIR (or /tmp)
+
+    Every client calls this on startup, so it avoids importing tempfile.
+    """
+    temp_dir = os.environ.get('TMPDIR') or '/tmp'
+    return os.path.join(temp_dir, f"kantra-helper-{os.getuid()}")
+
+
+def default_socket_path():
+    """Return $KANTRA_HELPER_SOCKET, or daemon.sock in default_socket_dir()"""
+    return (os.environ.get('KANTRA_HELPER_SOCKET')
+            or os.path.join(default_socket_dir(), 'daemon.sock'))
+
+
+def _private_dir(directory):
+    """Create directory with mode 0700, or check that an existing one is private
+
+    Raises PermissionError if it is not a real directory owned by the current
+    user and closed to group and others (another user may have created it).
+    """
+    import stat
+
+    try:
+        os.mkdir(directory, 0o700)
+    except FileExistsError:
+        pass
+    info = os.lstat(directory)
+    if (not stat.S_ISDIR(info.st_mode) or info.st_uid != os.getuid()
+            or info.st_mode & 0o077):
+        raise PermissionError(
+            f"{directory} is not a private directory owned by the current user")
+
+
+def _owned_by_user(path):
+    """Return True if path exists and belongs to the current user"""
+    try:
+        return os.stat(path).st_uid == os.getuid()
+    except OSError:
+        return False
+
+
+def send_request(message, socket_path=None):
+    """Send one request to a running daemon
+
+    Returns the response dict, or None when no daemon is listening (or it
+    failed to answer), in which case the caller should run the query itself.
+    """
+    socket_path = socket_path or default_socket_path()
+    if not os.path.exists(socket_path):
+        return None
+    if not _owned_by_user(socket_path):
+        # another local user could answer with arbitrary output
+        print(f"Warning: Ignoring daemon socket {socket_path} owned by another user",
+              file=sys.stderr)
+        return None
+
+    import socket
+
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            sock.connect(socket_path)
+            sock.settimeout(RESPONSE_TIMEOUT)
+            sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+            sock.shutdown(socket.SHUT_WR)
+            while True:
+                chunk = sock.recv(1 << 16)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        response = json.loads(b''.join(chunks))
+    except (OSError, ValueError):
+        return None
+
+    if not isinstance(response, dict) or 'exit_code' not in response:
+        return None
+    return response
+
+
+def print_response(response):
+    """Replay a daemon response on stdout/stderr and return its exit code"""
+    sys.stdout.write(response.get('stdout', ''))
+    sys.stderr.write(response.get('stderr', ''))
+    return response['exit_code']
+
+
+class OutputStore:
+    """Parsed outputs kept in memory, reloaded when their size or mtime changes
+
+    loader(path) builds the value kept for a path; errors propagate to the
+    caller of get().
+    """
+
+    def __init__(self, loader):
+        import threading
+
+        self._loader = loader
+        self._entries = {}  # path -> ((size, mtime_ns), value)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _stat_key(path):
+        stat = os.stat(path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def get(self, path):
+        path = os.path.abspath(path)
+        key = self._stat_key(path)
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        value = self._loader(path)
+        with self._lock:
+            self._entries[path] = (key, value)
+        return value
+
+    def refresh(self):
+        """Reload changed outputs and forget deleted or unreadable ones"""
+        with self._lock:
+            entries = list(self._entries.items())
+
+        for path, (key, _) in entries:
+            try:
+                if self._stat_key(path) != key:
+                    self.get(path)
+            except Exception:
+                with self._lock:
+                    self._entries.pop(path, None)
+
+
+def _run_handler(handler, request):
+    """Run a command handler, capturing its output and exit code
+
+    Relative paths in the request resolve against the client's cwd; the
+    daemon's own working directory is restored afterwards.
+    """
+    stdout, stderr = io.StringIO(), io.StringIO()
+    exit_code = 0
+    daemon_cwd = os.getcwd()
+
+    with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+        try:
+            cwd = request.get('cwd')
+            if cwd:
+                os.chdir(cwd)
+            handler(request)
+        except SystemExit as e:
+            exit_code = e.code if isinstance(e.code, int) else 1
+        except Exception as e:
+            print(f"Error: {type(e).__name__}: {e}", file=sys.stderr)
+            exit_code = 1
+        finally:
+            os.chdir(daemon_cwd)
+
+    return {'exit_code': exit_code, 'stdout': stdout.getvalue(), 'stderr': stderr.getvalue()}
+
+
+def _read_request(conn):
+    data = b''
+    while b'\n' not in data:
+        chunk = conn.recv(1 << 16)
+        if not chunk:
+            break
+        data += chunk
+    return json.loads(data)
+
+
+def serve(handlers, stores=(), socket_path=None, poll_interval=2.0, idle_timeout=1800):
+    """Answer requests on a Unix domain socket until shut down or idle
+
+    Args:
+        handlers: Dict of command name -> handler(request); handlers print
+                  their output and may sys.exit() like the CLI commands do
+        stores: OutputStores to re-check for changes every poll_interval seconds
+        socket_path: Socket to listen on (default: default_socket_path())
+        poll_interval: Seconds between change checks (0 disables the watcher)
+        idle_timeout: Exit after this many seconds without a request (0 = never)
+
+    Requests are handled one at a time, so handlers need no locking.
+    Returns False if another daemon is already listening on socket_path.
+    Raises PermissionError if the default socket directory is not private.
+    """
+    import socket
+    import threading
+
+    socket_path = socket_path or default_socket_path()
+    if os.path.dirname(os.path.abspath(socket_path)) == os.path.abspath(default_socket_dir()):
+        _private_dir(default_socket_dir())
+
+    if os.path.exists(socket_path):
+        if send_request({'command': 'ping'}, socket_path) is not None:
+            return False
+        os.unlink(socket_path)  # stale socket from a daemon that died
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    umask = os.umask(0o077)  # the socket is never reachable by others, not even briefly
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(umask)
+    os.chmod(socket_path, 0o600)
+    server.listen()
+    server.settimeout(1.0)
+
+    stop = threading.Event()
+
+    def watch():
+        while not stop.wait(poll_interval):
+            for store in stores:
+                store.refresh()
+
+    if poll_interval and stores:
+        threading.Thread(target=watch, name='kantra-watch', daemon=True).start()
+
+    last_request = time.monotonic()
+    try:
+        while not stop.is_set():
+            if idle_timeout and time.monotonic() - last_request > idle_timeout:
+                break
+            try:
+                conn, _ = server.accept()
+            except socket.timeout:
+                continue
+
+            last_request = time.monotonic()
+            with conn:
+                conn.settimeout(RESPONSE_TIMEOUT)
+                try:
+                    request = _read_request(conn)
+                    command = request.get('command')
+                    if command == 'ping':
+                        response = {'exit_code': 0, 'stdout': 'pong\n', 'stderr': ''}
+                    elif command == 'shutdown':
+                        response = {'exit_code': 0, 'stdout': 'Daemon stopped\n', 'stderr': ''}
+                        stop.set()
+                    elif command in handlers:
+                        response = _run_handler(handlers[command], request)
+                    else:
+                        response = {'exit_code': 2, 'stdout': '',
+                                    'stderr': f"Error: Unknown daemon command: {command}\n"}
+                    conn.sendall(json.dumps(response).encode('utf-8'))
+                except (OSError, ValueError, AttributeError):
+                    continue
+    finally:
+        stop.set()
+        server.close()
+        try:
+            os.unlink(socket_path)
+        except OSError:
+            pass
+
+    return True
@@ -0,0 +1,172 @@
+"""
+Kantra Labels
+Kantra-style label selector expressions, evaluated over per-label rule bitmaps.
+
+A selector combines labels with '&&', '||', '!' and parentheses, e.g.
+
+    konveyor.io/target=patternfly-v6 && !category=optional
+
+A 'key=value' term matches rules carrying exactly that label; a bare 'key'
+term matches any value of the key. A rule carries its own labels plus
+those of its ruleset (merged by kantra_loader), and its category is matched
+as the pseudo-label 'category=<category>'.
+
+LabelIndex keeps one Python int bitmap of rule positions per label and per
+label key, so a selector is evaluated with a few big-int AND/OR/NOT
+operations instead of a pass over the rules.
+"""
+
+
+class LabelSelectorError(ValueError):
+    """Raised for a label selector that cannot be parsed"""
+
+
+_OPERATORS = ('&&', '||', '!', '(', ')')
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        char = text[position]
+        if char.isspace():
+            position += 1
+        elif text.startswith(('&&', '||'), position):
+            tokens.append(text[position:position + 2])
+            position += 2
+        elif char in '!()':
+            tokens.append(char)
+            position += 1
+        else:
+            start = position
+            while (position < len(text) and not text[position].isspace()
+                   and text[position] not in '!()&|'):
+                position += 1
+            if position == start:
+                raise LabelSelectorError(f"Unexpected '{char}' in label selector: {text}")
+            tokens.append(text[start:position])
+    return tokens
+
+
+class LabelSelector:
+    """A parsed label selector
+
+    tree is a nested tuple: ('label', key, value-or-None), ('not', node),
+    ('and', left, right) or ('or', left, right).
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self._tokens = _tokenize(text)
+        self._position = 0
+        if not self._tokens:
+            raise LabelSelectorError("Empty label selector")
+        self.tree = self._parse_or()
+        if self._position < len(self._tokens):
+            raise LabelSelectorError(
+                f"Unexpected '{self._tokens[self._position]}' in label selector: {text}")
+        del self._tokens
+
+    def _peek(self):
+        if self._position < len(self._tokens):
+            return self._tokens[self._position]
+        return None
+
+    def _take(self):
+        token = self._peek()
+        if token is None:
+            raise LabelSelectorError(f"Label selector ends early: {self.text}")
+        self._position += 1
+        return token
+
+    def _parse_or(self):
+        node = self._parse_and()
+        while self._peek() == '||':
+            self._take()
+            node = ('or', node, self._parse_and())
+        return node
+
+    def _parse_and(self):
+        node = self._parse_unary()
+        while self._peek() == '&&':
+            self._take()
+            node = ('and', node, self._parse_unary())
+        return node
+
+    def _parse_unary(self):
+        token = self._take()
+        if token == '!':
+            return ('not', self._parse_unary())
+        if token == '(':
+            node = self._parse_or()
+            if self._take() != ')':
+                raise LabelSelectorError(f"Missing ')' in label selector: {self.text}")
+            return node
+        if token in _OPERATORS:
+            raise LabelSelectorError(f"Unexpected '{token}' in label selector: {self.text}")
+        key, separator, value = token.partition('=')
+        return ('label', key, value if separator else None)
+
+    def matches(self, rule):
+        """Return True if a single Rule matches (for streaming, without an index)"""
+        labels = set(rule_labels(rule))
+        keys = {label.partition('=')[0] for label in labels}
+
+        def evaluate(node):
+            kind = node[0]
+            if kind == 'label':
+                _, key, value = node
+                return key in keys if value is None else f"{key}={value}" in labels
+            if kind == 'not':
+                return not evaluate(node[1])
+            if kind == 'and':
+                return evaluate(node[1]) and evaluate(node[2])
+            return evaluate(node[1]) or evaluate(node[2])
+
+        return evaluate(self.tree)
+
+
+def rule_labels(rule):
+    """Yield the labels of a Rule, plus its 'category=<category>' pseudo-label"""
+    yield from rule.labels
+    if rule.category:
+        yield f"category={rule.category}"
+
+
+class LabelIndex:
+    """Per-label and per-key bitmaps of rule positions for a list of Rules"""
+
+    def __init__(self, rules):
+        self.size = len(rules)
+        self.all = (1 << self.size) - 1
+        self.labels = {}
+        self.keys = {}
+        for position, rule in enumerate(rules):
+            bit = 1 << position
+            for label in rule_labels(rule):
+                self.labels[label] = self.labels.get(label, 0) | bit
+                key = label.partition('=')[0]
+                self.keys[key] = self.keys.get(key, 0) | bit
+
+    def select(self, selector):
+        """Return the bitmap of rule positions matching a LabelSelector"""
+        def evaluate(node):
+            kind = node[0]
+            if kind == 'label':
+                _, key, value = node
+                if value is None:
+                    return self.keys.get(key, 0)
+                return self.labels.get(f"{key}={value}", 0)
+            if kind == 'not':
+                return self.all & ~evaluate(node[1])
+            if kind == 'and':
+                return evaluate(node[1]) & evaluate(node[2])
+            return evaluate(node[1]) | evaluate(node[2])
+
+        return evaluate(selector.tree)
+
+    def positions(self, selector):
+        """Return the set of rule positions matching a LabelSelector"""
+        bits = self.select(selector)
+        digits = bin(bits)[:1:-1]  # binary digits, lowest bit first
+        return {position for position, digit in enumerate(digits) if digit == '1'}
@@ -0,0 +1,142 @@
+"""
+Kantra Model
+Compact in-memory model of a parsed Kantra output.yaml.
+
+Kantra repeats the same long file:// URIs, rule IDs, labels and boilerplate
+messages for thousands of incidents. KantraOutput interns every such string
+in a StringTable, so each distinct value is stored once; incidents keep a
+reference to the canonical URI (and snippets) and an integer id for their message. Rule and
+Incident use __slots__ to avoid a per-object __dict__.
+"""
+
+
+class StringTable:
+    """Interns strings, mapping each distinct value to a small integer id"""
+
+    __slots__ = ('values', '_ids')
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self._ids = {value: i for i, value in enumerate(self.values)}
+
+    def id(self, value):
+        """Return the id of value, adding it to the table if needed"""
+        value_id = self._ids.get(value)
+        if value_id is None:
+            value_id = self._ids[value] = len(self.values)
+            self.values.append(value)
+        return value_id
+
+    def intern(self, value):
+        """Return the table's canonical copy of value (None stays None)"""
+        if value is None:
+            return None
+        return self.values[self.id(value)]
+
+    def __getitem__(self, value_id):
+        return self.values[value_id]
+
+    def __len__(self):
+        return len(self.values)
+
+
+class Rule:
+    """One violation: rule metadata plus its incidents, in file order"""
+
+    __slots__ = ('ruleset', 'rule_id', 'description', 'category', 'effort', 'labels', 'incidents')
+
+    def __init__(self, ruleset, rule_id, description, category, effort, labels=()):
+        self.ruleset = ruleset
+        self.rule_id = rule_id
+        self.description = description
+        self.category = category
+        self.effort = effort
+        self.labels = tuple(labels)
+        self.incidents = []
+
+    def __repr__(self):
+        return f"Rule({self.ruleset!r}, {self.rule_id!r}, incidents={len(self.incidents)})"
+
+
+class Incident:
+    """One incident; message_id indexes KantraOutput.messages (-1 = no message)
+
+    snippet is the normalized matched code (see kantra_loader.incident_snippet),
+    or None when Kantra recorded none or it was not read. matching_text is
+    the incident's variables.matchingText exactly as Kantra reported it.
+    """
+
+    __slots__ = ('rule', 'uri', 'line_number', 'message_id', 'snippet', 'matching_text')
+
+    def __init__(self, rule, uri, line_number, message_id=-1, snippet=None,
+                 matching_text=None):
+        self.rule = rule
+        self.uri = uri
+        self.line_number = line_number
+        self.message_id = message_id
+        self.snippet = snippet
+        self.matching_text = matching_text
+
+    @property
+    def ruleset(self):
+        return self.rule.ruleset
+
+    @property
+    def rule_id(self):
+        return self.rule.rule_id
+
+    @property
+    def category(self):
+        return self.rule.category
+
+    @property
+    def effort(self):
+        return self.rule.effort
+
+    @property
+    def file_path(self):
+        """Local file path of the incident, or None if it has no file:// URI"""
+        uri = self.uri
+        if isinstance(uri, str) and uri.startswith('file://'):
+            return uri[7:] or None  # Remove 'file://' prefix
+        return None
+
+    def __repr__(self):
+        return f"Incident({self.rule.rule_id!r}, {self.uri!r}, {self.line_number!r})"
+
+
+class KantraOutput:
+    """Parsed Kantra output: rules in file order and the string tables they share"""
+
+    __slots__ = ('rules', 'strings', 'messages')
+
+    def __init__(self, strings=None, messages=None):
+        self.rules = []
+        self.strings = strings if strings is not None else StringTable()
+        self.messages = messages if messages is not None else StringTable()
+
+    def new_rule(self, ruleset, rule_id, description, category, effort, labels=()):
+        """Create a Rule with interned identifiers (not added to self.rules)"""
+        intern = self.strings.intern
+        return Rule(intern(ruleset), intern(rule_id), description, intern(category), effort,
+                    [intern(label) for label in labels])
+
+    def add_incident(self, rule, uri, line_number, message=None, snippet=None,
+                     matching_text=None):
+        """Append an Incident to rule, interning its URI, message and snippets"""
+        intern = self.strings.intern
+        message_id = self.messages.id(message) if message is not None else -1
+        incident = Incident(rule, intern(uri), line_number, message_id, intern(snippet),
+                            intern(matching_text))
+        rule.incidents.append(incident)
+        return incident
+
+    def message(self, incident):
+        """Return the message text of an incident, or None"""
+        if incident.message_id < 0:
+            return None
+        return self.messages[incident.message_id]
+
+    def iter_incidents(self):
+        for rule in self.rules:
+            yield from rule.incidents
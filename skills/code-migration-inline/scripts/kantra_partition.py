@@ -0,0 +1,63 @@
+"""
+Kantra Partition
+Split outstanding incidents into file-disjoint work packages for parallel fixers.
+
+Every file goes to exactly one worker, so two fixers never edit the same
+file. Files are keyed by their path below their prefix root
+(kantra_compact.project_paths), so a file Kantra reports under two absolute
+prefixes is one workload. A file's weight is the summed effort of its incidents (effort 1 when
+Kantra gives none); files are placed with the LPT (longest processing time
+first) rule: heaviest file first, each onto the currently lightest worker.
+"""
+
+import heapq
+
+from kantra_compact import project_paths
+
+
+def file_workloads(file_index):
+    """Return (roots, per-file workloads) from a kantra_index.FileIndex
+
+    Each workload is a dict with 'file' (the project-relative key), 'paths'
+    (the paths Kantra reported it under), 'incidents', 'effort' and 'rules'
+    ([(Rule, [Incident])] in Kantra order).
+    """
+    roots, keys = project_paths(file_index.files)
+    aliases = {}
+    for path in sorted(file_index.files):
+        aliases.setdefault(keys[path], []).append(path)
+
+    workloads = []
+    for key, paths in aliases.items():
+        rules = list(file_index.rule_incidents(paths))
+        workloads.append({
+            'file': key,
+            'paths': paths,
+            'incidents': sum(len(incidents) for _, incidents in rules),
+            'effort': sum((rule.effort or 1) * len(incidents) for rule, incidents in rules),
+            'rules': rules,
+        })
+    return roots, workloads
+
+
+def partition_workloads(workloads, workers):
+    """Assign workloads to workers with LPT scheduling
+
+    Args:
+        workloads: Dicts with 'file', 'effort' and 'incidents' (see file_workloads)
+        workers: Number of work packages
+
+    Returns a list of workers lists of workloads, heaviest first within
+    each. Ties are broken by incident count, then path, so the split is
+    deterministic.
+    """
+    packages = [[] for _ in range(workers)]
+    loads = [(0, 0, worker) for worker in range(workers)]  # (effort, incidents, worker)
+
+    for workload in sorted(workloads, key=lambda w: (-w['effort'], -w['incidents'], w['file'])):
+        effort, incidents, worker = heapq.heappop(loads)
+        packages[worker].append(workload)
+        heapq.heappush(loads, (effort + workload['effort'],
+                               incidents + workload['incidents'], worker))
+
+    return packages
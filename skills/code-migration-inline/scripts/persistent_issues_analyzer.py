@@ -2,9 +2,20 @@
 """
 Persistent Issues Analyzer
 Finds all Kantra output.yaml files and identifies issues appearing more than twice.
+
+Round outputs are parsed concurrently in a process pool (--jobs); results are
+collected as they finish and reported in newest-to-oldest order. Per-round
+summaries are cached in the workspace (see kantra_manifest), so only new or
+changed rounds are parsed. Outputs are discovered with a pruned os.scandir
+walk (see kantra_walk).
+
+Besides rules that recur, the report lists the individual incidents that
+survived the last K consecutive rounds (see kantra_tracking), so rules whose
+incidents are being fixed are not mistaken for stuck ones. --convergence
+reports instead whether the fix loop is still making progress: oscillating
+and growing incidents and the trend of the incident count.
 """
 
-import yaml
 import os
 import sys
 import argparse
@@ -12,87 +23,83 @@ from pathlib import Path
 from collections import defaultdict
 from datetime import datetime
 
-
-def load_kantra_output(yaml_file):
-    """Load and parse a Kantra output.yaml file"""
-    try:
-        with open(yaml_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-
-            if data is None or not isinstance(data, list):
-                return None
-
-            return data
-
-    except Exception:
-        return None
-
-
-def extract_issues_from_file(yaml_file):
-    """Extract all issues from a Kantra output.yaml file"""
-    data = load_kantra_output(yaml_file)
-    if not data:
-        return {}
-
+from kantra_daemon import print_response, send_request
+from kantra_diff import SnippetHasher
+from kantra_loader import (
+    YAML_BACKENDS, YAMLBackendError, get_safe_loader, iter_rules, resolve_jobs,
+)
+from kantra_manifest import RoundManifest, stat_key
+from kantra_model import KantraOutput
+from kantra_tracking import convergence, stuck_incidents
+from kantra_walk import DEFAULT_SKIP_DIRS, walk_outputs
+
+
+def extract_issues_from_file(yaml_file, backend=None):
+    """Extract all issues from a Kantra output.yaml file
+
+    Streams the file with kantra_loader.iter_rules, so codeSnip bodies are
+    skipped instead of being loaded, and repeated URIs and messages are
+    interned rather than copied per incident. Each issue also lists its
+    incidents as (file, line_number, snippet_digest) for kantra_tracking.
+
+    Returns None, after printing a warning, when the file cannot be parsed
+    (e.g. a round whose output is still being written), so an unreadable
+    round is never mistaken for one without issues.
+    """
     issues = {}
+    output = KantraOutput()
+    snippet_hash = SnippetHasher()
 
-    for ruleset in data:
-        if not isinstance(ruleset, dict) or 'violations' not in ruleset:
-            continue
-
-        violations = ruleset.get('violations')
-        if not isinstance(violations, dict):
-            continue
-
-        ruleset_name = ruleset.get('name', 'Unknown')
-
-        for rule_id, violation in violations.items():
-            if not isinstance(violation, dict):
-                continue
-
-            incidents = violation.get('incidents', [])
-            if not isinstance(incidents, list):
-                continue
-
+    try:
+        for rule in iter_rules(yaml_file, output, with_messages=True, backend=backend):
             files_affected = set()
-            incident_messages = set()
-
-            for incident in incidents:
-                if not isinstance(incident, dict):
-                    continue
-
-                uri = incident.get('uri', '')
-                if isinstance(uri, str) and uri.startswith('file://'):
-                    file_path = uri[7:]
-                    if file_path:
-                        files_affected.add(file_path)
-
-                message = incident.get('message', '')
-                if isinstance(message, str) and message:
-                    incident_messages.add(message)
-
-            issues[rule_id] = {
-                'description': violation.get('description', 'No description'),
-                'category': violation.get('category', 'unknown'),
-                'ruleset': ruleset_name,
-                'incident_count': len(incidents),
+            message_ids = set()
+            incidents = []
+
+            for incident in rule.incidents:
+                file_path = incident.file_path
+                if file_path:
+                    files_affected.add(file_path)
+                incidents.append((file_path, incident.line_number,
+                                  snippet_hash(incident.snippet)))
+
+                if incident.message_id >= 0:
+                    message_ids.add(incident.message_id)
+
+            issues[rule.rule_id] = {
+                'description': rule.description,
+                'category': rule.category or 'unknown',
+                'ruleset': rule.ruleset,
+                'incident_count': len(rule.incidents),
                 'files_affected': list(files_affected),
-                'incident_messages': list(incident_messages)
+                'incident_messages': [output.messages[i] for i in message_ids
+                                      if output.messages[i]],
+                'incidents': incidents,
             }
 
+    except Exception as e:
+        print(f"Warning: Could not parse round output {yaml_file}: {e}")
+        return None
+
     return issues
 
 
-def find_output_files(base_dir):
-    """Find all output.yaml files recursively and return sorted by timestamp (descending)"""
+def find_output_files(base_dir, walk=None):
+    """Find all output.yaml files recursively and return sorted by timestamp (descending)
+
+    walk holds walk_outputs() options (include, exclude, max_depth,
+    skip_dirs, full_walk). Returns (output_files, counts), counts being the
+    walk statistics of walk_outputs().
+    """
     output_files = []
     base_path = Path(base_dir)
 
     if not base_path.exists():
         print(f"Error: Directory '{base_dir}' does not exist")
-        return []
+        return [], None
 
-    for yaml_file in base_path.rglob('output.yaml'):
+    paths, counts = walk_outputs(base_dir, **(walk or {}))
+    for yaml_file in map(Path, paths):
         try:
             stat = yaml_file.stat()
             output_files.append({
@@ -107,23 +114,132 @@ def find_output_files(base_dir):
     # Sort by timestamp in DESCENDING order (newest first)
     output_files.sort(key=lambda x: x['timestamp'], reverse=True)
 
-    return output_files
+    return output_files, counts
+
+
+def extract_all_issues(paths, backend=None, jobs=0):
+    """Extract the issues of several output.yaml files, in the order of paths
+
+    Args:
+        paths: output.yaml paths
+        backend: YAML parser backend
+        jobs: Worker processes (0 or None = one per CPU, 1 = serial)
+
+    Files are parsed in a process pool and collected as they finish; the
+    returned list is still in the order of paths.
+    """
+    workers = min(resolve_jobs(jobs), len(paths))
+    if workers <= 1:
+        return [extract_issues_from_file(path, backend) for path in paths]
+
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    results = [None] * len(paths)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(extract_issues_from_file, path, backend): index
+                   for index, path in enumerate(paths)}
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+    return results
+
+
+def load_round_issues(base_dir, paths, backend=None, jobs=0, use_cache=True, verbose=False):
+    """Return the issues of every round output in paths, in the order of paths
+
+    With use_cache, rounds whose size and mtime match the workspace manifest
+    are read from it and only the others are parsed (in jobs worker
+    processes); the manifest is then updated. Rounds that fail to parse are
+    None and are not recorded, so they are parsed again next time.
+    """
+    if not use_cache:
+        return extract_all_issues(paths, backend, jobs)
 
+    manifest = RoundManifest(base_dir)
+    all_issues = [manifest.get(path) for path in paths]
+    missing = [index for index, issues in enumerate(all_issues) if issues is None]
 
-def analyze_persistent_issues(base_dir, min_occurrences=3):
-    """Analyze issues appearing more than twice across output files"""
-    output_files = find_output_files(base_dir)
+    keys = {}
+    for index in missing:
+        try:
+            keys[index] = stat_key(paths[index])
+        except OSError:
+            pass
+    parsed = extract_all_issues([paths[index] for index in missing], backend, jobs)
+    for index, issues in zip(missing, parsed):
+        all_issues[index] = issues
+        if issues is not None and index in keys:
+            manifest.put(paths[index], keys[index], issues)
+
+    saved = manifest.save()
+    if verbose:
+        print(f"Round cache: {manifest.hits} cached, {len(missing)} parsed "
+              f"({manifest.path}{'' if saved else ', not writable'})", file=sys.stderr)
+    return all_issues
+
+
+def load_rounds(base_dir, backend=None, issues_loader=None, jobs=0, use_cache=True,
+                verbose=False, walk=None):
+    """Find and load the round outputs under base_dir, newest first
+
+    See analyze_persistent_issues() for the arguments. Prints the problem
+    and returns None when there is nothing to analyze; otherwise returns
+    (output_files, walk_counts, backend_name, all_issues).
+    """
+    output_files, counts = find_output_files(base_dir, walk)
 
     if not output_files:
         print(f"No output.yaml files found in '{base_dir}'")
+        return None
+
+    try:
+        _, backend_name = get_safe_loader(backend)
+    except YAMLBackendError as e:
+        print(f"Error: {e}")
+        return None
+
+    paths = [file_info['path'] for file_info in output_files]
+    if issues_loader is not None:
+        all_issues = [issues_loader(path) for path in paths]
+    else:
+        all_issues = load_round_issues(base_dir, paths, backend, jobs, use_cache, verbose)
+    return output_files, counts, backend_name, all_issues
+
+
+def print_walk_summary(base_dir, output_files, counts):
+    """Print the base directory and discovery counts of a report header"""
+    print(f"Base directory: {base_dir}")
+    print(f"Output files found: {len(output_files)}")
+    layout = ' (round-*/kantra layout)' if counts['layout'] == 'rounds' else ''
+    print(f"Directories walked: {counts['walked']}, skipped: {counts['skipped']}{layout}")
+
+
+def analyze_persistent_issues(base_dir, min_occurrences=3, backend=None, issues_loader=None,
+                              jobs=0, use_cache=True, verbose=False, walk=None,
+                              consecutive=None):
+    """Analyze issues appearing more than twice across output files
+
+    issues_loader(path) replaces extract_issues_from_file, e.g. to read
+    rounds the query daemon already holds in memory; the files are then
+    read serially. Otherwise rounds come from the workspace manifest cache
+    when unchanged (unless use_cache is False) and the rest are parsed in
+    jobs worker processes (0 = one per CPU). walk holds the discovery
+    options of find_output_files(). Incidents present in the last
+    `consecutive` rounds (default: min_occurrences) are reported as stuck.
+    """
+    if consecutive is None:
+        consecutive = min_occurrences
+
+    loaded = load_rounds(base_dir, backend, issues_loader, jobs, use_cache, verbose, walk)
+    if loaded is None:
         return
+    output_files, counts, backend_name, all_issues = loaded
 
     print("=" * 80)
     print("PERSISTENT ISSUES ANALYSIS")
     print("=" * 80)
-    print(f"Base directory: {base_dir}")
-    print(f"Output files found: {len(output_files)}")
+    print_walk_summary(base_dir, output_files, counts)
     print(f"Analyzing issues appearing in {min_occurrences}+ files")
+    print(f"YAML backend: {backend_name}")
     print()
 
     # Track issues across all files
@@ -132,16 +248,16 @@ def analyze_persistent_issues(base_dir, min_occurrences=3):
     print("📁 ANALYZING FILES (newest to oldest):")
     print("-" * 80)
 
-    for idx, file_info in enumerate(output_files, 1):
+    for idx, (file_info, issues) in enumerate(zip(output_files, all_issues), 1):
         yaml_path = file_info['path']
         timestamp = file_info['timestamp']
 
         print(f"{idx}. {yaml_path.relative_to(base_dir)}")
         print(f"   Timestamp: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}")
 
-        issues = extract_issues_from_file(yaml_path)
-
-        if not issues:
+        if issues is None:
+            print(f"   Could not be read; left out of the analysis")
+        elif not issues:
             print(f"   No issues found")
         else:
             print(f"   Issues: {len(issues)}")
@@ -164,13 +280,36 @@ def analyze_persistent_issues(base_dir, min_occurrences=3):
         if len(occurrences) >= min_occurrences
     }
 
-    if not persistent_issues:
+    # Incidents present in each of the last `consecutive` readable rounds (oldest first)
+    stuck = stuck_incidents(all_issues[::-1], consecutive)
+    newest = next((issues for issues in all_issues if issues is not None), None)
+    stuck_count = sum(len(entry['stuck']) for entry in stuck.values())
+
+    if not persistent_issues and not stuck:
         print("=" * 80)
         print(f"✅ No persistent issues found!")
         print(f"All issues appeared in fewer than {min_occurrences} analysis runs.")
         print("=" * 80)
         return
 
+    if persistent_issues:
+        print_persistent_issues(persistent_issues, stuck, newest, base_dir, min_occurrences)
+    if stuck:
+        print_stuck_incidents(stuck, consecutive)
+
+    print("=" * 80)
+    print(f"SUMMARY: {len(persistent_issues)} persistent issues found, "
+          f"{stuck_count} incidents stuck for {consecutive}+ consecutive rounds")
+    print("=" * 80)
+
+
+def print_persistent_issues(persistent_issues, stuck, newest, base_dir, min_occurrences):
+    """Print the rules appearing in min_occurrences+ rounds
+
+    stuck is the stuck_incidents() result and newest the issues of the
+    newest readable round, to show how many of a rule's incidents are still
+    stuck (rules no longer in that round have none to show).
+    """
     print("=" * 80)
     print(f"🔴 PERSISTENT ISSUES (appearing in {min_occurrences}+ files):")
     print("=" * 80)
@@ -181,9 +320,14 @@ def analyze_persistent_issues(base_dir, min_occurrences=3):
                                        reverse=True):
         latest = occurrences[0]  # Most recent occurrence (sorted descending)
         issue_data = latest['issue_data']
+        newest_issue = (newest or {}).get(rule_id)
+        stuck_count = len(stuck.get(rule_id, {}).get('stuck', ()))
 
         print(f"Issue: {rule_id}")
         print(f"Occurrences: {len(occurrences)} times")
+        if newest_issue is not None:
+            print(f"Stuck incidents: {stuck_count} of {newest_issue['incident_count']} "
+                  f"in the newest round")
         print(f"Description: {issue_data['description']}")
         print(f"Category: {issue_data['category']}")
         print(f"Ruleset: {issue_data['ruleset']}")
@@ -209,9 +353,95 @@ def analyze_persistent_issues(base_dir, min_occurrences=3):
 
         print()
 
+
+def analyze_convergence(base_dir, backend=None, issues_loader=None, jobs=0, use_cache=True,
+                        verbose=False, walk=None, limit=10):
+    """Report whether the fix loop is converging (see kantra_tracking.convergence)
+
+    Takes the round loading arguments of analyze_persistent_issues(); limit
+    caps the oscillating incidents and growing rules listed.
+    """
+    loaded = load_rounds(base_dir, backend, issues_loader, jobs, use_cache, verbose, walk)
+    if loaded is None:
+        return
+    output_files, counts, backend_name, all_issues = loaded
+
+    # rounds oldest first
+    output_files = output_files[::-1]
+    report = convergence(all_issues[::-1])
+
+    print("=" * 80)
+    print("CONVERGENCE ANALYSIS")
+    print("=" * 80)
+    print_walk_summary(base_dir, output_files, counts)
+    print(f"YAML backend: {backend_name}")
+    print()
+
+    print("📉 INCIDENTS PER ROUND (oldest to newest):")
+    print("-" * 80)
+    print(f"{'Round':<40} {'Incidents':>9} {'New':>6} {'Back':>6} {'Fixed':>6}")
+    history = iter(report['history'])
+    for position, file_info in enumerate(output_files):
+        name = str(file_info['path'].relative_to(base_dir))
+        if position in report['unreadable']:
+            print(f"{name:<40} {'unreadable, left out':>33}")
+            continue
+        entry = next(history)
+        print(f"{name:<40} {entry['incidents']:>9} {entry['new']:>6} "
+              f"{entry['reappeared']:>6} {entry['fixed']:>6}")
+    if report['slope'] is not None:
+        print(f"Trend: {report['slope']:+.1f} incidents per round "
+              f"over the last {report['window']} rounds")
+    print()
+
+    oscillating = report['oscillating']
+    print(f"🔁 OSCILLATING INCIDENTS (fixed, then reappeared): {len(oscillating)}")
+    for rule_id, path, line_number, pattern, reappearances in oscillating[:limit]:
+        location = path or '(no file)'
+        if line_number is not None:
+            location = f"{location}:{line_number}"
+        print(f"  - {rule_id} {location} rounds {pattern} ({reappearances}x back)")
+    if len(oscillating) > limit:
+        print(f"  ... and {len(oscillating) - limit} more incidents")
+    print()
+
+    growing = report['growing']
+    print(f"📈 GROWING RULES (incident count never drops): {len(growing)}")
+    for rule_id, rule_counts in growing[:limit]:
+        print(f"  - {rule_id}: {' -> '.join(map(str, rule_counts))}")
+    if len(growing) > limit:
+        print(f"  ... and {len(growing) - limit} more rules")
+    print()
+
+    verdict = report['verdict']
+    if report['rounds_left'] is not None:
+        rounds_left = report['rounds_left']
+        verdict += (f", about {rounds_left} more round{'s' if rounds_left != 1 else ''} "
+                    f"at the current rate")
+    print("=" * 80)
+    print(f"VERDICT: {verdict} ({'stop' if report['stop'] else 'continue'})")
+    print("=" * 80)
+
+
+def print_stuck_incidents(stuck, consecutive, limit=10):
+    """Print the stuck_incidents() result, rules with the most stuck incidents first"""
     print("=" * 80)
-    print(f"SUMMARY: {len(persistent_issues)} persistent issues found")
+    print(f"📌 STUCK INCIDENTS (unchanged for {consecutive}+ consecutive rounds):")
     print("=" * 80)
+    print()
+
+    for rule_id, entry in sorted(stuck.items(), key=lambda x: (-len(x[1]['stuck']), x[0])):
+        incidents = entry['stuck']
+        print(f"Issue: {rule_id}")
+        print(f"Stuck: {len(incidents)} of {entry['total']} incidents")
+        for path, line_number, streak in incidents[:limit]:
+            location = path or '(no file)'
+            if line_number is not None:
+                location = f"{location}:{line_number}"
+            print(f"  - {location} ({streak} rounds)")
+        if len(incidents) > limit:
+            print(f"  ... and {len(incidents) - limit} more incidents")
+        print()
 
 
 def main():
@@ -223,6 +453,17 @@ Examples:
   python3 persistent_issues_analyzer.py /tmp/migration-workspace
   python3 persistent_issues_analyzer.py /tmp/migration-workspace --min-occurrences 2
   python3 persistent_issues_analyzer.py . --min-occurrences 4
+  python3 persistent_issues_analyzer.py /tmp/migration-workspace --jobs 1
+  python3 persistent_issues_analyzer.py /tmp/migration-workspace --consecutive 2
+  python3 persistent_issues_analyzer.py /tmp/migration-workspace --convergence
+
+Discovery skips node_modules, .git, kantra static-report trees and similar
+directories (--no-skip walks them), --include/--exclude filter by glob on the
+path relative to base_dir, and a workspace with round-*/kantra/output.yaml is
+read without a walk (--full-walk searches the whole tree).
+
+Round summaries are cached in <base_dir>/.kantra-rounds.json; later runs only
+parse new or changed output.yaml files (--no-cache parses everything).
 
 The script finds all output.yaml files recursively and identifies issues
 appearing in multiple analysis runs, suggesting they may be difficult to fix.
@@ -233,14 +474,74 @@ appearing in multiple analysis runs, suggesting they may be difficult to fix.
                        help='Base directory to search for output.yaml files')
     parser.add_argument('--min-occurrences', type=int, default=3,
                        help='Minimum occurrences to consider persistent (default: 3)')
+    parser.add_argument('--convergence', action='store_true',
+                       help='Report oscillating and growing incidents and whether the fix '
+                            'loop is converging, instead of persistent issues')
+    parser.add_argument('--consecutive', type=int, default=None, metavar='K',
+                       help='Report incidents present in each of the last K readable rounds as stuck '
+                            '(default: --min-occurrences)')
+    parser.add_argument('--yaml-backend', choices=YAML_BACKENDS, default=None,
+                       help='YAML parser backend (default: $KANTRA_YAML_BACKEND or auto; '
+                            'auto uses libyaml when available)')
+    parser.add_argument('--jobs', type=int, default=0,
+                       help='Parse round outputs in N worker processes, 1 for serial '
+                            '(default: 0, one per CPU)')
+    parser.add_argument('--include', action='append', metavar='GLOB',
+                       help='Only analyze outputs whose path relative to base_dir matches '
+                            '(repeatable)')
+    parser.add_argument('--exclude', action='append', metavar='GLOB',
+                       help='Skip outputs and directories whose relative path or '
+                            'directory name matches (repeatable)')
+    parser.add_argument('--max-depth', type=int, default=None, metavar='N',
+                       help='Do not descend more than N directories below base_dir '
+                            '(round-N/kantra is depth 2)')
+    parser.add_argument('--no-skip', dest='skip_defaults', action='store_false',
+                       help='Also walk node_modules, .git, static-report and the other '
+                            'default skipped directories')
+    parser.add_argument('--full-walk', action='store_true',
+                       help='Walk the whole tree even if base_dir has round-*/kantra outputs')
+    parser.add_argument('--no-cache', dest='use_cache', action='store_false',
+                       help='Parse every round instead of reusing the workspace round cache')
+    parser.add_argument('--verbose', action='store_true',
+                       help='Report round cache usage on stderr')
+    parser.add_argument('--no-daemon', dest='use_daemon', action='store_false',
+                       help='Parse directly even if a query daemon is running')
 
     args = parser.parse_args()
+    walk = {
+        'include': args.include,
+        'exclude': args.exclude,
+        'max_depth': args.max_depth,
+        'skip_dirs': DEFAULT_SKIP_DIRS if args.skip_defaults else (),
+        'full_walk': args.full_walk,
+    }
 
     if not Path(args.base_dir).exists():
         print(f"Error: Directory '{args.base_dir}' not found")
         sys.exit(1)
 
-    analyze_persistent_issues(args.base_dir, args.min_occurrences)
+    # Answer from the resident daemon ('kantra_output_helper.py serve') when one is running
+    if args.use_daemon and args.yaml_backend is None:
+        response = send_request({
+            'command': 'persistent',
+            'cwd': os.getcwd(),
+            'base_dir': args.base_dir,
+            'min_occurrences': args.min_occurrences,
+            'walk': walk,
+            'consecutive': args.consecutive,
+            'convergence': args.convergence,
+        })
+        if response is not None:
+            sys.exit(print_response(response))
+
+    if args.convergence:
+        analyze_convergence(args.base_dir, args.yaml_backend, jobs=args.jobs,
+                            use_cache=args.use_cache, verbose=args.verbose, walk=walk)
+        return
+
+    analyze_persistent_issues(args.base_dir, args.min_occurrences, args.yaml_backend,
+                              jobs=args.jobs, use_cache=args.use_cache, verbose=args.verbose,
+                              walk=walk, consecutive=args.consecutive)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,839 @@
+"""
+Kantra Loader
+Shared YAML loading for the Kantra helper scripts.
+
+Picks the fastest available PyYAML backend: the libyaml C loader
+(yaml.CSafeLoader) when PyYAML was built with it, otherwise the pure-Python
+yaml.SafeLoader. Both backends build the same Python objects.
+
+The backend can be forced with the KANTRA_YAML_BACKEND environment variable
+or the scripts' --yaml-backend option ('auto', 'libyaml' or 'python').
+
+Besides full loads, iter_rules()/read_output() read output.yaml at the
+parser-event level and only keep the fields the summaries need, as compact
+kantra_model objects. Message bodies and matched snippets are kept on
+request; every other field is skipped without building Python objects for it.
+
+parallel_load()/read_output(jobs=N) split large files on ruleset and
+violation boundaries and parse the shards in a process pool; the merged
+result is identical to a serial parse.
+
+load_output() adds a sidecar cache (output.yaml.idx) holding that model in
+marshal format, so repeated queries against the same output skip parsing.
+The cache is written in the form the first query needed: without messages
+and snippets for analyze-style queries (the parse skips their bodies), or
+with them; a cache with messages also answers queries that need none.
+stream_output() is its streaming counterpart: rules are handed out while the
+file is still being parsed.
+"""
+
+import hashlib
+import io
+import marshal
+import os
+
+from kantra_model import Incident, KantraOutput, Rule, StringTable
+
+
+YAML_BACKENDS = ('auto', 'libyaml', 'python')
+
+yaml = None  # PyYAML, imported on first parse by _require_yaml()
+
+
+def _require_yaml():
+    """Import PyYAML on first use, so cached queries never pay for loading it"""
+    global yaml
+    if yaml is None:
+        import yaml
+    return yaml
+
+
+class YAMLBackendError(ValueError):
+    """Raised when a requested YAML backend is unknown or unavailable"""
+
+
+def libyaml_available():
+    """Return True if PyYAML was built with the libyaml C extension"""
+    _require_yaml()
+    return getattr(yaml, '__with_libyaml__', False) and hasattr(yaml, 'CSafeLoader')
+
+
+def get_safe_loader(backend=None):
+    """Return (loader_class, backend_name) for the requested YAML backend
+
+    Args:
+        backend: 'auto' (libyaml if available, else python), 'libyaml' or 'python'.
+                 Defaults to $KANTRA_YAML_BACKEND, or 'auto' when unset.
+    """
+    _require_yaml()
+    if backend is None:
+        backend = os.environ.get('KANTRA_YAML_BACKEND') or 'auto'
+
+    if backend not in YAML_BACKENDS:
+        raise YAMLBackendError(
+            f"Unknown YAML backend '{backend}' (expected one of: {', '.join(YAML_BACKENDS)})"
+        )
+
+    if backend in ('auto', 'libyaml') and libyaml_available():
+        return yaml.CSafeLoader, 'libyaml'
+
+    if backend == 'libyaml':
+        raise YAMLBackendError(
+            "libyaml backend requested but PyYAML was built without libyaml"
+        )
+
+    return yaml.SafeLoader, 'python'
+
+
+def safe_load(stream, backend=None):
+    """Parse a YAML document with the selected backend
+
+    Returns (data, backend_name) so callers can report which backend was used.
+    Raises yaml.YAMLError on malformed input, like yaml.safe_load.
+    """
+    loader, backend_name = get_safe_loader(backend)
+    return yaml.load(stream, Loader=loader), backend_name
+
+
+class KantraOutputError(ValueError):
+    """Raised when an output.yaml parses but is not a Kantra ruleset list"""
+
+
+class EmptyOutputError(KantraOutputError):
+    """Raised when an output.yaml contains no document"""
+
+
+_NULL_SCALARS = ('', '~', 'null', 'Null', 'NULL')
+
+
+def _scalar(event):
+    """Return the string value of a scalar event, or None for nulls"""
+    if event.style is None and event.value in _NULL_SCALARS:
+        return None
+    return event.value
+
+
+def _int_scalar(event):
+    """Return the integer value of a scalar event, or None"""
+    try:
+        return int(event.value)
+    except ValueError:
+        return None
+
+
+class _EventReader:
+    """Walks PyYAML parser events for a Kantra output.yaml"""
+
+    def __init__(self, stream, backend):
+        loader, self.backend_name = get_safe_loader(backend)
+        self._events = yaml.parse(stream, Loader=loader)
+
+    def next(self):
+        return next(self._events)
+
+    def skip(self, event):
+        """Consume the rest of the node that starts with event"""
+        if not isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+            return
+        depth = 1
+        while depth:
+            event = self.next()
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+
+    def mapping_items(self):
+        """Yield (key, value_event) pairs of the current mapping
+
+        The caller must consume or skip() each value before asking for the
+        next pair. Non-scalar keys are skipped.
+        """
+        while True:
+            event = self.next()
+            if isinstance(event, yaml.MappingEndEvent):
+                return
+            if not isinstance(event, yaml.ScalarEvent):
+                self.skip(event)
+                self.skip(self.next())
+                continue
+            yield event.value, self.next()
+
+    def sequence_items(self):
+        """Yield the first event of each item in the current sequence"""
+        while True:
+            event = self.next()
+            if isinstance(event, yaml.SequenceEndEvent):
+                return
+            yield event
+
+
+def normalize_snippet(text):
+    """Collapse whitespace runs so formatting-only edits keep a snippet stable"""
+    return ' '.join(text.split()) or None
+
+
+def _code_snip_line(code_snip, line_number):
+    """Return the line numbered line_number of a codeSnip ('<n>  <code>' lines), or None"""
+    marker = f"{line_number}  "
+    for line in code_snip.split('\n'):
+        stripped = line.lstrip()
+        if stripped.startswith(marker) or stripped == str(line_number):
+            return stripped[len(marker):]
+    return None
+
+
+def incident_snippet(line_number, code_snip=None, matching_text=None):
+    """Return the normalized code an incident matched, or None
+
+    Prefers the matchingText variable; otherwise takes the incident's own
+    line from codeSnip, whose other lines are only context.
+    """
+    if isinstance(matching_text, str):
+        return normalize_snippet(matching_text)
+    if isinstance(code_snip, str) and line_number is not None:
+        line = _code_snip_line(code_snip, line_number)
+        if line is not None:
+            return normalize_snippet(line)
+    return None
+
+
+def _read_matching_text(reader):
+    """Read an incident's variables mapping, returning its matchingText scalar"""
+    matching_text = None
+    for key, event in reader.mapping_items():
+        if key == 'matchingText' and isinstance(event, yaml.ScalarEvent):
+            matching_text = _scalar(event)
+        else:
+            reader.skip(event)
+    return matching_text
+
+
+def _read_incident(reader, with_messages):
+    """Read one incident mapping, returning (uri, line_number, message, snippet, matching_text)
+
+    message, snippet and matching_text are only read with_messages.
+    """
+    uri = line_number = message = code_snip = matching_text = None
+    for key, event in reader.mapping_items():
+        if (key == 'variables' and with_messages
+                and isinstance(event, yaml.MappingStartEvent)):
+            matching_text = _read_matching_text(reader)
+        elif not isinstance(event, yaml.ScalarEvent):
+            reader.skip(event)
+        elif key == 'uri':
+            uri = _scalar(event)
+        elif key == 'lineNumber':
+            line_number = _int_scalar(event)
+        elif key == 'message' and with_messages:
+            message = _scalar(event)
+        elif key == 'codeSnip' and with_messages:
+            code_snip = _scalar(event)
+    snippet = incident_snippet(line_number, code_snip, matching_text) if with_messages else None
+    if not isinstance(matching_text, str):
+        matching_text = None
+    return uri, line_number, message, snippet, matching_text
+
+
+def _read_labels(reader):
+    """Read a sequence of label scalars"""
+    labels = []
+    for item in reader.sequence_items():
+        if isinstance(item, yaml.ScalarEvent):
+            labels.append(item.value)
+        else:
+            reader.skip(item)
+    return labels
+
+
+def _read_violation(reader, output, ruleset_name, rule_id, with_messages, ruleset_labels=()):
+    """Read one violation mapping into a Rule
+
+    ruleset_labels are added to the rule's own labels (a rule matches a
+    selector on its ruleset's labels, as in Kantra).
+    """
+    description = 'No description'
+    category = None
+    effort = None
+    labels = []
+    incidents = []
+
+    for key, event in reader.mapping_items():
+        if key == 'incidents' and isinstance(event, yaml.SequenceStartEvent):
+            for item in reader.sequence_items():
+                if isinstance(item, yaml.MappingStartEvent):
+                    incidents.append(_read_incident(reader, with_messages))
+                else:
+                    reader.skip(item)
+        elif key == 'labels' and isinstance(event, yaml.SequenceStartEvent):
+            labels = _read_labels(reader)
+        elif not isinstance(event, yaml.ScalarEvent):
+            reader.skip(event)
+        elif key == 'description':
+            description = _scalar(event)
+        elif key == 'category':
+            category = _scalar(event)
+        elif key == 'effort':
+            effort = _int_scalar(event)
+
+    labels.extend(label for label in ruleset_labels if label not in labels)
+
+    # effort (and possibly category) follow the incidents list, so the rule
+    # is only built once the whole violation has been read
+    rule = output.new_rule(ruleset_name, rule_id, description, category, effort, labels)
+    for uri, line_number, message, snippet, matching_text in incidents:
+        output.add_incident(rule, uri, line_number, message, snippet, matching_text)
+    return rule
+
+
+def iter_rules(output_file, output=None, with_messages=False, backend=None):
+    """Stream the violations of a Kantra output.yaml as Rules
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        output: KantraOutput whose string tables the rules use (a new one if None);
+                rules are not added to output.rules
+        with_messages: Keep incident message text and snippets (skipped by default)
+        backend: YAML backend ('auto', 'libyaml' or 'python')
+
+    Yields one Rule (with its incidents) per violation, in file order. A
+    ruleset's labels are merged into its rules' labels when they precede its
+    violations; rules are yielded as soon as they are read, so labels
+    listed after the violations are not applied.
+    Raises EmptyOutputError / KantraOutputError for unusable documents and
+    the usual OSError / yaml.YAMLError for unreadable files.
+    """
+    with open(output_file, 'r', encoding='utf-8') as f:
+        yield from _iter_stream_rules(f, output_file, output, with_messages, backend)
+
+
+def _iter_stream_rules(stream, source, output=None, with_messages=False, backend=None):
+    """iter_rules() over an open text stream; source names it in errors"""
+    if output is None:
+        output = KantraOutput()
+
+    reader = _EventReader(stream, backend)
+
+    event = reader.next()  # StreamStart
+    event = reader.next()
+    if isinstance(event, yaml.StreamEndEvent):
+        raise EmptyOutputError(source)
+
+    event = reader.next()  # root node
+    if isinstance(event, yaml.ScalarEvent) and _scalar(event) is None:
+        raise EmptyOutputError(source)
+    if not isinstance(event, yaml.SequenceStartEvent):
+        raise KantraOutputError(source)
+
+    for item in reader.sequence_items():
+        if not isinstance(item, yaml.MappingStartEvent):
+            reader.skip(item)
+            continue
+
+        ruleset_name = 'Unknown'
+        ruleset_labels = ()
+        for key, event in reader.mapping_items():
+            if key == 'name' and isinstance(event, yaml.ScalarEvent):
+                ruleset_name = _scalar(event)
+            elif key == 'labels' and isinstance(event, yaml.SequenceStartEvent):
+                ruleset_labels = _read_labels(reader)
+            elif key == 'violations' and isinstance(event, yaml.MappingStartEvent):
+                for rule_id, violation in reader.mapping_items():
+                    if isinstance(violation, yaml.MappingStartEvent):
+                        yield _read_violation(reader, output, ruleset_name, rule_id,
+                                              with_messages, ruleset_labels)
+                    else:
+                        reader.skip(violation)
+            else:
+                reader.skip(event)
+
+
+def iter_incidents(output_file, with_messages=False, backend=None):
+    """Stream Incidents from a Kantra output.yaml, in file order"""
+    for rule in iter_rules(output_file, with_messages=with_messages, backend=backend):
+        yield from rule.incidents
+
+
+def read_output(output_file, with_messages=False, backend=None, jobs=1):
+    """Parse a Kantra output.yaml into a KantraOutput (see iter_rules)
+
+    With jobs > 1, large files are parsed in parallel shards (see
+    parallel_read_output); the result is the same as a serial parse.
+    """
+    if resolve_jobs(jobs) > 1:
+        output = parallel_read_output(output_file, with_messages, backend, jobs)
+        if output is not None:
+            return output
+
+    output = KantraOutput()
+    output.rules.extend(iter_rules(output_file, output, with_messages, backend))
+    return output
+
+
+# Parallel sharded parsing
+#
+# Kantra writes output.yaml as a block sequence of rulesets, each starting with
+# a '- name: ...' line, with every violation of a ruleset a 4-space-indented
+# key under its '  violations:' line. Those line boundaries are found with a
+# byte scan (no YAML parsing), and the file is cut into shards that are each a
+# valid YAML document on their own:
+#
+#   ruleset units:   the ruleset with its violations replaced by '{}'
+#   violation units: '- name: <ruleset>' + '  violations:' + a run of violations
+#
+# Shards are parsed in a process pool and merged in file order, so dict key
+# order, duplicate-key handling and rule order are the same as a serial parse.
+# Files whose layout is not recognized are parsed serially.
+
+MIN_SHARD_BYTES = 1 << 20
+SHARDS_PER_JOB = 4
+
+
+def resolve_jobs(jobs):
+    """Return the worker count for a --jobs value (0 or None = all CPUs)"""
+    if not jobs:
+        return os.cpu_count() or 1
+    return max(1, jobs)
+
+
+def _line_indent(line):
+    """Return (indent, content) of a line, or (None, None) for blank/comment lines"""
+    content = line.lstrip(b' ')
+    if not content.strip() or content.startswith(b'#'):
+        return None, None
+    return len(line) - len(content), content
+
+
+def scan_rulesets(output_file):
+    """Find ruleset and violation boundaries in a Kantra output.yaml
+
+    Returns a list of dicts with the byte offsets of each ruleset ('start',
+    'end'), its name line, the '  violations:' block ('violations_line',
+    'violations_start', 'violations_end'), the start offset of every
+    violation in it ('entries') and the (start, end) range of a 'labels:'
+    key that precedes the violations ('labels', or None). Returns None if
+    the file does not have the layout Kantra writes, in which case it must
+    be parsed serially.
+    """
+    rulesets = []
+    ruleset = None
+    in_violations = False
+    labels_start = None
+    check_name = False
+    offset = 0
+
+    with open(output_file, 'rb') as f:
+        for line in f:
+            start, offset = offset, offset + len(line)
+            indent, content = _line_indent(line)
+            if indent is None:
+                continue
+
+            # a 'labels:' block ends at the next key or ruleset ('  - x' lines are its items)
+            if labels_start is not None and (
+                    indent == 0 or (indent == 2 and not content.startswith(b'-'))):
+                ruleset['labels'] = (labels_start, start)
+                labels_start = None
+
+            if indent == 0:
+                if not line.startswith(b'- name: '):
+                    return None
+                if ruleset is not None:
+                    ruleset['end'] = start
+                    if in_violations:
+                        ruleset['violations_end'] = start
+                ruleset = {'start': start, 'name_line': line.rstrip(b'\r\n') + b'\n',
+                           'violations_line': None, 'entries': [], 'labels': None}
+                rulesets.append(ruleset)
+                in_violations = False
+                check_name = True
+                continue
+
+            if check_name:
+                # the name must be a one-line scalar to be repeated in violation units
+                if indent != 2:
+                    return None
+                check_name = False
+
+            if indent == 2:
+                # '  - item' lines belong to compact sequences such as 'unmatched:'
+                if content.startswith(b'? ') or (in_violations and content.startswith(b'-')):
+                    return None
+                if in_violations:
+                    ruleset['violations_end'] = start
+                    in_violations = False
+                if content.startswith(b'labels:') and ruleset['violations_line'] is None:
+                    labels_start = start
+                if line.rstrip() == b'  violations:':
+                    if ruleset['violations_line'] is not None:
+                        return None
+                    ruleset['violations_line'] = start
+                    ruleset['violations_start'] = offset
+                    in_violations = True
+            elif in_violations and indent < 6:
+                if indent != 4 or content.startswith((b'-', b'? ')):
+                    return None
+                ruleset['entries'].append(start)
+
+    if ruleset is not None:
+        ruleset['end'] = offset
+        if in_violations:
+            ruleset['violations_end'] = offset
+        if labels_start is not None:
+            ruleset['labels'] = (labels_start, offset)
+    return rulesets
+
+
+def _shard_units(rulesets, shard_bytes, with_rulesets):
+    """Cut scanned rulesets into units of ('ruleset'|'violations', index, parts)
+
+    parts are literal bytes or (start, end) file ranges that concatenate to a
+    one-item YAML sequence.
+    """
+    for index, ruleset in enumerate(rulesets):
+        entries = ruleset['entries']
+        if with_rulesets:
+            if entries:
+                parts = [(ruleset['start'], ruleset['violations_line']),
+                         b'  violations: {}\n',
+                         (ruleset['violations_end'], ruleset['end'])]
+            else:
+                parts = [(ruleset['start'], ruleset['end'])]
+            yield 'ruleset', index, parts
+
+        # violation units repeat the ruleset's labels, which apply to its rules
+        labels = [ruleset['labels']] if ruleset['labels'] else []
+        bounds = entries + [ruleset['violations_end']] if entries else []
+        first = 0
+        for last in range(1, len(bounds)):
+            if bounds[last] - bounds[first] >= shard_bytes or last == len(bounds) - 1:
+                yield 'violations', index, [ruleset['name_line'], *labels, b'  violations:\n',
+                                            (bounds[first], bounds[last])]
+                first = last
+
+
+def plan_shards(output_file, jobs, with_rulesets=True):
+    """Split output_file into shards for parallel parsing
+
+    Returns a list of shards (each a list of units, see _shard_units) in file
+    order, or None if the file should be parsed serially.
+    """
+    size = os.path.getsize(output_file)
+    shard_bytes = max(MIN_SHARD_BYTES, size // (resolve_jobs(jobs) * SHARDS_PER_JOB))
+    if size < 2 * shard_bytes:
+        return None
+
+    rulesets = scan_rulesets(output_file)
+    if not rulesets:
+        return None
+
+    shards = [[]]
+    shard_size = 0
+    for unit in _shard_units(rulesets, shard_bytes, with_rulesets):
+        if shard_size >= shard_bytes:
+            shards.append([])
+            shard_size = 0
+        shards[-1].append(unit)
+        shard_size += sum(part[1] - part[0] for part in unit[2] if isinstance(part, tuple))
+
+    return shards if len(shards) > 1 else None
+
+
+def _read_shard(output_file, units):
+    chunks = []
+    with open(output_file, 'rb') as f:
+        for _, _, parts in units:
+            for part in parts:
+                if isinstance(part, bytes):
+                    chunks.append(part)
+                else:
+                    f.seek(part[0])
+                    chunks.append(f.read(part[1] - part[0]))
+    return b''.join(chunks).decode('utf-8')
+
+
+def _load_shard(output_file, units, backend):
+    """Worker: parse a shard into plain Python objects, one item per unit"""
+    data, _ = safe_load(_read_shard(output_file, units), backend)
+    if not isinstance(data, list) or len(data) != len(units):
+        raise KantraOutputError(output_file)
+    return data
+
+
+def _read_shard_output(output_file, units, with_messages, backend):
+    """Worker: stream a shard of violation units into an encoded KantraOutput"""
+    output = KantraOutput()
+    output.rules.extend(_iter_stream_rules(io.StringIO(_read_shard(output_file, units)),
+                                           output_file, output, with_messages, backend))
+    return _encode_output(output)
+
+
+def _map_shards(worker, output_file, shards, jobs, *args):
+    """Run worker over every shard in a process pool, returning results in shard order"""
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=min(resolve_jobs(jobs), len(shards))) as pool:
+        futures = [pool.submit(worker, output_file, units, *args) for units in shards]
+        return [future.result() for future in futures]
+
+
+def parallel_load(output_file, backend=None, jobs=0):
+    """Fully load an output.yaml by parsing shards in parallel
+
+    Returns the same list of rulesets as safe_load() on the whole file, or
+    None if the file is too small or its layout is not recognized (parse it
+    serially then). Shards that fail to parse also return None, so the serial
+    parse reports the error with the right line numbers.
+    """
+    shards = plan_shards(output_file, jobs)
+    if shards is None:
+        return None
+
+    _require_yaml()
+    try:
+        results = _map_shards(_load_shard, output_file, shards, jobs, backend)
+    except (yaml.YAMLError, KantraOutputError, UnicodeDecodeError):
+        return None
+
+    rulesets = []
+    violations = {}
+    for units, items in zip(shards, results):
+        for (kind, index, _), item in zip(units, items):
+            if kind == 'ruleset':
+                rulesets.append(item)
+            else:
+                violations.setdefault(index, {}).update(item['violations'])
+
+    for index, merged in violations.items():
+        rulesets[index]['violations'] = merged
+    return rulesets
+
+
+def _merge_encoded(output, rules, strings, messages):
+    """Append an encoded shard (see _encode_output) to output, re-interning its strings"""
+    strings = [output.strings.intern(value) for value in strings]
+    message_ids = [output.messages.id(message) for message in messages]
+    for ruleset, rule_id, description, category, effort, labels, incidents in rules:
+        rule = Rule(strings[ruleset], strings[rule_id], description, strings[category], effort,
+                    [strings[label] for label in labels])
+        rule.incidents = [
+            Incident(rule, strings[uri], line_number,
+                     message_ids[message_id] if message_id >= 0 else -1, strings[snippet],
+                     strings[matching_text])
+            for uri, line_number, message_id, snippet, matching_text in incidents
+        ]
+        output.rules.append(rule)
+
+
+def parallel_read_output(output_file, with_messages=False, backend=None, jobs=0):
+    """read_output() with the violations parsed in parallel shards
+
+    Returns None when the file should be parsed serially (see parallel_load).
+    """
+    shards = plan_shards(output_file, jobs, with_rulesets=False)
+    if shards is None:
+        return None
+
+    _require_yaml()
+    try:
+        results = _map_shards(_read_shard_output, output_file, shards, jobs,
+                              with_messages, backend)
+    except (yaml.YAMLError, KantraOutputError, UnicodeDecodeError):
+        return None
+
+    output = KantraOutput()
+    for payload in results:
+        _merge_encoded(output, *payload)
+    return output
+
+
+CACHE_SUFFIX = '.idx'
+CACHE_MAGIC = b'KANTRAIDX'
+CACHE_VERSION = 6
+
+
+def cache_path(output_file):
+    """Return the sidecar cache path for an output.yaml"""
+    return f"{output_file}{CACHE_SUFFIX}"
+
+
+def output_fingerprint(output_file, cached=None):
+    """Return (path, size, mtime_ns, content_hash) identifying an output.yaml
+
+    cached is a fingerprint recorded earlier; when the file's path, size and
+    mtime still match it, its content hash is reused instead of re-reading
+    the whole file.
+    """
+    stat = os.stat(output_file)
+    key = (os.path.abspath(output_file), stat.st_size, stat.st_mtime_ns)
+    if cached is not None and tuple(cached[:3]) == key:
+        return tuple(cached)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(output_file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return key + (digest.hexdigest(),)
+
+
+def fingerprint_matches(cached, fingerprint):
+    """Return True if a recorded fingerprint describes the same content
+
+    Only the content hash is compared, so a file that was touched or copied
+    without changing still matches.
+    """
+    return cached is not None and len(cached) == 4 and cached[3] == fingerprint[3]
+
+
+def _encode_output(output):
+    """Flatten a KantraOutput into marshal-friendly tuples of string ids"""
+    string_id = output.strings.id
+    rules = []
+    for rule in output.rules:
+        rules.append((
+            string_id(rule.ruleset), string_id(rule.rule_id), rule.description,
+            string_id(rule.category), rule.effort,
+            tuple(string_id(label) for label in rule.labels),
+            [(string_id(incident.uri), incident.line_number, incident.message_id,
+              string_id(incident.snippet), string_id(incident.matching_text))
+             for incident in rule.incidents]
+        ))
+    return rules, output.strings.values, output.messages.values
+
+
+def _decode_output(rules, strings, messages):
+    output = KantraOutput(StringTable(strings), StringTable(messages))
+    strings = output.strings.values
+    for ruleset, rule_id, description, category, effort, labels, incidents in rules:
+        rule = Rule(strings[ruleset], strings[rule_id], description, strings[category], effort,
+                    [strings[label] for label in labels])
+        rule.incidents = [
+            Incident(rule, strings[uri], line_number, message_id, strings[snippet],
+                     strings[matching_text])
+            for uri, line_number, message_id, snippet, matching_text in incidents
+        ]
+        output.rules.append(rule)
+    return output
+
+
+def read_cache(output_file, with_messages=True):
+    """Return (output, fingerprint) for output_file's sidecar cache
+
+    output is the cached KantraOutput, or None if the cache is missing, stale
+    or unreadable; a cache written without messages does not answer
+    with_messages. fingerprint is output_file's current fingerprint, computed
+    without hashing the file when the cache's size and mtime still match.
+    """
+    try:
+        with open(cache_path(output_file), 'rb') as f:
+            blob = f.read()
+    except OSError:
+        blob = b''
+
+    cached = None
+    if blob.startswith(CACHE_MAGIC):
+        try:
+            version, cached, has_messages, payload = marshal.loads(blob[len(CACHE_MAGIC):])
+            cached = tuple(cached) if version == CACHE_VERSION else None
+        except Exception:
+            cached = None
+
+    fingerprint = output_fingerprint(output_file, cached)
+    if not fingerprint_matches(cached, fingerprint) or (with_messages and not has_messages):
+        return None, fingerprint
+    try:
+        output = _decode_output(*payload)
+    except Exception:
+        # a well-formed marshal payload of the wrong shape is as good as missing
+        return None, fingerprint
+    if fingerprint != cached:
+        # same content under a new mtime: record it so the next lookup skips the hash
+        _write_cache_blob(output_file, (CACHE_VERSION, fingerprint, has_messages, payload))
+    return output, fingerprint
+
+
+def write_cache(output_file, fingerprint, output, with_messages=True):
+    """Atomically write the sidecar cache; returns False if it could not be written
+
+    with_messages records whether output was read with messages and snippets.
+
+    The cache is written to a temporary file and renamed into place, so
+    concurrent readers see either the old or the new cache, never a partial one.
+    Concurrent writers race harmlessly: the last rename wins.
+    """
+    return _write_cache_blob(output_file, (CACHE_VERSION, fingerprint, bool(with_messages),
+                                           _encode_output(output)))
+
+
+def _write_cache_blob(output_file, record):
+    import tempfile
+
+    target = cache_path(output_file)
+    blob = CACHE_MAGIC + marshal.dumps(record)
+
+    try:
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(target) + '.',
+                                        dir=os.path.dirname(os.path.abspath(target)))
+    except OSError:
+        return False
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(blob)
+        os.replace(tmp_path, target)
+        return True
+    except OSError:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+
+def load_output(output_file, backend=None, use_cache=True, jobs=1, with_messages=True):
+    """Return the KantraOutput for an output.yaml
+
+    Reads the sidecar cache when it matches the file's content (and holds
+    messages, if with_messages); the file is only hashed when its size or
+    mtime differ from the cache's. Otherwise streams the YAML (in parallel
+    with jobs > 1) and (re)writes the cache. Without messages,
+    message bodies, codeSnip and matchingText are skipped by the parser.
+
+    Returns (output, cache_status) where cache_status is 'hit', 'written',
+    'unwritable' or 'disabled'.
+    """
+    if not use_cache:
+        return read_output(output_file, with_messages, backend, jobs), 'disabled'
+
+    output, fingerprint = read_cache(output_file, with_messages)
+    if output is not None:
+        return output, 'hit'
+
+    output = read_output(output_file, with_messages, backend, jobs)
+    written = write_cache(output_file, fingerprint, output, with_messages)
+    return output, 'written' if written else 'unwritable'
+
+
+def stream_output(output_file, backend=None, use_cache=True, with_messages=True):
+    """Return (rules, cache_status) for streaming the Rules of an output.yaml
+
+    rules is an iterator over the output's Rules (with messages, if
+    with_messages; see load_output). On a cache
+    hit they come from the sidecar cache ('hit'). Otherwise each Rule is
+    yielded as soon as the parser finishes it ('miss'), and the cache is
+    written once the whole file has been read; with use_cache=False nothing
+    is cached ('disabled'). Parse errors are raised while iterating.
+    """
+    if not use_cache:
+        return iter_rules(output_file, with_messages=with_messages, backend=backend), 'disabled'
+
+    output, fingerprint = read_cache(output_file, with_messages)
+    if output is not None:
+        return iter(output.rules), 'hit'
+
+    def rules():
+        output = KantraOutput()
+        for rule in iter_rules(output_file, output, with_messages, backend):
+            output.rules.append(rule)
+            yield rule
+        write_cache(output_file, fingerprint, output, with_messages)
+
+    return rules(), 'miss'
@@ -0,0 +1,168 @@
+"""
+Kantra Manifest
+Workspace cache of per-round issue summaries for persistent_issues_analyzer.py.
+
+Old rounds of a migration workspace never change, yet every persistent
+issues check used to re-parse all of them. RoundManifest keeps the summary
+of each round output (per rule: description, category, ruleset, incident
+count, affected files and messages) in one JSON file at the workspace root,
+keyed by the output's path relative to the workspace together with its size
+and mtime. A check then parses only new or changed output.yaml files, so its
+cost grows with the number of new rounds rather than all rounds.
+
+Each round is stored compactly: file paths and messages go into a per-round
+string table and issues refer to them by index. The incident fingerprints
+used by kantra_tracking are kept as integers: (file id, line, snippet
+digest) triples per rule.
+"""
+
+import json
+import os
+
+from kantra_model import StringTable
+
+
+MANIFEST_NAME = '.kantra-rounds.json'
+MANIFEST_VERSION = 2
+
+
+def manifest_path(base_dir):
+    """Return the round manifest path of a workspace"""
+    return os.path.join(base_dir, MANIFEST_NAME)
+
+
+def stat_key(path):
+    """Return (size, mtime_ns) of a file, the key a cached round is valid for"""
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def encode_issues(issues):
+    """Encode extract_issues_from_file() output as (strings, rows)
+
+    Incidents are flattened to [file id, line, digest, file id, ...] with
+    file id -1 for an incident without a file.
+    """
+    table = StringTable()
+    string_id = table.id
+
+    rows = []
+    for rule_id, data in issues.items():
+        incidents = []
+        for path, line_number, digest in data['incidents']:
+            incidents.extend((-1 if path is None else string_id(path), line_number, digest))
+        rows.append([rule_id, data['description'], data['category'], data['ruleset'],
+                     data['incident_count'],
+                     [string_id(path) for path in data['files_affected']],
+                     [string_id(message) for message in data['incident_messages']],
+                     incidents])
+    return table.values, rows
+
+
+def decode_issues(strings, rows):
+    """Rebuild extract_issues_from_file() output from encode_issues()"""
+    def incident_triples(flat):
+        return [(None if flat[i] < 0 else strings[flat[i]], flat[i + 1], flat[i + 2])
+                for i in range(0, len(flat), 3)]
+
+    return {
+        rule_id: {
+            'description': description,
+            'category': category,
+            'ruleset': ruleset,
+            'incident_count': incident_count,
+            'files_affected': [strings[i] for i in files],
+            'incident_messages': [strings[i] for i in messages],
+            'incidents': incident_triples(incidents),
+        }
+        for (rule_id, description, category, ruleset, incident_count, files, messages,
+             incidents) in rows
+    }
+
+
+class RoundManifest:
+    """Cached round summaries of one workspace
+
+    get() returns the cached issues of a round output when its size and
+    mtime still match, put() records freshly parsed ones, and save() writes
+    the manifest back, dropping rounds that were not seen in this run.
+    """
+
+    def __init__(self, base_dir):
+        self.base_dir = base_dir
+        self.path = manifest_path(base_dir)
+        self._rounds = {}
+        self._seen = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(cached, dict) and cached.get('version') == MANIFEST_VERSION:
+            self._rounds = cached.get('rounds') or {}
+
+    def _key(self, yaml_file):
+        return os.path.relpath(yaml_file, self.base_dir)
+
+    def get(self, yaml_file):
+        """Return the cached issues of a round output, or None if missing or stale"""
+        key = self._key(yaml_file)
+        try:
+            size, mtime_ns = stat_key(yaml_file)
+        except OSError:
+            return None
+        entry = self._rounds.get(key)
+        if (entry is None or entry.get('size') != size
+                or entry.get('mtime_ns') != mtime_ns):
+            self.misses += 1
+            return None
+
+        self._seen[key] = entry
+        self.hits += 1
+        return decode_issues(entry['strings'], entry['issues'])
+
+    def put(self, yaml_file, key, issues):
+        """Record the issues parsed from a round output
+
+        key is the (size, mtime_ns) taken before parsing, so a file that
+        changes while it is parsed is parsed again next time.
+        """
+        strings, rows = encode_issues(issues)
+        self._seen[self._key(yaml_file)] = {
+            'size': key[0],
+            'mtime_ns': key[1],
+            'strings': strings,
+            'issues': rows,
+        }
+        self._dirty = True
+
+    def save(self):
+        """Atomically write the manifest; returns False if it could not be written"""
+        if not self._dirty and self._seen.keys() == self._rounds.keys():
+            return True
+
+        import tempfile
+
+        document = {'version': MANIFEST_VERSION, 'rounds': self._seen}
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=MANIFEST_NAME + '.', dir=self.base_dir)
+        except OSError:
+            return False
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(document, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+        self._rounds = dict(self._seen)
+        self._dirty = False
+        return True
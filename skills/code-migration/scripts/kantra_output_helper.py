@@ -6,223 +6,1440 @@ Analyze Kantra migration analysis results from output.yaml
 Commands:
   analyze - Get overview of all issues (JSON by default)
   file    - Get detailed issues for a specific file
+  range   - Get the incidents on a line range of a file
+  graph   - Find rules that affect the same files (co-occurrence)
+  plan    - Draft status.md fix groups from rules that share files
+  partition - Split the work into file-disjoint packages for parallel fixers
+  rollup  - Incident, file and effort totals by category, label and directory
+  diff    - Incidents fixed, new and unchanged between two outputs
+  index   - Build a SQLite index of output.yaml
+  query   - Answer 'analyze' / 'file' from a SQLite index
+  serve   - Keep outputs in memory and answer queries over a Unix socket
 
 Use 'analyze' to understand the scope of migration work.
 Use 'file' to drill down into issues for a specific file when ready to fix.
 """
 
-import yaml
+import os
 import sys
 import json
 import argparse
-from pathlib import Path
-from collections import defaultdict
 
+# yaml, sqlite3 and socket are imported on demand (see kantra_loader,
+# kantra_index and kantra_daemon): a query answered from the sidecar cache
+# or the daemon never loads them, which keeps startup fast in tight loops.
+from kantra_loader import (
+    YAML_BACKENDS, EmptyOutputError, KantraOutputError, YAMLBackendError,
+    cache_path, get_safe_loader, load_output, parallel_load, read_output, resolve_jobs,
+    safe_load, stream_output,
+)
+from kantra_compact import (
+    analysis_roots, analysis_units, compact_analysis, compact_file_results, dumps,
+    file_results_roots, file_units, fit_to_budget, project_paths, truncate_analysis,
+    truncate_file_results,
+)
+from kantra_diff import DEFAULT_LINE_TOLERANCE, diff_outputs
+from kantra_graph import (
+    DEFAULT_MAX_GROUP_RULES, DEFAULT_MIN_JACCARD, DEFAULT_MIN_SHARED, DEFAULT_TOP_PAIRS,
+    plan_groups, rule_graph,
+)
+from kantra_labels import LabelIndex, LabelSelector, LabelSelectorError
+from kantra_partition import file_workloads, partition_workloads
+from kantra_rollup import ROLLUP_DIMENSIONS, load_rollup, rollup_path
+from kantra_daemon import OutputStore, default_socket_path, print_response, send_request, serve
+from kantra_index import (
+    FileIndex, KantraIndexError, build_sqlite_index, open_sqlite_index, query_file_paths,
+    query_file_rule_messages, query_project_keys, query_rule_files, sqlite_index_path,
+)
 
-def load_kantra_output(output_file):
+
+def report_load_error(output_file, error):
+    """Print a helpful message for a Kantra output file that could not be read"""
+    if isinstance(error, EmptyOutputError):
+        print(f"Error: Kantra output file is empty: {output_file}", file=sys.stderr)
+        print(f"Suggestion: Check that Kantra analysis completed successfully.", file=sys.stderr)
+    elif isinstance(error, KantraOutputError):
+        print(f"Error: Invalid Kantra output format in {output_file}", file=sys.stderr)
+        print(f"Expected: List of rulesets with violations", file=sys.stderr)
+    elif isinstance(error, FileNotFoundError):
+        print(f"Error: Kantra output file not found: {output_file}", file=sys.stderr)
+        print(f"Suggestion: Verify Kantra analysis completed. Expected path format: <workspace>/kantra-output/output.yaml", file=sys.stderr)
+    elif isinstance(error, PermissionError):
+        print(f"Error: Permission denied accessing: {output_file}", file=sys.stderr)
+        print(f"Suggestion: Check file permissions", file=sys.stderr)
+    elif isinstance(error, YAMLBackendError):
+        print(f"Error: {error}", file=sys.stderr)
+        print(f"Suggestion: Use --yaml-backend auto to fall back to the pure-Python loader.", file=sys.stderr)
+    elif 'yaml' in sys.modules and isinstance(error, sys.modules['yaml'].YAMLError):
+        print(f"Error: Invalid YAML format in {output_file}: {error}", file=sys.stderr)
+        print(f"Suggestion: File may be corrupted. Re-run Kantra analysis.", file=sys.stderr)
+    else:
+        print(f"Error: Unexpected error loading {output_file}: {error}", file=sys.stderr)
+
+
+def load_kantra_output(output_file, backend=None, verbose=False, jobs=1):
     """Load and parse the Kantra output.yaml file
 
-    Returns None if file cannot be loaded.
-    Prints helpful error messages to guide the agent.
-    """
-    try:
-        with open(output_file, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
+    Args:
+        output_file: Path to Kantra output.yaml
+        backend: YAML backend ('auto', 'libyaml' or 'python'); see kantra_loader
+        verbose: Report the YAML backend used on stderr
+        jobs: Worker processes for parsing large files in shards (1 = serial, 0 = all CPUs)
+
+    Returns None if file cannot be loaded.
+    Prints helpful error messages to guide the agent.
+    """
+    try:
+        data = None
+        if resolve_jobs(jobs) > 1:
+            data = parallel_load(output_file, backend, jobs)
+            if verbose and data is not None:
+                _, backend_name = get_safe_loader(backend)
+                print(f"Parsed {output_file} in parallel shards ({resolve_jobs(jobs)} jobs) "
+                      f"with {backend_name} YAML backend", file=sys.stderr)
+
+        if data is None:
+            with open(output_file, 'r', encoding='utf-8') as f:
+                data, backend_name = safe_load(f, backend)
+
+            if verbose:
+                print(f"Parsed {output_file} with {backend_name} YAML backend", file=sys.stderr)
+
+        if data is None:
+            raise EmptyOutputError(output_file)
+
+        if not isinstance(data, list):
+            raise KantraOutputError(output_file)
+
+        return data
+
+    except Exception as e:
+        report_load_error(output_file, e)
+        return None
+
+
+def read_kantra_output(output_file, with_messages=False, backend=None, verbose=False,
+                       use_cache=True, jobs=1):
+    """Return the KantraOutput model (see kantra_model) for a Kantra output.yaml
+
+    The file is streamed with the event-level reader from kantra_loader, so
+    codeSnip, matchingText and message bodies are only turned into Python
+    objects with_messages. With use_cache, the model comes from the
+    output.yaml.idx sidecar cache when it is up to date (and holds messages,
+    if needed); the cache is written otherwise.
+    With jobs > 1, large files are parsed in parallel shards.
+    Prints a helpful error and exits if the file cannot be read.
+    """
+    try:
+        if use_cache:
+            output, cache_status = load_output(output_file, backend, jobs=jobs,
+                                               with_messages=with_messages)
+            if verbose:
+                print(f"Cache {cache_status}: {cache_path(output_file)}", file=sys.stderr)
+            return output
+
+        if verbose:
+            _, backend_name = get_safe_loader(backend)
+            workers = f" ({resolve_jobs(jobs)} jobs)" if resolve_jobs(jobs) > 1 else ''
+            print(f"Streaming {output_file}{workers} with {backend_name} YAML backend",
+                  file=sys.stderr)
+        return read_output(output_file, with_messages, backend, jobs)
+
+    except Exception as e:
+        report_load_error(output_file, e)
+        sys.exit(1)
+
+
+def select_rules(rules, selector=None, label_index=None):
+    """Return the Rules matching a LabelSelector (all of them without one)
+
+    label_index is a LabelIndex over rules; one is built when not given.
+    """
+    if selector is None:
+        return rules
+    if label_index is None:
+        label_index = LabelIndex(rules)
+    positions = label_index.positions(selector)
+    return [rule for position, rule in enumerate(rules) if position in positions]
+
+
+def rule_files(rules):
+    """Yield (rule_id, description, files) for each Rule (e.g. KantraOutput.rules)"""
+    for rule in rules:
+        # Collect unique files affected by this rule
+        files_affected = set()
+        for incident in rule.incidents:
+            file_path = incident.file_path
+            if file_path:
+                files_affected.add(file_path)
+
+        yield rule.rule_id, rule.description, files_affected
+
+
+def project_rule_files(rules):
+    """Return (roots, rule files) with files keyed by their path below their root
+
+    Like rule_files(), but a file Kantra reports under several prefixes
+    (see kantra_compact.project_paths) counts once.
+    """
+    rules_files = list(rule_files(rules))
+    roots, keys = project_paths(path for _, _, files in rules_files for path in files)
+    return roots, [(rule_id, description, {keys[path] for path in files})
+                   for rule_id, description, files in rules_files]
+
+
+class CursorError(ValueError):
+    """Raised for a --cursor that is malformed or belongs to another result"""
+
+
+CURSOR_VERSION = 1
+
+
+def _result_token(ranked):
+    """Checksum of the ranked rules, so a cursor cannot be used on another result"""
+    import zlib
+
+    token = 0
+    for count, _, rule_id, _, _ in ranked:
+        token = zlib.crc32(f"{rule_id}\t{count}\n".encode('utf-8'), token)
+    return token
+
+
+def encode_cursor(rule_position, file_offset, page_size, token):
+    """Return an opaque cursor for the page starting at rule_position/file_offset"""
+    import base64
+
+    state = json.dumps([CURSOR_VERSION, rule_position, file_offset, page_size, token],
+                       separators=(',', ':'))
+    return base64.urlsafe_b64encode(state.encode('ascii')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor, token):
+    """Return (rule_position, file_offset, page_size) from a cursor issued for token"""
+    import base64
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        version, rule_position, file_offset, page_size, cursor_token = json.loads(
+            base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise CursorError(f"Invalid cursor: {cursor}")
+    if version != CURSOR_VERSION or cursor_token != token:
+        raise CursorError("Cursor belongs to a different result (output.yaml or options changed)")
+    return rule_position, file_offset, page_size
+
+
+def summarize_issues(rule_files, top=None, page_size=None, cursor=None):
+    """Build the analyze result from (rule_id, description, files) tuples
+
+    Rules without affected files are dropped; the rest are ordered by
+    file_count descending (stable, so ties keep Kantra's rule order).
+
+    Args:
+        rule_files: Iterable of (rule_id, description, files)
+        top: Keep only the top rules, selected with a heap instead of a full sort
+        page_size: Return one page of at most page_size files; a rule with
+                   more files is split across pages ('files_offset' gives the
+                   position of its first listed file)
+        cursor: next_cursor of the previous page (implies its page size)
+
+    total_issues always counts every rule with affected files. Paged results
+    carry 'next_cursor' (None on the last page). Raises CursorError for a
+    cursor from another result.
+    """
+    ranked = []
+    for position, (rule_id, description, files_affected) in enumerate(rule_files):
+        if files_affected:  # Only include rules that affect files
+            ranked.append((-len(files_affected), position, rule_id, description,
+                           files_affected))
+    total_issues = len(ranked)
+
+    # Sort by file_count descending; (count, position) keys keep ties in Kantra order
+    if top is not None:
+        import heapq
+        ranked = heapq.nsmallest(top, ranked, key=lambda item: item[:2])
+    else:
+        ranked.sort(key=lambda item: item[:2])
+
+    if page_size is None and cursor is None:
+        return {
+            'total_issues': total_issues,
+            'issues': [{
+                'rule_id': rule_id,
+                'description': description,
+                'file_count': -count,
+                'files': sorted(files_affected)
+            } for count, _, rule_id, description, files_affected in ranked]
+        }
+
+    token = _result_token(ranked)
+    rule_position = file_offset = 0
+    if cursor is not None:
+        rule_position, file_offset, cursor_page_size = decode_cursor(cursor, token)
+        page_size = page_size or cursor_page_size
+
+    issues = []
+    remaining = page_size
+    while rule_position < len(ranked) and remaining > 0:
+        count, _, rule_id, description, files_affected = ranked[rule_position]
+        files = sorted(files_affected)[file_offset:file_offset + remaining]
+        issues.append({
+            'rule_id': rule_id,
+            'description': description,
+            'file_count': -count,
+            'files_offset': file_offset,
+            'files': files
+        })
+        remaining -= len(files)
+        file_offset += len(files)
+        if file_offset >= -count:
+            rule_position += 1
+            file_offset = 0
+
+    next_cursor = None
+    if rule_position < len(ranked):
+        next_cursor = encode_cursor(rule_position, file_offset, page_size, token)
+
+    return {
+        'total_issues': total_issues,
+        'issues': issues,
+        'next_cursor': next_cursor
+    }
+
+
+def format_analysis(result, compact=False, max_bytes=None):
+    """Serialize an analyze result as JSON
+
+    compact uses the kantra_compact encoding; max_bytes keeps as many files
+    as fit in the budget and sets has_more.
+    """
+    roots = analysis_roots(result) if compact else None
+
+    def render(units):
+        data = result if units is None else truncate_analysis(result, units)
+        return dumps(compact_analysis(data, roots) if compact else data, compact)
+
+    if max_bytes is None:
+        return render(None)
+    return fit_to_budget(render, analysis_units(result), max_bytes)
+
+
+def print_analysis(result, format_type='json', compact=False, max_bytes=None):
+    """Print an analyze result as JSON or as a text table"""
+    issues = result['issues']
+
+    if format_type == 'json':
+        print(format_analysis(result, compact, max_bytes))
+    else:
+        # Text format
+        print("=" * 80)
+        print("KANTRA MIGRATION ISSUES ANALYSIS")
+        print("=" * 80)
+        print(f"Total Issues: {result['total_issues']}")
+        print()
+
+        if issues:
+            print(f"{'Rule ID':<40} {'Files':<8} Description")
+            print("-" * 80)
+            for issue in issues:
+                print(f"{issue['rule_id']:<40} {issue['file_count']:<8} {issue['description']}")
+            print("=" * 80)
+        else:
+            print("No migration issues found.")
+
+        if result.get('next_cursor'):
+            print(f"More results: --cursor {result['next_cursor']}")
+
+
+SORT_BUFFER_BYTES = 16 << 20
+
+
+def _spill_run(run):
+    """Sort a run of (key, line) items and write it to a temporary file"""
+    import tempfile
+
+    run.sort(key=lambda item: item[0])
+    f = tempfile.TemporaryFile('w+', encoding='utf-8')
+    for key, line in run:
+        f.write(f"{key}\t{line}\n")
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    for row in f:
+        key, line = row.rstrip('\n').split('\t', 1)
+        yield int(key), line
+
+
+def external_sort(items, buffer_bytes=SORT_BUFFER_BYTES):
+    """Yield the lines of (key, line) items ordered by integer key, stably
+
+    At most buffer_bytes of lines are held in memory: each full buffer is
+    sorted and spilled to a temporary file, and the runs are combined with
+    heapq.merge (which keeps equal keys in input order). Lines must not
+    contain newlines, as is the case for compact JSON.
+    """
+    runs = []
+    buffer = []
+    size = 0
+    try:
+        for key, line in items:
+            buffer.append((key, line))
+            size += len(line)
+            if size >= buffer_bytes:
+                runs.append(_spill_run(buffer))
+                buffer, size = [], 0
+
+        buffer.sort(key=lambda item: item[0])
+        if runs:
+            import heapq
+            buffer = heapq.merge(*[_read_run(run) for run in runs], buffer,
+                                 key=lambda item: item[0])
+        for _, line in buffer:
+            yield line
+    finally:
+        for run in runs:
+            run.close()
+
+
+def print_ndjson_analysis(rule_files, sort_records=False, buffer_bytes=SORT_BUFFER_BYTES):
+    """Stream an analyze result as newline-delimited JSON
+
+    Prints one compact {"type": "issue", ...} record per rule that affects
+    files, as soon as the rule has been read, then a {"type": "summary"}
+    record with total_issues. With sort_records, issue records follow the
+    json format's order (file_count descending, ties in Kantra order), using
+    a bounded-memory external sort.
+    """
+    total_issues = 0
+
+    def records():
+        nonlocal total_issues
+        for rule_id, description, files_affected in rule_files:
+            if files_affected:  # Only include rules that affect files
+                total_issues += 1
+                yield -len(files_affected), json.dumps({
+                    'type': 'issue',
+                    'rule_id': rule_id,
+                    'description': description,
+                    'file_count': len(files_affected),
+                    'files': sorted(files_affected)
+                }, separators=(',', ':'))
+
+    if sort_records:
+        lines = external_sort(records(), buffer_bytes)
+    else:
+        lines = (line for _, line in records())
+
+    for line in lines:
+        print(line, flush=True)
+    print(json.dumps({'type': 'summary', 'total_issues': total_issues},
+                     separators=(',', ':')), flush=True)
+
+
+def print_ndjson_result(result):
+    """Print an analyze result (e.g. a page) as NDJSON issue and summary records"""
+    for issue in result['issues']:
+        print(json.dumps({'type': 'issue', **issue}, separators=(',', ':')))
+    summary = {'type': 'summary', 'total_issues': result['total_issues']}
+    if 'next_cursor' in result:
+        summary['next_cursor'] = result['next_cursor']
+    print(json.dumps(summary, separators=(',', ':')))
+
+
+def report_analysis(rule_files, format_type='json', sort_records=False, top=None,
+                    page_size=None, cursor=None, compact=False, max_bytes=None):
+    """Print the analyze view of (rule_id, description, files) tuples in format_type
+
+    top, page_size and cursor select part of the result (see summarize_issues);
+    an invalid cursor is reported as an error. compact and max_bytes apply to
+    the json format (see format_analysis).
+    """
+    if format_type == 'ndjson' and top is None and page_size is None and cursor is None:
+        print_ndjson_analysis(rule_files, sort_records)
+        return
+
+    try:
+        result = summarize_issues(rule_files, top, page_size, cursor)
+    except CursorError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print(f"Suggestion: Re-run without --cursor to start from the first page.",
+              file=sys.stderr)
+        sys.exit(1)
+
+    if format_type == 'ndjson':
+        print_ndjson_result(result)
+    else:
+        print_analysis(result, format_type, compact, max_bytes)
+
+
+def analyze_issues(output_file, format_type='json', backend=None, verbose=False,
+                   use_cache=True, jobs=1, sort_records=False, top=None, page_size=None,
+                   cursor=None, compact=False, max_bytes=None, labels=None):
+    """Analyze all issues in Kantra output
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        format_type: 'json', 'text' or 'ndjson' (one record per rule, streamed
+                     while output.yaml is parsed)
+        backend: YAML backend to parse with (default: auto)
+        verbose: Report the YAML backend and cache status on stderr
+        use_cache: Read/write the output.yaml.idx sidecar cache
+        jobs: Worker processes for parsing large files (1 = serial, 0 = all CPUs)
+        sort_records: For ndjson, emit records in the json format's order
+        top: Only return the top rules by file count
+        page_size: Return one page of at most this many files
+        cursor: Continue from the next_cursor of a previous page
+        compact: Use the compact encoding (shared path roots, rule/file id tables)
+        max_bytes: Truncate the JSON to this many bytes, setting has_more
+        labels: LabelSelector; only rules matching it are analyzed
+
+    Returns structured analysis of all migration issues.
+
+    IMPORTANT: Do NOT prioritize based on simple metrics like file_count.
+    Instead, analyze the full data to identify:
+    - Which issues are interdependent (must be fixed together or in sequence)
+    - Logical groupings that minimize rework and iterations
+    - Dependencies between issues (which must be fixed before others)
+    """
+    if (format_type == 'ndjson' and resolve_jobs(jobs) == 1
+            and top is None and page_size is None and cursor is None):
+        try:
+            rules, cache_status = stream_output(output_file, backend, use_cache,
+                                                with_messages=False)
+            if verbose:
+                print(f"Cache {cache_status}: {cache_path(output_file)}", file=sys.stderr)
+            if labels is not None:
+                rules = (rule for rule in rules if labels.matches(rule))
+            print_ndjson_analysis(rule_files(rules), sort_records)
+        except BrokenPipeError:
+            # the consumer stopped reading (e.g. piped into head)
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            sys.exit(1)
+        except Exception as e:
+            report_load_error(output_file, e)
+            sys.exit(1)
+        return
+
+    output = read_kantra_output(output_file, backend=backend, verbose=verbose,
+                                use_cache=use_cache, jobs=jobs)
+    report_analysis(rule_files(select_rules(output.rules, labels)), format_type, sort_records,
+                    top, page_size, cursor, compact, max_bytes)
+
+
+def print_graph(result, format_type='json'):
+    """Print a rule co-occurrence result as JSON or as text tables"""
+    if format_type == 'json':
+        print(json.dumps(result, indent=2))
+        return
+
+    print("=" * 80)
+    print("KANTRA RULE CO-OCCURRENCE")
+    print("=" * 80)
+    print(f"Rules: {result['total_rules']}  Files: {result['total_files']}  "
+          f"Related pairs (Jaccard >= {result['min_jaccard']}): {result['related_pairs']}")
+
+    if result['pairs']:
+        print()
+        print(f"{'Jaccard':<8} {'Shared':<7} Rules")
+        print("-" * 80)
+        for pair in result['pairs']:
+            print(f"{pair['jaccard']:<8} {pair['shared_files']:<7} {'  '.join(pair['rules'])}")
+
+    for number, cluster in enumerate(result['clusters'], 1):
+        print()
+        print(f"Cluster {number}: {len(cluster['rules'])} rules, {cluster['file_count']} files")
+        for rule_id in cluster['rules']:
+            print(f"  {rule_id}")
+    print("=" * 80)
+
+
+def analyze_rule_graph(output_file, min_jaccard=DEFAULT_MIN_JACCARD, top=DEFAULT_TOP_PAIRS,
+                       format_type='json', backend=None, verbose=False, use_cache=True, jobs=1):
+    """Find rules that affect the same files
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        min_jaccard: Jaccard similarity of two rules' file sets at or above
+                     which they count as related
+        top: Number of related rule pairs to list
+        format_type: 'json' or 'text'
+        backend, verbose, use_cache, jobs: As for analyze
+
+    Returns the most related rule pairs and the clusters of related rules,
+    a starting point for finding issues that should be fixed together.
+    """
+    output = read_kantra_output(output_file, backend=backend, verbose=verbose,
+                                use_cache=use_cache, jobs=jobs)
+    print_graph(rule_graph(rule_files(output.rules), min_jaccard, top), format_type)
+
+
+PLAN_MAX_FILES = 10
+
+
+def _group_name(rule_ids, prefix_length, max_parts=3):
+    """Name a group after its rule ids without the shared prefix and numeric suffix"""
+    parts = []
+    for rule_id in rule_ids:
+        stem = rule_id[prefix_length:].rstrip('0123456789').rstrip('-') or rule_id
+        if stem not in parts:
+            parts.append(stem)
+    name = ' + '.join(parts[:max_parts])
+    return name + (' + ...' if len(parts) > max_parts else '')
+
+
+def summarize_plan(groups, roots):
+    """Build the plan result from plan_groups() over project_rule_files(): named groups"""
+    rule_ids = [rule_id for group in groups for rule_id, _, _ in group['rules']]
+    prefix = os.path.commonprefix(rule_ids) if len(rule_ids) > 1 else ''
+    prefix_length = prefix.rfind('-') + 1
+
+    return {
+        'roots': [root for root in roots if root],
+        'total_groups': len(groups),
+        'groups': [{
+            'name': _group_name([rule_id for rule_id, _, _ in group['rules']], prefix_length),
+            'rules': [{'rule_id': rule_id, 'description': description, 'file_count': count}
+                      for rule_id, description, count in group['rules']],
+            'shared_files': group['shared_files'],
+            'files': group['files'],
+        } for group in groups],
+    }
+
+
+def print_plan(result, format_type='markdown', min_jaccard=DEFAULT_MIN_JACCARD):
+    """Print a plan as JSON or as the Groups / Group Details sections of status.md"""
+    if format_type == 'json':
+        print(json.dumps(result, indent=2))
+        return
+
+    groups = result['groups']
+    print("## Groups")
+    print()
+    for number, group in enumerate(groups, 1):
+        print(f"- [ ] Group {number}: {group['name']} - {group['rules'][0]['description']}")
+    print()
+    print("## Group Details")
+    for number, group in enumerate(groups, 1):
+        rules = group['rules']
+        print()
+        print(f"### Group {number}: {group['name']}")
+        if len(rules) > 1:
+            print(f"**Why grouped**: {len(rules)} rules share {group['shared_files']} of "
+                  f"{len(group['files'])} files (Jaccard >= {min_jaccard})")
+        else:
+            print(f"**Why grouped**: Single rule; no related rule (Jaccard >= {min_jaccard}) "
+                  "could join")
+        print("**Issues**:")
+        for rule in rules:
+            print(f"- {rule['rule_id']}: {rule['description']} ({rule['file_count']} files)")
+        files = group['files'][:PLAN_MAX_FILES]
+        more = len(group['files']) - len(files)
+        print(f"**Files**: [{', '.join(files)}{f', ... (+{more} more)' if more else ''}]")
+    if result['roots']:
+        print()
+        print(f"(File paths are relative to {' or '.join(result['roots'])})")
+
+
+def analyze_plan(output_file, min_jaccard=DEFAULT_MIN_JACCARD, min_shared=DEFAULT_MIN_SHARED,
+                 max_rules=DEFAULT_MAX_GROUP_RULES, format_type='markdown', backend=None,
+                 verbose=False, use_cache=True, jobs=1):
+    """Draft fix groups for status.md from rules that affect the same files
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        min_jaccard: Minimum Jaccard similarity of two rules' file sets to group them
+        min_shared: Minimum number of files two rules must share to group them
+        max_rules: Maximum number of rules per group
+        format_type: 'markdown' (status.md Groups and Group Details) or 'json'
+        backend, verbose, use_cache, jobs: As for analyze
+
+    The groups are a starting point: review them, and merge in build, lint
+    and test issues, before writing status.md.
+    """
+    output = read_kantra_output(output_file, backend=backend, verbose=verbose,
+                                use_cache=use_cache, jobs=jobs)
+    roots, rules_files = project_rule_files(output.rules)
+    groups = plan_groups(rules_files, min_jaccard, min_shared, max_rules)
+    print_plan(summarize_plan(groups, roots), format_type, min_jaccard)
+
+
+def worker_manifests(packages, roots):
+    """Build one JSON-ready manifest per work package (see partition_workloads)"""
+    manifests = []
+    for worker, package in enumerate(packages, 1):
+        manifests.append({
+            'worker': worker,
+            'workers': len(packages),
+            'roots': [root for root in roots if root],
+            'files': len(package),
+            'incidents': sum(workload['incidents'] for workload in package),
+            'effort': sum(workload['effort'] for workload in package),
+            'assignments': [{
+                'file': workload['file'],
+                'paths': workload['paths'],
+                'incidents': workload['incidents'],
+                'effort': workload['effort'],
+                'issues': [{
+                    'rule_id': rule.rule_id,
+                    'description': rule.description,
+                    'lines': sorted({incident.line_number for incident in incidents
+                                     if incident.line_number is not None}),
+                } for rule, incidents in workload['rules']],
+            } for workload in package],
+        })
+    return manifests
+
+
+def print_manifests(manifests, output_dir=None):
+    """Print one JSON manifest per line, or write worker-<n>.json files to output_dir"""
+    if output_dir is None:
+        for manifest in manifests:
+            print(json.dumps(manifest, separators=(',', ':')))
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+    for manifest in manifests:
+        path = os.path.join(output_dir, f"worker-{manifest['worker']}.json")
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2)
+            f.write('\n')
+        print(path)
+
+
+def partition_work(output_file, workers, output_dir=None, backend=None, verbose=False,
+                   use_cache=True, jobs=1):
+    """Split the incidents of an output into file-disjoint packages for parallel fixers
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        workers: Number of work packages
+        output_dir: Write worker-<n>.json manifests here instead of printing them
+        backend, verbose, use_cache, jobs: As for analyze
+
+    Each file is in exactly one package, so fixers working in parallel never
+    edit the same file; a file Kantra reports under several prefixes is one
+    assignment, with 'file' relative to its root and all its 'paths'.
+    Packages are balanced by summed rule effort (1 per
+    incident without effort), then incident count.
+    """
+    output = read_kantra_output(output_file, backend=backend, verbose=verbose,
+                                use_cache=use_cache, jobs=jobs)
+    roots, workloads = file_workloads(FileIndex(output))
+    packages = partition_workloads(workloads, workers)
+    print_manifests(worker_manifests(packages, roots), output_dir)
+
+
+def limit_rollup_depth(rollup, max_depth):
+    """Drop directory entries deeper than max_depth components"""
+    limited = dict(rollup)
+    limited['directory'] = {
+        directory: totals for directory, totals in rollup['directory'].items()
+        if directory.count('/') < max_depth
+    }
+    return limited
+
+
+def print_rollup(result, format_type='json'):
+    """Print a rollup as JSON or as one text table per dimension"""
+    if format_type == 'json':
+        print(json.dumps(result, indent=2))
+        return
+
+    totals = result['totals']
+    print("=" * 80)
+    print("KANTRA ROLLUP")
+    print("=" * 80)
+    print(f"Incidents: {totals['incidents']}  Files: {totals['files']}  "
+          f"Effort: {totals['effort']}")
+    if result['roots']:
+        print(f"Directories relative to: {' or '.join(result['roots'])}")
+
+    for dimension in ROLLUP_DIMENSIONS:
+        print()
+        print(f"{dimension.capitalize():<50} {'Incidents':>9} {'Files':>7} {'Effort':>7}")
+        print("-" * 80)
+        for key, value in result[dimension].items():
+            print(f"{key:<50} {value['incidents']:>9} {value['files']:>7} {value['effort']:>7}")
+    print("=" * 80)
+
+
+def rollup_output(output_file, max_depth=None, format_type='json', backend=None,
+                  verbose=False, use_cache=True, jobs=1):
+    """Summarize incidents, files and effort by category, label and directory
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        max_depth: Only list directories up to this many components deep
+        format_type: 'json' or 'text'
+        backend, verbose, use_cache, jobs: As for analyze
+
+    The full rollup is cached as JSON next to the output
+    (output.yaml.rollup.json) and reused until output.yaml changes.
+    """
+    def read(path):
+        return read_kantra_output(path, backend=backend, verbose=verbose,
+                                  use_cache=use_cache, jobs=jobs)
+
+    try:
+        rollup, cache_status = load_rollup(output_file, read, use_cache)
+    except OSError as e:
+        report_load_error(output_file, e)
+        sys.exit(1)
+    if verbose:
+        print(f"Rollup cache {cache_status}: {rollup_path(output_file)}", file=sys.stderr)
+
+    if max_depth is not None:
+        rollup = limit_rollup_depth(rollup, max_depth)
+    print_rollup(rollup, format_type)
+
+
+def summarize_file_issues(target_file, rule_messages, limit=10, matched_files=None):
+    """Build the file result from (rule_id, description, messages) tuples
+
+    Later entries for a rule_id replace earlier ones but keep their position.
+    matched_files lists the paths target_file resolved to.
+    Returns an error object when no rule matched the file.
+    """
+    issues_found = {}  # rule_id -> issue_data
+
+    for rule_id, description, messages in rule_messages:
+        issues_found[rule_id] = {
+            'rule_id': rule_id,
+            'description': description,
+            'messages': sorted(list(messages)) if messages else ['No specific message']
+        }
+
+    if not issues_found:
+        return {
+            'error': f'No issues found for file: {target_file}',
+            'suggestion': 'Verify the file path. Try using just the filename if full path does not match.'
+        }
+
+    # Limit to top N distinct issues
+    limited_issues = list(issues_found.values())[:limit]
+
+    result = {
+        'file': target_file,
+        'total_distinct_issues': len(issues_found),
+        'returned': len(limited_issues),
+        'has_more': len(issues_found) > limit,
+        'issues': limited_issues
+    }
+    if matched_files:
+        result['matched_files'] = matched_files
+
+    return result
+
+
+AMBIGUOUS_FILE_ERROR = 'Ambiguous file'
+
+
+def is_ambiguous(matched_files, project_keys):
+    """Return True if matched_files are more than one project file
+
+    The same file reported under several path prefixes (see
+    kantra_compact.project_paths) counts once.
+    """
+    return len({project_keys.get(path, path) for path in matched_files}) > 1
+
+
+def ambiguous_file_result(target_file, matched_files, project_keys):
+    """Build the file result for a target that names more than one file"""
+    files = len({project_keys.get(path, path) for path in matched_files})
+    return {
+        'error': f'{AMBIGUOUS_FILE_ERROR}: {target_file} matches {files} files',
+        'matched_files': matched_files,
+        'suggestion': 'Pass a longer path (parent directory plus filename) to select one file, '
+                      'or use --all-matches to combine their issues.'
+    }
+
+
+def file_issues_result(file_index, target_file, limit=10, all_matches=False,
+                       rule_positions=None):
+    """Build the file result for one target from a FileIndex
+
+    rule_positions limits the issues to those rules (see FileIndex.rule_incidents).
+    """
+    matched_files = file_index.lookup(target_file)
+
+    if not all_matches and is_ambiguous(matched_files, file_index.project_keys):
+        return ambiguous_file_result(target_file, matched_files, file_index.project_keys)
+
+    if matched_files and rule_positions is not None and not any(
+            file_index.rule_incidents(matched_files, rule_positions)):
+        return {
+            'error': f'No issues matching the label selector for file: {target_file}',
+            'suggestion': 'Run without --labels to see all issues for this file.'
+        }
+
+    rule_messages = []
+    for rule, incidents in file_index.rule_incidents(matched_files, rule_positions):
+        messages = {file_index.output.message(incident) for incident in incidents}
+        messages.discard(None)
+        messages.discard('')
+        rule_messages.append((rule.rule_id, rule.description, messages))
+
+    return summarize_file_issues(target_file, rule_messages, limit, matched_files)
+
+
+def exit_if_ambiguous(results):
+    """Exit with status 1 if any (already printed) result is an ambiguous-file error"""
+    if any(str(result.get('error', '')).startswith(AMBIGUOUS_FILE_ERROR)
+           for result in results):
+        sys.exit(1)
+
+
+def print_file_results(results, compact=False, max_bytes=None):
+    """Print file results: the bare result for one target, keyed by target for several
+
+    compact uses the kantra_compact encoding (rule, file and message id
+    tables); max_bytes keeps as many issues as fit in the budget, marking
+    truncated results with has_more. Exits with status 1 if a target was
+    ambiguous.
+    """
+    roots = file_results_roots(results) if compact else None
+
+    def render(units):
+        data = results if units is None else truncate_file_results(results, units)
+        if compact:
+            return dumps(compact_file_results(data, roots), compact=True)
+        if len(data) == 1:
+            return dumps(next(iter(data.values())))
+        return dumps(data)
+
+    if max_bytes is None:
+        print(render(None))
+    else:
+        print(fit_to_budget(render, file_units(results), max_bytes))
+    exit_if_ambiguous(results.values())
+
+
+def analyze_file_issues(output_file, target_file, limit=10, backend=None, verbose=False,
+                        use_cache=True, all_matches=False, jobs=1, compact=False,
+                        max_bytes=None, labels=None):
+    """Get detailed issues for a specific file (or several files)
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        target_file: File to analyze, or a list of files to analyze in one pass
+        limit: Maximum number of distinct issues to return per file (default: 10)
+        backend: YAML backend to parse with (default: auto)
+        verbose: Report the YAML backend and cache status on stderr
+        use_cache: Read/write the output.yaml.idx sidecar cache
+        all_matches: Combine issues when target_file matches several files
+                     (otherwise the matching paths are returned as an error)
+        jobs: Worker processes for parsing large files (1 = serial, 0 = all CPUs)
+        compact: Use the compact encoding (shared path roots, rule/file/message id tables)
+        max_bytes: Truncate the JSON to this many bytes, setting has_more
+        labels: LabelSelector; only issues of rules matching it are returned
+
+    Returns detailed issues found in the target file.
+    Shows description and message for each distinct rule, limited to help focus on priority issues.
+    With several target files, output.yaml is parsed once and the results are
+    returned as one object keyed by target file.
+    """
+    target_files = [target_file] if isinstance(target_file, str) else target_file
+
+    output = read_kantra_output(output_file, with_messages=True, backend=backend,
+                                verbose=verbose, use_cache=use_cache, jobs=jobs)
+    file_index = FileIndex(output)
+    rule_positions = None
+    if labels is not None:
+        rule_positions = LabelIndex(output.rules).positions(labels)
+
+    print_file_results({
+        target: file_issues_result(file_index, target, limit, all_matches, rule_positions)
+        for target in target_files
+    }, compact, max_bytes)
+
+
+def range_issues_result(file_index, target_file, start, end, all_matches=False):
+    """Build the range result: incidents on lines start..end of target_file"""
+    matched_files = file_index.lookup(target_file)
+
+    if not all_matches and is_ambiguous(matched_files, file_index.project_keys):
+        return ambiguous_file_result(target_file, matched_files, file_index.project_keys)
+    if not matched_files:
+        return {
+            'error': f'No issues found for file: {target_file}',
+            'suggestion': 'Verify the file path. Try using just the filename if full path does not match.'
+        }
+
+    incidents = []
+    for rule, incident in file_index.range_incidents(matched_files, start, end):
+        record = {
+            'line': incident.line_number,
+            'rule_id': rule.rule_id,
+            'description': rule.description,
+            'message': file_index.output.message(incident) or 'No specific message',
+        }
+        if incident.matching_text is not None:
+            record['matching_text'] = incident.matching_text
+        if incident.snippet is not None:
+            record['snippet'] = incident.snippet
+        if len(matched_files) > 1:
+            record['file'] = incident.file_path
+        incidents.append(record)
+
+    return {
+        'file': target_file,
+        'start_line': start,
+        'end_line': end,
+        'total_incidents': len(incidents),
+        'incidents': incidents,
+        'matched_files': matched_files,
+    }
+
+
+def analyze_range_issues(output_file, target_file, start, end, backend=None, verbose=False,
+                         use_cache=True, all_matches=False, jobs=1):
+    """Get the incidents on a line range of a file, e.g. the hunk being edited
+
+    Args:
+        output_file: Path to Kantra output.yaml
+        target_file: File to look at (full path or filename)
+        start, end: First and last line of the range (inclusive)
+        backend, verbose, use_cache, jobs: As for analyze
+        all_matches: Combine incidents when target_file matches several files
+
+    Returns each incident with its line number, rule, message and the code it
+    matched, ordered by line: 'matching_text' is variables.matchingText as
+    Kantra reported it, 'snippet' that text (or the incident's codeSnip line)
+    with whitespace collapsed, as diff compares it.
+    """
+    output = read_kantra_output(output_file, with_messages=True, backend=backend,
+                                verbose=verbose, use_cache=use_cache, jobs=jobs)
+    result = range_issues_result(FileIndex(output), target_file, start, end, all_matches)
+    print(json.dumps(result, indent=2))
+    exit_if_ambiguous([result])
+
+
+def read_target_files(target_files, files_from=None):
+    """Combine target files from the command line and a --files-from list
+
+    files_from is a path with one target per line, or '-' for stdin.
+    Blank lines and lines starting with '#' are ignored.
+    """
+    targets = list(target_files)
+
+    if files_from:
+        try:
+            if files_from == '-':
+                lines = sys.stdin.read().splitlines()
+            else:
+                with open(files_from, 'r', encoding='utf-8') as f:
+                    lines = f.read().splitlines()
+        except OSError as e:
+            print(f"Error: Could not read target file list {files_from}: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        targets.extend(
+            line.strip() for line in lines
+            if line.strip() and not line.strip().startswith('#')
+        )
+
+    return list(dict.fromkeys(targets))
+
+
+def _diff_groups(output, incidents, line_delta=None):
+    """Group Incidents by rule, in the rule order of output, as JSON-ready dicts"""
+    positions = {id(rule): position for position, rule in enumerate(output.rules)}
+    groups = {}
+    for incident in incidents:
+        record = {'file': incident.file_path or incident.uri, 'line': incident.line_number}
+        if line_delta is not None:
+            record['previous_line'] = line_delta[id(incident)]
+        groups.setdefault(id(incident.rule), (incident.rule, []))[1].append(record)
+
+    return [
+        {
+            'rule_id': rule.rule_id,
+            'description': rule.description,
+            'incidents': sorted(records, key=lambda r: (r['file'] or '', r['line'] or 0))
+        }
+        for rule, records in sorted(groups.values(), key=lambda g: positions[id(g[0])])
+    ]
+
+
+def summarize_diff(base, current, line_tolerance=DEFAULT_LINE_TOLERANCE):
+    """Build the diff result of two KantraOutputs (see kantra_diff.diff_outputs)"""
+    delta = diff_outputs(base, current, line_tolerance)
+    previous_lines = {id(new): old.line_number for old, new in delta['moved']}
+
+    return {
+        'line_tolerance': line_tolerance,
+        'summary': {
+            'fixed': len(delta['fixed']),
+            'new': len(delta['new']),
+            'unchanged': len(delta['unchanged']),
+            'moved': len(delta['moved']),
+        },
+        'fixed': _diff_groups(base, delta['fixed']),
+        'new': _diff_groups(current, delta['new']),
+        'moved': _diff_groups(current, [new for _, new in delta['moved']], previous_lines),
+    }
+
+
+def print_diff(result, format_type='json'):
+    """Print a diff result as JSON or as a text listing"""
+    if format_type == 'json':
+        print(json.dumps(result, indent=2))
+        return
+
+    summary = result['summary']
+    print("=" * 80)
+    print("KANTRA INCIDENT DIFF")
+    print("=" * 80)
+    print(f"Fixed: {summary['fixed']}  New: {summary['new']}  "
+          f"Unchanged: {summary['unchanged']} ({summary['moved']} moved)")
+
+    for title, key, marker in (('Fixed', 'fixed', '-'), ('New', 'new', '+')):
+        if result[key]:
+            print()
+            print(f"{title} incidents:")
+            print("-" * 80)
+            for group in result[key]:
+                for incident in group['incidents']:
+                    print(f"{marker} {group['rule_id']:<40} {incident['file']}:{incident['line']}")
+    print("=" * 80)
 
-            if data is None:
-                print(f"Error: Kantra output file is empty: {output_file}", file=sys.stderr)
-                print(f"Suggestion: Check that Kantra analysis completed successfully.", file=sys.stderr)
-                return None
 
-            if not isinstance(data, list):
-                print(f"Error: Invalid Kantra output format in {output_file}", file=sys.stderr)
-                print(f"Expected: List of rulesets with violations", file=sys.stderr)
-                return None
+def diff_kantra_outputs(base_file, output_file, line_tolerance=DEFAULT_LINE_TOLERANCE,
+                        format_type='json', backend=None, verbose=False, use_cache=True,
+                        jobs=1):
+    """Show which incidents were fixed, introduced or left between two outputs
 
-            return data
+    Args:
+        base_file: Kantra output.yaml of the earlier round
+        output_file: Kantra output.yaml of the later round
+        line_tolerance: Lines an incident may move and still count as unchanged
+        format_type: 'json' or 'text'
+        backend, verbose, use_cache, jobs: As for analyze
 
-    except FileNotFoundError:
-        print(f"Error: Kantra output file not found: {output_file}", file=sys.stderr)
-        print(f"Suggestion: Verify Kantra analysis completed. Expected path format: <workspace>/kantra-output/output.yaml", file=sys.stderr)
-        return None
-    except PermissionError:
-        print(f"Error: Permission denied accessing: {output_file}", file=sys.stderr)
-        print(f"Suggestion: Check file permissions", file=sys.stderr)
-        return None
-    except yaml.YAMLError as e:
-        print(f"Error: Invalid YAML format in {output_file}: {e}", file=sys.stderr)
-        print(f"Suggestion: File may be corrupted. Re-run Kantra analysis.", file=sys.stderr)
-        return None
-    except Exception as e:
-        print(f"Error: Unexpected error loading {output_file}: {e}", file=sys.stderr)
-        return None
+    Incidents are matched on (rule_id, uri, lineNumber, matched snippet),
+    then on the same rule, file and snippet within line_tolerance lines.
+    """
+    base = read_kantra_output(base_file, with_messages=True, backend=backend, verbose=verbose,
+                              use_cache=use_cache, jobs=jobs)
+    current = read_kantra_output(output_file, with_messages=True, backend=backend,
+                                 verbose=verbose, use_cache=use_cache, jobs=jobs)
+    print_diff(summarize_diff(base, current, line_tolerance), format_type)
 
 
-def analyze_issues(output_file, format_type='json'):
-    """Analyze all issues in Kantra output
+def index_output(output_file, db_path=None, backend=None, verbose=False, jobs=1):
+    """Build a SQLite index of a Kantra output.yaml
 
     Args:
         output_file: Path to Kantra output.yaml
-        format_type: 'json' or 'text'
+        db_path: Index to write (default: <output_file>.sqlite)
+        backend: YAML backend to parse with (default: auto)
+        verbose: Report the YAML backend used on stderr
+        jobs: Worker processes for parsing large files (1 = serial, 0 = all CPUs)
 
-    Returns structured analysis of all migration issues.
+    Prints the index path and row counts per table.
+    """
+    data = load_kantra_output(output_file, backend, verbose, jobs)
+    if data is None:
+        sys.exit(1)
 
-    IMPORTANT: Do NOT prioritize based on simple metrics like file_count.
-    Instead, analyze the full data to identify:
-    - Which issues are interdependent (must be fixed together or in sequence)
-    - Logical groupings that minimize rework and iterations
-    - Dependencies between issues (which must be fixed before others)
+    import sqlite3
+
+    db_path = db_path or sqlite_index_path(output_file)
+    try:
+        counts = build_sqlite_index(data, db_path, output_file)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error: Could not write index {db_path}: {e}", file=sys.stderr)
+        print(f"Suggestion: Pass --db with a writable location.", file=sys.stderr)
+        sys.exit(1)
+
+    print(json.dumps({
+        'index': db_path,
+        'source': output_file,
+        'counts': counts
+    }, indent=2))
+
+
+def query_index(index_file, view, target_file=None, limit=10, format_type='json',
+                all_matches=False, sort_records=False, top=None, page_size=None, cursor=None,
+                compact=False, max_bytes=None):
+    """Answer the 'analyze' or 'file' view from a SQLite index
+
+    Args:
+        index_file: Index built by 'index', or the output.yaml it was built from
+        view: 'analyze' or 'file'
+        target_file: File, or list of files, to look up (file view)
+        limit: Maximum distinct issues to return per file (file view)
+        format_type: 'json', 'text' or 'ndjson' (analyze view)
+        all_matches: Combine issues when target_file matches several files (file view)
+        sort_records: For ndjson, emit records in the json format's order (analyze view)
+        top, page_size, cursor: Select part of the result (analyze view)
+        compact, max_bytes: Compact encoding and byte budget for JSON output
+
+    Output matches the corresponding direct command.
     """
-    data = load_kantra_output(output_file)
-    if not data:
+    db_path = index_file
+    if not os.path.exists(db_path) or os.path.splitext(db_path)[1] in ('.yaml', '.yml'):
+        db_path = sqlite_index_path(index_file)
+
+    try:
+        conn, stale = open_sqlite_index(db_path)
+    except KantraIndexError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print(f"Suggestion: Build it with: kantra_output_helper.py index <output.yaml>", file=sys.stderr)
         sys.exit(1)
 
-    issues = []
+    if stale:
+        print(f"Warning: {db_path} is older than its output.yaml; re-run 'index' to refresh it",
+              file=sys.stderr)
 
-    for ruleset in data:
-        if not isinstance(ruleset, dict) or 'violations' not in ruleset:
-            continue
+    try:
+        if view == 'analyze':
+            report_analysis(query_rule_files(conn), format_type, sort_records, top, page_size,
+                            cursor, compact, max_bytes)
+        else:
+            target_files = [target_file] if isinstance(target_file, str) else target_file
+            project_keys = {} if all_matches else query_project_keys(conn)
+            results = {}
+            for target in target_files:
+                matched_files = query_file_paths(conn, target)
+                if not all_matches and is_ambiguous(matched_files, project_keys):
+                    results[target] = ambiguous_file_result(target, matched_files, project_keys)
+                else:
+                    rule_messages = query_file_rule_messages(conn, matched_files)
+                    results[target] = summarize_file_issues(target, rule_messages, limit,
+                                                            matched_files)
+            print_file_results(results, compact, max_bytes)
+    finally:
+        conn.close()
 
-        violations = ruleset.get('violations')
-        if not isinstance(violations, dict) or not violations:
-            continue
 
-        for rule_id, violation in violations.items():
-            if not isinstance(violation, dict):
-                continue
+def daemon_handlers(backend=None, jobs=1):
+    """Build the 'serve' command handlers and the in-memory stores they read
 
-            description = violation.get('description', 'No description')
-            incidents = violation.get('incidents', [])
+    Returns (handlers, stores) for kantra_daemon.serve(). Each handler prints
+    exactly what the matching direct command prints.
+    """
+    from persistent_issues_analyzer import (
+        analyze_convergence, analyze_persistent_issues, extract_issues_from_file,
+    )
 
-            if not isinstance(incidents, list):
-                continue
+    def load_resident(path):
+        output, _ = load_output(path, backend, jobs=jobs)
+        return output, FileIndex(output), LabelIndex(output.rules)
 
-            # Collect unique files affected by this rule
-            files_affected = set()
-            for incident in incidents:
-                if not isinstance(incident, dict):
-                    continue
-                uri = incident.get('uri', '')
-                if isinstance(uri, str) and uri.startswith('file://'):
-                    file_path = uri[7:]  # Remove 'file://' prefix
-                    if file_path:
-                        files_affected.add(file_path)
+    outputs = OutputStore(load_resident)
+    rounds = OutputStore(lambda path: extract_issues_from_file(path, backend))
 
-            if files_affected:  # Only include rules that affect files
-                issues.append({
-                    'rule_id': rule_id,
-                    'description': description,
-                    'file_count': len(files_affected),
-                    'files': sorted(list(files_affected))
-                })
+    def resident_output(output_file):
+        try:
+            return outputs.get(output_file)
+        except Exception as e:
+            report_load_error(output_file, e)
+            sys.exit(1)
 
-    # Sort by file_count descending
-    issues.sort(key=lambda x: x['file_count'], reverse=True)
+    def selected_positions(request, label_index):
+        if request.get('labels') is None:
+            return None
+        return label_index.positions(LabelSelector(request['labels']))
 
-    result = {
-        'total_issues': len(issues),
-        'issues': issues
-    }
+    def analyze(request):
+        output, _, label_index = resident_output(request['output_file'])
+        rules = output.rules
+        if request.get('labels') is not None:
+            rules = select_rules(rules, LabelSelector(request['labels']), label_index)
+        report_analysis(rule_files(rules), request.get('format', 'json'),
+                        request.get('sorted', False), request.get('top'),
+                        request.get('page_size'), request.get('cursor'),
+                        request.get('compact', False), request.get('max_bytes'))
 
-    if format_type == 'json':
+    def file(request):
+        _, file_index, label_index = resident_output(request['output_file'])
+        limit = request.get('limit', 10)
+        all_matches = request.get('all_matches', False)
+        rule_positions = selected_positions(request, label_index)
+        print_file_results({
+            target: file_issues_result(file_index, target, limit, all_matches, rule_positions)
+            for target in request['targets']
+        }, request.get('compact', False), request.get('max_bytes'))
+
+    def persistent(request):
+        if request.get('convergence'):
+            analyze_convergence(request['base_dir'], backend, issues_loader=rounds.get,
+                                walk=request.get('walk'))
+            return
+        analyze_persistent_issues(request['base_dir'], request.get('min_occurrences', 3),
+                                  backend, issues_loader=rounds.get, walk=request.get('walk'),
+                                  consecutive=request.get('consecutive'))
+
+    def range_query(request):
+        _, file_index, _ = resident_output(request['output_file'])
+        result = range_issues_result(file_index, request['target'], request['start'],
+                                     request['end'], request.get('all_matches', False))
         print(json.dumps(result, indent=2))
-    else:
-        # Text format
-        print("=" * 80)
-        print("KANTRA MIGRATION ISSUES ANALYSIS")
-        print("=" * 80)
-        print(f"Total Issues: {result['total_issues']}")
-        print()
+        exit_if_ambiguous([result])
 
-        if issues:
-            print(f"{'Rule ID':<40} {'Files':<8} Description")
-            print("-" * 80)
-            for issue in issues:
-                print(f"{issue['rule_id']:<40} {issue['file_count']:<8} {issue['description']}")
-            print("=" * 80)
-        else:
-            print("No migration issues found.")
+    def graph(request):
+        output, _, _ = resident_output(request['output_file'])
+        print_graph(rule_graph(rule_files(output.rules),
+                               request.get('min_jaccard', DEFAULT_MIN_JACCARD),
+                               request.get('top', DEFAULT_TOP_PAIRS)),
+                    request.get('format', 'json'))
 
+    def plan(request):
+        output, _, _ = resident_output(request['output_file'])
+        min_jaccard = request.get('min_jaccard', DEFAULT_MIN_JACCARD)
+        roots, rules_files = project_rule_files(output.rules)
+        groups = plan_groups(rules_files, min_jaccard,
+                             request.get('min_shared', DEFAULT_MIN_SHARED),
+                             request.get('max_rules', DEFAULT_MAX_GROUP_RULES))
+        print_plan(summarize_plan(groups, roots), request.get('format', 'markdown'),
+                   min_jaccard)
 
-def analyze_file_issues(output_file, target_file, limit=10):
-    """Get detailed issues for a specific file
+    def partition(request):
+        _, file_index, _ = resident_output(request['output_file'])
+        roots, workloads = file_workloads(file_index)
+        packages = partition_workloads(workloads, request['workers'])
+        print_manifests(worker_manifests(packages, roots), request.get('output_dir'))
 
-    Args:
-        output_file: Path to Kantra output.yaml
-        target_file: File to analyze
-        limit: Maximum number of distinct issues to return (default: 10)
+    def diff(request):
+        base, _, _ = resident_output(request['base_file'])
+        current, _, _ = resident_output(request['output_file'])
+        print_diff(summarize_diff(base, current,
+                                  request.get('line_tolerance', DEFAULT_LINE_TOLERANCE)),
+                   request.get('format', 'json'))
 
-    Returns detailed issues found in the target file.
-    Shows description and message for each distinct rule, limited to help focus on priority issues.
+    handlers = {'analyze': analyze, 'file': file, 'range': range_query, 'graph': graph,
+                'plan': plan, 'partition': partition, 'diff': diff, 'persistent': persistent}
+    return handlers, (outputs, rounds)
+
+
+def run_daemon(output_files, socket_path=None, poll_interval=2.0, idle_timeout=1800,
+               backend=None, stop=False, jobs=1):
+    """Serve queries from memory until stopped (or stop a running daemon)
+
+    Args:
+        output_files: Outputs to parse up front (others load on first query)
+        socket_path: Unix socket path (default: $KANTRA_HELPER_SOCKET or daemon.sock
+            in a private per-user temp directory)
+        poll_interval: Seconds between checks for changed outputs
+        idle_timeout: Exit after this many idle seconds (0 = never)
+        backend: YAML backend to parse with (default: auto)
+        stop: Ask the running daemon to shut down instead of starting one
+        jobs: Worker processes for parsing large outputs (1 = serial, 0 = all CPUs)
     """
-    data = load_kantra_output(output_file)
-    if not data:
-        sys.exit(1)
+    socket_path = socket_path or default_socket_path()
 
-    issues_found = {}  # rule_id -> issue_data
+    if stop:
+        response = send_request({'command': 'shutdown'}, socket_path)
+        if response is None:
+            print(f"No daemon is listening on {socket_path}", file=sys.stderr)
+            sys.exit(1)
+        sys.exit(print_response(response))
 
-    for ruleset in data:
-        if not isinstance(ruleset, dict) or 'violations' not in ruleset:
-            continue
+    handlers, stores = daemon_handlers(backend, jobs)
+    outputs, _ = stores
+    for output_file in output_files:
+        try:
+            outputs.get(output_file)
+        except Exception as e:
+            report_load_error(output_file, e)
+            sys.exit(1)
 
-        violations = ruleset.get('violations')
-        if not isinstance(violations, dict):
-            continue
+    print(f"Serving Kantra queries on {socket_path}", file=sys.stderr)
+    try:
+        started = serve(handlers, stores, socket_path, poll_interval, idle_timeout)
+    except PermissionError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        print("Suggestion: Remove it or pass --socket with a path in a directory you own",
+              file=sys.stderr)
+        sys.exit(1)
+    if not started:
+        print(f"Error: A daemon is already listening on {socket_path}", file=sys.stderr)
+        sys.exit(1)
 
-        for rule_id, violation in violations.items():
-            if not isinstance(violation, dict):
-                continue
 
-            description = violation.get('description', 'No description')
-            incidents = violation.get('incidents', [])
+def daemon_request(args):
+    """Build the daemon request equivalent to a command line (analyze, file, diff, ...)"""
+    request = {
+        'command': args.command,
+        'cwd': os.getcwd(),
+        'output_file': args.output_file,
+    }
+    if args.command == 'diff':
+        request.update(base_file=args.base_file, line_tolerance=args.line_tolerance,
+                       format=args.format)
+        return request
+    if args.command == 'graph':
+        request.update(min_jaccard=args.min_jaccard, top=args.top, format=args.format)
+        return request
+    if args.command == 'partition':
+        request.update(workers=args.workers, output_dir=args.output_dir)
+        return request
+    if args.command == 'plan':
+        request.update(min_jaccard=args.min_jaccard, min_shared=args.min_shared,
+                       max_rules=args.max_rules, format=args.format)
+        return request
+    if args.command == 'range':
+        request.update(target=args.target_file, start=args.lines[0], end=args.lines[1],
+                       all_matches=args.all_matches)
+        return request
 
-            if not isinstance(incidents, list):
-                continue
+    request.update(compact=args.compact, max_bytes=args.max_bytes,
+                   labels=args.labels.text if args.labels else None)
+    if args.command == 'analyze':
+        request.update(format=args.format, sorted=args.sorted, top=args.top,
+                       page_size=args.page_size, cursor=args.cursor)
+    else:
+        request.update(targets=args.target_files, limit=args.limit,
+                       all_matches=args.all_matches)
+    return request
 
-            # Check if this rule affects the target file
-            file_incidents = []
-            messages = set()
 
-            for incident in incidents:
-                if not isinstance(incident, dict):
-                    continue
+def positive_int(value):
+    """argparse type for options that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: {value}")
+    return number
 
-                uri = incident.get('uri', '')
-                if isinstance(uri, str) and uri.startswith('file://'):
-                    file_path = uri[7:]
-                    # Match exact path or filename
-                    if file_path == target_file or file_path.endswith(target_file):
-                        file_incidents.append(incident)
-                        message = incident.get('message', '')
-                        if message:
-                            messages.add(message)
 
-            if file_incidents:
-                issues_found[rule_id] = {
-                    'rule_id': rule_id,
-                    'description': description,
-                    'messages': sorted(list(messages)) if messages else ['No specific message']
-                }
+def non_negative_int(value):
+    """argparse type for options that must be 0 or more"""
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"must not be negative: {value}")
+    return number
 
-    if not issues_found:
-        print(json.dumps({
-            'error': f'No issues found for file: {target_file}',
-            'suggestion': 'Verify the file path. Try using just the filename if full path does not match.'
-        }, indent=2))
-        return
 
-    # Limit to top N distinct issues
-    limited_issues = list(issues_found.values())[:limit]
+def similarity(value):
+    """argparse type for a similarity threshold between 0 and 1"""
+    number = float(value)
+    if not 0 <= number <= 1:
+        raise argparse.ArgumentTypeError(f"must be between 0 and 1: {value}")
+    return number
 
-    result = {
-        'file': target_file,
-        'total_distinct_issues': len(issues_found),
-        'returned': len(limited_issues),
-        'has_more': len(issues_found) > limit,
-        'issues': limited_issues
-    }
 
-    print(json.dumps(result, indent=2))
+def label_selector(value):
+    """argparse type for a --labels selector expression"""
+    try:
+        return LabelSelector(value)
+    except LabelSelectorError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def line_range(value):
+    """argparse type for a START-END line range (or a single line)"""
+    start, _, end = value.partition('-')
+    try:
+        start = int(start)
+        end = int(end) if end else start
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected START-END line numbers: {value}")
+    if start < 1 or end < start:
+        raise argparse.ArgumentTypeError(f"not a valid line range: {value}")
+    return start, end
 
 
 def main():
@@ -233,6 +1450,15 @@ def main():
 Commands:
   analyze   Get overview of all issues. Use this FIRST to understand migration scope.
   file      Get detailed issues for specific file. Use when ready to fix that file.
+  range     Get the incidents on a line range of a file, with the code each matched.
+  graph     Find rules that affect the same files, to fix related issues together.
+  plan      Draft the status.md fix groups from rules that affect the same files.
+  partition Split the work into file-disjoint packages, one per parallel fixer.
+  rollup    Totals by category, label and directory (cached as output.yaml.rollup.json).
+  diff      Compare two outputs: incidents fixed, new and unchanged since the last run.
+  index     Build a SQLite index of output.yaml for repeated queries.
+  query     Answer 'analyze' or 'file' from the SQLite index.
+  serve     Run a resident daemon that answers queries from memory.
 
 Examples:
   # Get JSON summary of all issues (default)
@@ -241,12 +1467,76 @@ Examples:
   # Get text summary
   python3 kantra_output_helper.py analyze output.yaml --format text
 
+  # The 5 rules affecting the most files, or page through every affected
+  # file 200 at a time (pass each result's next_cursor to get the next page)
+  python3 kantra_output_helper.py analyze output.yaml --top 5
+  python3 kantra_output_helper.py analyze output.yaml --page-size 200
+  python3 kantra_output_helper.py analyze output.yaml --cursor <next_cursor>
+
+  # Compact JSON for agents: shared path roots, id tables, at most 20 KB
+  python3 kantra_output_helper.py file output.yaml src/Main.java --compact --max-bytes 20000
+
+  # Only rules with a label (kantra label selector syntax; category=<c> matches the category)
+  python3 kantra_output_helper.py analyze output.yaml \\
+      --labels 'konveyor.io/target=patternfly-v6 && !category=optional'
+
+  # Stream one JSON record per rule while a large output.yaml is parsed
+  python3 kantra_output_helper.py analyze output.yaml --format ndjson
+
   # Get issues for specific file (shows top 10 by default)
   python3 kantra_output_helper.py file output.yaml src/Main.java
 
   # Get more issues for a file
   python3 kantra_output_helper.py file output.yaml src/Main.java --limit 20
 
+  # Get the incidents on lines 40-80 of a file (the hunk being edited)
+  python3 kantra_output_helper.py range output.yaml src/Main.java 40-80
+
+  # Get issues for several files with a single parse (keyed by file)
+  python3 kantra_output_helper.py file output.yaml src/A.java src/B.java
+  git diff --name-only | python3 kantra_output_helper.py file output.yaml --files-from -
+
+  # A bare filename that matches several files lists them in 'matched_files';
+  # pass a longer path to pick one
+  python3 kantra_output_helper.py file output.yaml components/Main.java
+
+  # Parse a very large output.yaml in 8 worker processes
+  python3 kantra_output_helper.py analyze output.yaml --jobs 8
+
+  # Rule pairs and clusters that mostly affect the same files
+  python3 kantra_output_helper.py graph output.yaml --format text
+  python3 kantra_output_helper.py graph output.yaml --min-jaccard 0.3 --top 50
+
+  # Draft the Groups / Group Details sections of status.md
+  python3 kantra_output_helper.py plan output.yaml
+  python3 kantra_output_helper.py plan output.yaml --min-jaccard 0.3 --max-rules 5
+
+  # One work package per parallel fixer; no file is in two packages
+  python3 kantra_output_helper.py partition output.yaml --workers 4
+  python3 kantra_output_helper.py partition output.yaml --workers 4 --output-dir work/
+
+  # Incidents, files and effort by category, label and top-level directories
+  python3 kantra_output_helper.py rollup output.yaml --max-depth 2 --format text
+
+  # Incidents the last round fixed and introduced (matched across small line shifts)
+  python3 kantra_output_helper.py diff round-1/output.yaml round-2/output.yaml
+  python3 kantra_output_helper.py diff round-1/output.yaml round-2/output.yaml --format text
+
+  # Force the pure-Python YAML parser and report the backend used
+  python3 kantra_output_helper.py analyze output.yaml --yaml-backend python --verbose
+
+  # Index once, then query per file without rescanning the YAML
+  python3 kantra_output_helper.py index output.yaml
+  python3 kantra_output_helper.py query output.yaml.sqlite file src/Main.java
+
+  # Keep outputs in memory; analyze/file (and persistent_issues_analyzer.py)
+  # then answer through the daemon automatically while it runs
+  python3 kantra_output_helper.py serve &
+  python3 kantra_output_helper.py serve --stop
+
+Parsed results are cached next to the output file (output.yaml.idx) and
+reused until output.yaml changes. Use --no-cache to bypass the cache.
+
 Workflow:
   1. Run 'analyze' to understand all issues and their scope
   2. Use 'file' command to drill into specific files when ready to fix
@@ -256,9 +1546,70 @@ Workflow:
 
     subparsers = parser.add_subparsers(dest='command', help='Command to run')
 
+    # options shared by all commands
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument(
+        '--yaml-backend',
+        choices=YAML_BACKENDS,
+        default=None,
+        help='YAML parser backend (default: $KANTRA_YAML_BACKEND or auto; '
+             'auto uses libyaml when available)'
+    )
+    common_parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Report which YAML backend and cache were used on stderr'
+    )
+    common_parser.add_argument(
+        '--no-cache',
+        dest='use_cache',
+        action='store_false',
+        help='Do not read or write the output.yaml.idx sidecar cache'
+    )
+    common_parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Parse large output files in N worker processes, 0 for one per CPU '
+             '(default: 1, serial)'
+    )
+    common_parser.add_argument(
+        '--no-daemon',
+        dest='use_daemon',
+        action='store_false',
+        help='Parse directly even if a query daemon is running'
+    )
+
+    # JSON encoding options of the analyze and file views
+    encoding_parser = argparse.ArgumentParser(add_help=False)
+    encoding_parser.add_argument(
+        '--compact',
+        action='store_true',
+        help='Compact JSON: common path roots factored out, rules, files and messages '
+             'listed once in id tables'
+    )
+    encoding_parser.add_argument(
+        '--max-bytes',
+        type=positive_int,
+        metavar='N',
+        help='Truncate the JSON output to at most N bytes and set has_more'
+    )
+
+    # label selector of the analyze and file views
+    selector_parser = argparse.ArgumentParser(add_help=False)
+    selector_parser.add_argument(
+        '--labels',
+        type=label_selector,
+        metavar='SELECTOR',
+        help="Only include rules matching a label selector, e.g. "
+             "'konveyor.io/target=patternfly-v6 && !category=optional' "
+             "(&&, ||, !, parentheses; a bare key matches any value)"
+    )
+
     # analyze command
     analyze_parser = subparsers.add_parser(
         'analyze',
+        parents=[common_parser, encoding_parser, selector_parser],
         help='Get overview of all migration issues'
     )
     analyze_parser.add_argument(
@@ -267,14 +1618,37 @@ Workflow:
     )
     analyze_parser.add_argument(
         '--format',
-        choices=['json', 'text'],
+        choices=['json', 'text', 'ndjson'],
         default='json',
-        help='Output format (default: json)'
+        help='Output format (default: json); ndjson streams one record per rule '
+             'and a final summary record'
+    )
+    analyze_parser.add_argument(
+        '--sorted',
+        action='store_true',
+        help='With --format ndjson, emit rules in the json order (most files first)'
+    )
+    analyze_parser.add_argument(
+        '--top',
+        type=positive_int,
+        metavar='K',
+        help='Only return the K rules affecting the most files'
+    )
+    analyze_parser.add_argument(
+        '--page-size',
+        type=positive_int,
+        metavar='N',
+        help='Return at most N files per call, with a next_cursor for the rest'
+    )
+    analyze_parser.add_argument(
+        '--cursor',
+        help='Continue from the next_cursor of a previous page'
     )
 
     # file command
     file_parser = subparsers.add_parser(
         'file',
+        parents=[common_parser, encoding_parser, selector_parser],
         help='Get detailed issues for specific file'
     )
     file_parser.add_argument(
@@ -282,14 +1656,331 @@ Workflow:
         help='Path to Kantra output.yaml file'
     )
     file_parser.add_argument(
-        'target_file',
-        help='File to analyze (full path or filename)'
+        'target_files',
+        nargs='*',
+        metavar='target_file',
+        help='File(s) to analyze (full path or filename)'
     )
     file_parser.add_argument(
+        '--files-from',
+        metavar='PATH',
+        help="Read more target files from PATH, one per line ('-' for stdin)"
+    )
+    file_parser.add_argument(
+        '--limit',
+        type=int,
+        default=10,
+        help='Maximum distinct issues to return per file (default: 10)'
+    )
+    file_parser.add_argument(
+        '--all-matches',
+        action='store_true',
+        help='Combine issues when the target matches several files'
+    )
+
+    # range command
+    range_parser = subparsers.add_parser(
+        'range',
+        parents=[common_parser],
+        help='Get the incidents on a line range of a file'
+    )
+    range_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    range_parser.add_argument(
+        'target_file',
+        help='File to look at (full path or filename)'
+    )
+    range_parser.add_argument(
+        'lines',
+        type=line_range,
+        metavar='START-END',
+        help='Line range, inclusive (a single line number also works)'
+    )
+    range_parser.add_argument(
+        '--all-matches',
+        action='store_true',
+        help='Combine incidents when the target matches several files'
+    )
+
+    # graph command
+    graph_parser = subparsers.add_parser(
+        'graph',
+        parents=[common_parser],
+        help='Find rules that affect the same files'
+    )
+    graph_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    graph_parser.add_argument(
+        '--min-jaccard',
+        type=similarity,
+        default=DEFAULT_MIN_JACCARD,
+        metavar='J',
+        help='Rules whose file sets have a Jaccard similarity of at least J are related '
+             f'(default: {DEFAULT_MIN_JACCARD})'
+    )
+    graph_parser.add_argument(
+        '--top',
+        type=positive_int,
+        default=DEFAULT_TOP_PAIRS,
+        metavar='K',
+        help=f'Number of related rule pairs to list (default: {DEFAULT_TOP_PAIRS})'
+    )
+    graph_parser.add_argument(
+        '--format',
+        choices=['json', 'text'],
+        default='json',
+        help='Output format (default: json)'
+    )
+
+    # plan command
+    plan_parser = subparsers.add_parser(
+        'plan',
+        parents=[common_parser],
+        help='Draft status.md fix groups from rules that share files'
+    )
+    plan_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    plan_parser.add_argument(
+        '--min-jaccard',
+        type=similarity,
+        default=DEFAULT_MIN_JACCARD,
+        metavar='J',
+        help='Group rules whose file sets have a Jaccard similarity of at least J '
+             f'(default: {DEFAULT_MIN_JACCARD})'
+    )
+    plan_parser.add_argument(
+        '--min-shared',
+        type=positive_int,
+        default=DEFAULT_MIN_SHARED,
+        metavar='N',
+        help=f'Only group rules that share at least N files (default: {DEFAULT_MIN_SHARED})'
+    )
+    plan_parser.add_argument(
+        '--max-rules',
+        type=positive_int,
+        default=DEFAULT_MAX_GROUP_RULES,
+        metavar='N',
+        help=f'Maximum rules per group (default: {DEFAULT_MAX_GROUP_RULES})'
+    )
+    plan_parser.add_argument(
+        '--format',
+        choices=['markdown', 'json'],
+        default='markdown',
+        help='Output format (default: markdown, the status.md Groups and Group Details)'
+    )
+
+    # partition command
+    partition_parser = subparsers.add_parser(
+        'partition',
+        parents=[common_parser],
+        help='Split the work into file-disjoint packages for parallel fixers'
+    )
+    partition_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    partition_parser.add_argument(
+        '--workers',
+        type=positive_int,
+        required=True,
+        metavar='N',
+        help='Number of work packages'
+    )
+    partition_parser.add_argument(
+        '--output-dir',
+        metavar='DIR',
+        help='Write worker-<n>.json manifests to DIR (default: print one JSON manifest '
+             'per line)'
+    )
+
+    # rollup command
+    rollup_parser = subparsers.add_parser(
+        'rollup',
+        parents=[common_parser],
+        help='Incident, file and effort totals by category, label and directory'
+    )
+    rollup_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    rollup_parser.add_argument(
+        '--max-depth',
+        type=positive_int,
+        metavar='N',
+        help='Only list directories up to N levels deep (default: all)'
+    )
+    rollup_parser.add_argument(
+        '--format',
+        choices=['json', 'text'],
+        default='json',
+        help='Output format (default: json)'
+    )
+
+    # diff command
+    diff_parser = subparsers.add_parser(
+        'diff',
+        parents=[common_parser],
+        help='Incidents fixed, new and unchanged between two outputs'
+    )
+    diff_parser.add_argument(
+        'base_file',
+        help='Kantra output.yaml of the earlier run'
+    )
+    diff_parser.add_argument(
+        'output_file',
+        help='Kantra output.yaml of the later run'
+    )
+    diff_parser.add_argument(
+        '--line-tolerance',
+        type=non_negative_int,
+        default=DEFAULT_LINE_TOLERANCE,
+        metavar='N',
+        help='Match an incident that moved by up to N lines with the same rule, file '
+             f'and code (default: {DEFAULT_LINE_TOLERANCE}, 0 = exact lines only)'
+    )
+    diff_parser.add_argument(
+        '--format',
+        choices=['json', 'text'],
+        default='json',
+        help='Output format (default: json)'
+    )
+
+    # index command
+    index_parser = subparsers.add_parser(
+        'index',
+        parents=[common_parser],
+        help='Build a SQLite index of output.yaml'
+    )
+    index_parser.add_argument(
+        'output_file',
+        help='Path to Kantra output.yaml file'
+    )
+    index_parser.add_argument(
+        '--db',
+        help='Index file to write (default: <output_file>.sqlite)'
+    )
+
+    # query command
+    query_parser = subparsers.add_parser(
+        'query',
+        help="Answer 'analyze' or 'file' from a SQLite index"
+    )
+    query_parser.add_argument(
+        'index_file',
+        help="Index built by 'index' (or the output.yaml it was built from)"
+    )
+    query_views = query_parser.add_subparsers(dest='view', help='View to answer')
+    query_analyze_parser = query_views.add_parser(
+        'analyze',
+        parents=[encoding_parser],
+        help='Overview of all migration issues'
+    )
+    query_analyze_parser.add_argument(
+        '--format',
+        choices=['json', 'text', 'ndjson'],
+        default='json',
+        help='Output format (default: json); ndjson streams one record per rule '
+             'and a final summary record'
+    )
+    query_analyze_parser.add_argument(
+        '--sorted',
+        action='store_true',
+        help='With --format ndjson, emit rules in the json order (most files first)'
+    )
+    query_analyze_parser.add_argument(
+        '--top',
+        type=positive_int,
+        metavar='K',
+        help='Only return the K rules affecting the most files'
+    )
+    query_analyze_parser.add_argument(
+        '--page-size',
+        type=positive_int,
+        metavar='N',
+        help='Return at most N files per call, with a next_cursor for the rest'
+    )
+    query_analyze_parser.add_argument(
+        '--cursor',
+        help='Continue from the next_cursor of a previous page'
+    )
+    query_file_parser = query_views.add_parser(
+        'file',
+        parents=[encoding_parser],
+        help='Detailed issues for specific file'
+    )
+    query_file_parser.add_argument(
+        'target_files',
+        nargs='*',
+        metavar='target_file',
+        help='File(s) to analyze (full path or filename)'
+    )
+    query_file_parser.add_argument(
+        '--files-from',
+        metavar='PATH',
+        help="Read more target files from PATH, one per line ('-' for stdin)"
+    )
+    query_file_parser.add_argument(
         '--limit',
         type=int,
         default=10,
-        help='Maximum distinct issues to return (default: 10)'
+        help='Maximum distinct issues to return per file (default: 10)'
+    )
+    query_file_parser.add_argument(
+        '--all-matches',
+        action='store_true',
+        help='Combine issues when the target matches several files'
+    )
+
+    # serve command
+    serve_parser = subparsers.add_parser(
+        'serve',
+        help='Keep outputs in memory and answer queries over a Unix socket'
+    )
+    serve_parser.add_argument(
+        'output_files',
+        nargs='*',
+        metavar='output_file',
+        help='Kantra output.yaml files to load up front (others load on first query)'
+    )
+    serve_parser.add_argument(
+        '--socket',
+        help='Unix socket path (default: $KANTRA_HELPER_SOCKET or daemon.sock in a '
+             'private per-user temp directory)'
+    )
+    serve_parser.add_argument(
+        '--poll-interval',
+        type=float,
+        default=2.0,
+        help='Seconds between checks for changed output files (default: 2)'
+    )
+    serve_parser.add_argument(
+        '--idle-timeout',
+        type=float,
+        default=1800,
+        help='Exit after this many seconds without queries, 0 to never exit (default: 1800)'
+    )
+    serve_parser.add_argument(
+        '--yaml-backend',
+        choices=YAML_BACKENDS,
+        default=None,
+        help='YAML parser backend (default: $KANTRA_YAML_BACKEND or auto)'
+    )
+    serve_parser.add_argument(
+        '--jobs',
+        type=int,
+        default=1,
+        help='Parse large output files in N worker processes, 0 for one per CPU (default: 1)'
+    )
+    serve_parser.add_argument(
+        '--stop',
+        action='store_true',
+        help='Stop the running daemon'
     )
 
     args = parser.parse_args()
@@ -298,17 +1989,89 @@ Workflow:
         parser.print_help()
         sys.exit(1)
 
-    # Validate output file exists
-    if not Path(args.output_file).exists():
-        print(f"Error: Kantra output file not found: {args.output_file}", file=sys.stderr)
-        print(f"Suggestion: Check that Kantra analysis completed successfully.", file=sys.stderr)
+    if getattr(args, 'target_files', None) is not None:
+        args.target_files = read_target_files(args.target_files, args.files_from)
+        if not args.target_files:
+            print("Error: No target file given", file=sys.stderr)
+            print("Suggestion: Pass one or more files, or --files-from <list>", file=sys.stderr)
+            sys.exit(1)
+
+    if getattr(args, 'format', 'json') != 'json' and (getattr(args, 'compact', False)
+                                                      or getattr(args, 'max_bytes', None)):
+        print("Error: --compact and --max-bytes apply to JSON output", file=sys.stderr)
+        print("Suggestion: Drop --format, or use --page-size to split ndjson/text output.",
+              file=sys.stderr)
         sys.exit(1)
+    if getattr(args, 'max_bytes', None) and (getattr(args, 'page_size', None)
+                                              or getattr(args, 'cursor', None)):
+        print("Error: --max-bytes cannot be combined with --page-size or --cursor", file=sys.stderr)
+        print("Suggestion: Use a smaller --page-size so that each page fits.", file=sys.stderr)
+        sys.exit(1)
+
+    if args.command == 'query':
+        if not args.view:
+            query_parser.print_help()
+            sys.exit(1)
+        query_index(args.index_file, args.view, getattr(args, 'target_files', None),
+                    getattr(args, 'limit', 10), getattr(args, 'format', 'json'),
+                    getattr(args, 'all_matches', False), getattr(args, 'sorted', False),
+                    getattr(args, 'top', None), getattr(args, 'page_size', None),
+                    getattr(args, 'cursor', None), args.compact, args.max_bytes)
+        return
+
+    if args.command == 'serve':
+        run_daemon(args.output_files, args.socket, args.poll_interval, args.idle_timeout,
+                   args.yaml_backend, args.stop, args.jobs)
+        return
+
+    # Validate output file exists
+    for output_file in (getattr(args, 'base_file', None), args.output_file):
+        if output_file and not os.path.exists(output_file):
+            print(f"Error: Kantra output file not found: {output_file}", file=sys.stderr)
+            print(f"Suggestion: Check that Kantra analysis completed successfully.", file=sys.stderr)
+            sys.exit(1)
+
+    # Answer from the resident daemon when one is running
+    if (args.command in ('analyze', 'file', 'range', 'graph', 'plan', 'partition', 'diff')
+            and args.use_daemon and args.use_cache
+            and args.yaml_backend is None):
+        response = send_request(daemon_request(args))
+        if response is not None:
+            if args.verbose:
+                print(f"Answered by daemon at {default_socket_path()}", file=sys.stderr)
+            sys.exit(print_response(response))
 
     # Execute command
     if args.command == 'analyze':
-        analyze_issues(args.output_file, args.format)
+        analyze_issues(args.output_file, args.format, args.yaml_backend, args.verbose,
+                       args.use_cache, args.jobs, args.sorted, args.top, args.page_size,
+                       args.cursor, args.compact, args.max_bytes, args.labels)
     elif args.command == 'file':
-        analyze_file_issues(args.output_file, args.target_file, args.limit)
+        analyze_file_issues(args.output_file, args.target_files, args.limit,
+                            args.yaml_backend, args.verbose, args.use_cache,
+                            args.all_matches, args.jobs, args.compact, args.max_bytes,
+                            args.labels)
+    elif args.command == 'range':
+        analyze_range_issues(args.output_file, args.target_file, *args.lines,
+                             args.yaml_backend, args.verbose, args.use_cache,
+                             args.all_matches, args.jobs)
+    elif args.command == 'graph':
+        analyze_rule_graph(args.output_file, args.min_jaccard, args.top, args.format,
+                           args.yaml_backend, args.verbose, args.use_cache, args.jobs)
+    elif args.command == 'plan':
+        analyze_plan(args.output_file, args.min_jaccard, args.min_shared, args.max_rules,
+                     args.format, args.yaml_backend, args.verbose, args.use_cache, args.jobs)
+    elif args.command == 'partition':
+        partition_work(args.output_file, args.workers, args.output_dir, args.yaml_backend,
+                       args.verbose, args.use_cache, args.jobs)
+    elif args.command == 'rollup':
+        rollup_output(args.output_file, args.max_depth, args.format, args.yaml_backend,
+                      args.verbose, args.use_cache, args.jobs)
+    elif args.command == 'diff':
+        diff_kantra_outputs(args.base_file, args.output_file, args.line_tolerance, args.format,
+                            args.yaml_backend, args.verbose, args.use_cache, args.jobs)
+    elif args.command == 'index':
+        index_output(args.output_file, args.db, args.yaml_backend, args.verbose, args.jobs)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,276 @@
+"""
+Kantra Tracking
+Incident-level persistence across migration rounds.
+
+A rule that shows up in every round is not necessarily stuck: the fixer may
+have resolved 49 of its 50 incidents. IncidentTracker follows individual
+incidents instead. Each incident is fingerprinted by (rule_id, file,
+lineNumber, snippet hash), with rule_id and file interned to small integer
+ids, and matched to the previous round with kantra_diff.match_fingerprints
+(exact, then within a line drift tolerance). A matched incident keeps its
+integer id and extends its streak of consecutive rounds. An unmatched one
+is matched against the incidents fixed in earlier rounds, so an incident
+that disappears and comes back keeps its id (its streak starts over);
+anything else gets a new id.
+
+Every id also has a presence bitset, a Python int with bit r set when the
+incident was present in round r (oldest round = bit 0). convergence()
+reads oscillation (fixed, then reappeared) from the bitsets and fits a
+trend to the per-round incident counts, to tell whether the fix loop is
+still making progress: any steady decrease counts as progress; a flat or
+rising trend, or a count that goes back up as often as it goes down, means
+more rounds are unlikely to help.
+"""
+
+import math
+
+from kantra_diff import DEFAULT_LINE_TOLERANCE, match_fingerprints
+from kantra_model import StringTable
+
+
+DEFAULT_TREND_WINDOW = 5
+
+
+if hasattr(int, 'bit_count'):  # Python 3.10+
+    _popcount = int.bit_count
+else:
+    def _popcount(bits):
+        return bin(bits).count('1')
+
+
+def presence_runs(bits):
+    """Number of runs of consecutive rounds in a presence bitset"""
+    return _popcount(bits & ~(bits << 1))
+
+
+def presence_pattern(bits, rounds):
+    """Render a presence bitset oldest round first, e.g. '1101'"""
+    return ''.join('1' if bits >> r & 1 else '0' for r in range(rounds))
+
+
+class IncidentTracker:
+    """Assigns stable integer ids to incidents across consecutive rounds
+
+    Feed rounds oldest first with add_round(); after each call, ids and
+    streaks describe the incidents of the latest round (parallel to the
+    fingerprints passed in). presence[id] is the presence bitset of an id,
+    latest[id] its most recent fingerprint, and history holds per-round
+    counts ('incidents', 'new', 'reappeared', 'fixed').
+    """
+
+    def __init__(self, line_tolerance=DEFAULT_LINE_TOLERANCE):
+        self.line_tolerance = line_tolerance
+        self.strings = StringTable()
+        self.rounds = 0
+        self.fingerprints = []
+        self.ids = []
+        self.streaks = []
+        self.presence = []
+        self.latest = []
+        self.history = []
+        self._absent = {}  # id -> fingerprint of incidents fixed in an earlier round
+
+    def _match(self, base_fingerprints, fingerprints):
+        matches = match_fingerprints(base_fingerprints, fingerprints, self.line_tolerance)
+        return matches['exact'] + matches['moved'], matches['fixed']
+
+    def add_round(self, incidents):
+        """Add the next round's incidents, (rule_id, file, line_number, snippet_digest) tuples"""
+        string_id = self.strings.id
+        fingerprints = [(string_id(rule_id), string_id(path), line_number, digest)
+                        for rule_id, path, line_number, digest in incidents]
+
+        ids = [-1] * len(fingerprints)
+        streaks = [1] * len(fingerprints)
+        fixed = 0
+        if self.fingerprints:
+            pairs, gone = self._match(self.fingerprints, fingerprints)
+            for base_index, index in pairs:
+                ids[index] = self.ids[base_index]
+                streaks[index] = self.streaks[base_index] + 1
+            for base_index in gone:
+                self._absent[self.ids[base_index]] = self.fingerprints[base_index]
+            fixed = len(gone)
+
+        # unmatched incidents may be earlier ones coming back
+        unmatched = [index for index, incident_id in enumerate(ids) if incident_id < 0]
+        reappeared = 0
+        if unmatched and self._absent:
+            absent_ids = list(self._absent)
+            pairs, _ = self._match([self._absent[i] for i in absent_ids],
+                                   [fingerprints[index] for index in unmatched])
+            for base_index, index in pairs:
+                incident_id = absent_ids[base_index]
+                ids[unmatched[index]] = incident_id
+                del self._absent[incident_id]
+            reappeared = len(pairs)
+
+        new = 0
+        for index, incident_id in enumerate(ids):
+            if incident_id < 0:
+                ids[index] = len(self.presence)
+                self.presence.append(0)
+                self.latest.append(None)
+                new += 1
+
+        bit = 1 << self.rounds
+        for incident_id, fingerprint in zip(ids, fingerprints):
+            self.presence[incident_id] |= bit
+            self.latest[incident_id] = fingerprint
+
+        self.rounds += 1
+        self.fingerprints, self.ids, self.streaks = fingerprints, ids, streaks
+        self.history.append({'incidents': len(fingerprints), 'new': new,
+                             'reappeared': reappeared, 'fixed': fixed})
+
+    def describe(self, incident_id):
+        """Return (rule_id, file, line_number) of an id's most recent fingerprint"""
+        rule_id, path, line_number, _ = self.latest[incident_id]
+        return self.strings[rule_id], self.strings[path], line_number
+
+    def survivors(self, consecutive):
+        """Yield (id, rule_id, file, line_number, streak) of latest-round incidents
+        present in at least the last `consecutive` rounds
+        """
+        strings = self.strings
+        for (rule_id, path, line_number, _), incident_id, streak in zip(
+                self.fingerprints, self.ids, self.streaks):
+            if streak >= consecutive:
+                yield incident_id, strings[rule_id], strings[path], line_number, streak
+
+
+def round_fingerprints(issues):
+    """Return the incident fingerprints of extract_issues_from_file() output"""
+    return [(rule_id, path, line_number, digest)
+            for rule_id, data in issues.items()
+            for path, line_number, digest in data.get('incidents', ())]
+
+
+def stuck_incidents(rounds, consecutive, line_tolerance=DEFAULT_LINE_TOLERANCE):
+    """Find the incidents of the newest round that survived `consecutive` rounds in a row
+
+    Args:
+        rounds: extract_issues_from_file() results, oldest first
+        consecutive: Number of consecutive rounds, ending with the newest
+        line_tolerance: How far an incident's line may move between rounds
+
+    Rounds that could not be read (None) are skipped rather than counted as
+    empty, so they neither break nor extend a streak.
+
+    Returns {rule_id: {'stuck': [(file, line_number, streak)], 'total':
+    incidents of the rule in the newest round}}, for rules with stuck
+    incidents only.
+    """
+    rounds = [issues for issues in rounds if issues is not None]
+    tracker = IncidentTracker(line_tolerance)
+    for issues in rounds:
+        tracker.add_round(round_fingerprints(issues))
+
+    newest = rounds[-1] if rounds else None
+    result = {}
+    for _, rule_id, path, line_number, streak in tracker.survivors(consecutive):
+        entry = result.get(rule_id)
+        if entry is None:
+            entry = result[rule_id] = {
+                'stuck': [], 'total': newest[rule_id]['incident_count'],
+            }
+        entry['stuck'].append((path, line_number, streak))
+    return result
+
+
+def _slope(values):
+    """Least-squares slope of values against 0, 1, 2, ..."""
+    n = len(values)
+    mean_x = (n - 1) / 2
+    mean_y = sum(values) / n
+    variance = sum((x - mean_x) ** 2 for x in range(n))
+    return sum((x - mean_x) * (y - mean_y) for x, y in enumerate(values)) / variance
+
+
+def _count_oscillates(values):
+    """True when a count rises between rounds at least as often as it falls"""
+    rises = sum(b > a for a, b in zip(values, values[1:]))
+    falls = sum(b < a for a, b in zip(values, values[1:]))
+    return rises > 0 and rises >= falls
+
+
+def convergence(rounds, line_tolerance=DEFAULT_LINE_TOLERANCE, window=DEFAULT_TREND_WINDOW):
+    """Estimate whether the fix loop is converging
+
+    Args:
+        rounds: extract_issues_from_file() results, oldest first
+        line_tolerance: How far an incident's line may move between rounds
+        window: Number of most recent rounds the trend is fitted to
+
+    Rounds that could not be read (None) are left out of the history and
+    the trend, so an unreadable newest round never reads as zero incidents.
+
+    Returns a dict with:
+        'unreadable': positions in rounds of the rounds left out
+        'history': per-round counts ('incidents', 'new', 'reappeared', 'fixed')
+            of the readable rounds
+        'oscillating': [(rule_id, file, line_number, pattern, reappearances)]
+            for incidents fixed and then reappearing, most reappearances first
+        'growing': [(rule_id, counts)] for rules whose incident count never
+            drops and ends higher than it started
+        'slope': incidents per round over the last window rounds (None for
+            a single round)
+        'verdict': 'converged', 'converging', 'oscillating', 'stalled',
+            'diverging' or 'insufficient data'
+        'rounds_left': rounds to zero at the current rate, when converging
+        'stop': True when more rounds are unlikely to help: the count
+            reached zero, its slope is not negative, or it oscillates
+    """
+    unreadable = [position for position, issues in enumerate(rounds) if issues is None]
+    rounds = [issues for issues in rounds if issues is not None]
+
+    tracker = IncidentTracker(line_tolerance)
+    rule_counts = {}
+    for position, issues in enumerate(rounds):
+        tracker.add_round(round_fingerprints(issues))
+        for rule_id, data in issues.items():
+            rule_counts.setdefault(rule_id, [0] * len(rounds))[position] = data['incident_count']
+
+    oscillating = []
+    for incident_id, bits in enumerate(tracker.presence):
+        runs = presence_runs(bits)
+        if runs > 1:
+            rule_id, path, line_number = tracker.describe(incident_id)
+            oscillating.append((rule_id, path, line_number,
+                                presence_pattern(bits, tracker.rounds), runs - 1))
+    oscillating.sort(key=lambda item: (-item[4], item[0], item[1] or '', item[2] or 0))
+
+    growing = [(rule_id, counts) for rule_id, counts in rule_counts.items()
+               if len(counts) > 1 and counts[-1] > counts[0]
+               and all(a <= b for a, b in zip(counts, counts[1:]))]
+    growing.sort(key=lambda item: (item[1][0] - item[1][-1], item[0]))
+
+    totals = [entry['incidents'] for entry in tracker.history]
+    recent = totals[-window:]
+    slope = _slope(recent) if len(recent) > 1 else None
+    rounds_left = None
+    if not totals or slope is None:
+        verdict = 'insufficient data'
+    elif totals[-1] == 0:
+        verdict = 'converged'
+    elif slope > 0:
+        verdict = 'diverging'
+    elif slope == 0:
+        verdict = 'stalled'
+    elif _count_oscillates(recent):
+        verdict = 'oscillating'
+    else:
+        verdict = 'converging'
+        rounds_left = math.ceil(totals[-1] / -slope)
+
+    return {
+        'unreadable': unreadable,
+        'history': tracker.history,
+        'oscillating': oscillating,
+        'growing': growing,
+        'slope': slope,
+        'window': len(recent),
+        'verdict': verdict,
+        'rounds_left': rounds_left,
+        'stop': verdict in ('converged', 'oscillating', 'stalled', 'diverging'),
+    }
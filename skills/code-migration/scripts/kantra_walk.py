@@ -0,0 +1,124 @@
+"""
+Kantra Walk
+Discovery of Kantra output.yaml files under a workspace or project directory.
+
+walk_outputs() walks with os.scandir, reusing the file type information of
+each directory listing instead of a stat per entry, and prunes directories
+that never hold Kantra rounds (node_modules, .git, kantra static-report
+trees, ...) before descending into them. Include/exclude globs and a maximum
+depth narrow the walk further.
+
+Migration workspaces keep their outputs at round-*/kantra/output.yaml; when
+the base directory has that layout only those files are checked and nothing
+else is walked.
+"""
+
+import fnmatch
+import os
+
+
+OUTPUT_NAME = 'output.yaml'
+ROUND_PATTERN = 'round-*'
+ROUND_OUTPUT = os.path.join('kantra', OUTPUT_NAME)
+ROUND_OUTPUT_DEPTH = 2  # round-N/kantra/
+
+DEFAULT_SKIP_DIRS = (
+    '.git', '.hg', '.svn', 'node_modules', 'bower_components', '__pycache__',
+    '.venv', 'venv', '.tox', '.cache', 'static-report', 'screenshots',
+)
+
+
+def _matches(relative_path, globs):
+    return any(fnmatch.fnmatchcase(relative_path, pattern) for pattern in globs)
+
+
+def _relative(base_dir, path):
+    return os.path.relpath(path, base_dir).replace(os.sep, '/')
+
+
+def _round_outputs(base_dir, counts, exclude):
+    """Return base_dir/round-*/kantra/output.yaml paths, or None without round dirs"""
+    round_dirs = []
+    other_dirs = 0
+    with os.scandir(base_dir) as entries:
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if fnmatch.fnmatchcase(entry.name, ROUND_PATTERN) and not _matches(
+                    entry.name, exclude):
+                round_dirs.append(entry.path)
+            else:
+                other_dirs += 1
+
+    outputs = [os.path.join(path, ROUND_OUTPUT) for path in round_dirs]
+    outputs = [path for path in outputs if os.path.isfile(path)]
+    if not outputs:
+        return None
+
+    counts['walked'] = 1 + len(round_dirs)
+    counts['skipped'] = other_dirs
+    counts['layout'] = 'rounds'
+    return outputs
+
+
+def walk_outputs(base_dir, include=None, exclude=None, max_depth=None,
+                 skip_dirs=DEFAULT_SKIP_DIRS, full_walk=False):
+    """Find the Kantra output.yaml files under base_dir
+
+    Args:
+        base_dir: Directory to search
+        include: Globs an output's path relative to base_dir must match (any)
+        exclude: Globs of relative paths to leave out; a directory is also
+            excluded when its bare name matches
+        max_depth: Deepest directory level to enter (base_dir is 0,
+            round-N/kantra is 2); None for no limit
+        skip_dirs: Directory names never entered
+        full_walk: Walk the whole tree even when base_dir has the
+            round-*/kantra layout
+
+    Globs use fnmatch, where '*' also matches '/'. Symlinked directories are
+    not followed.
+
+    Returns (paths, counts): the output.yaml paths sorted by path, and a dict
+    with the number of directories 'walked' and 'skipped' (pruned) and the
+    'layout' used ('rounds' or 'walk').
+    """
+    include = list(include or ())
+    exclude = list(exclude or ())
+    skip_dirs = frozenset(skip_dirs or ())
+    counts = {'walked': 0, 'skipped': 0, 'layout': 'walk'}
+
+    paths = None
+    if not full_walk and (max_depth is None or max_depth >= ROUND_OUTPUT_DEPTH):
+        paths = _round_outputs(base_dir, counts, exclude)
+
+    if paths is None:
+        paths = []
+        stack = [(base_dir, 0)]
+        while stack:
+            directory, depth = stack.pop()
+            counts['walked'] += 1
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if (entry.name in skip_dirs
+                            or (max_depth is not None and depth + 1 > max_depth)
+                            or (exclude and (_matches(entry.name, exclude) or _matches(
+                                _relative(base_dir, entry.path), exclude)))):
+                        counts['skipped'] += 1
+                    else:
+                        stack.append((entry.path, depth + 1))
+                elif entry.name == OUTPUT_NAME and entry.is_file():
+                    paths.append(entry.path)
+
+    def selected(path):
+        relative_path = _relative(base_dir, path)
+        if include and not _matches(relative_path, include):
+            return False
+        return not (exclude and _matches(relative_path, exclude))
+
+    return sorted(path for path in paths if selected(path)), counts
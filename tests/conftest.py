@@ -0,0 +1,38 @@
+"""Shared fixtures for the helper script tests
+
+The scripts are plain modules in skills/code-migration/scripts (mirrored into
+skills/code-migration-inline and goose/recipes), so the tests import and run
+them from there.
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+
+import pytest
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS_DIR = os.path.join(REPO_ROOT, 'skills', 'code-migration', 'scripts')
+FIXTURE_OUTPUT = os.path.join(REPO_ROOT, 'experiments', 'migration-skill-quipuchords',
+                              'kantra_output', 'output.yaml')
+
+sys.path.insert(0, SCRIPTS_DIR)
+
+
+def run_script(script, *args, env=None):
+    """Run a helper script with the current interpreter; returns the CompletedProcess"""
+    # never answer from a daemon the developer may have running
+    environment = dict(os.environ, KANTRA_HELPER_SOCKET=os.path.join(REPO_ROOT, 'no-daemon.sock'))
+    environment.update(env or {})
+    return subprocess.run([sys.executable, os.path.join(SCRIPTS_DIR, script), *args],
+                          capture_output=True, text=True, env=environment)
+
+
+@pytest.fixture
+def output_yaml(tmp_path):
+    """A private copy of the quipucords Kantra output (its files appear under two roots)"""
+    path = tmp_path / 'output.yaml'
+    shutil.copyfile(FIXTURE_OUTPUT, path)
+    return str(path)
@@ -0,0 +1,67 @@
+"""The output.yaml.idx sidecar cache"""
+
+import json
+
+from conftest import run_script
+from kantra_loader import load_output
+
+
+def test_analyze_caches_without_messages(output_yaml):
+    output, status = load_output(output_yaml, with_messages=False)
+    assert status == 'written'
+    assert all(incident.message_id == -1 and incident.snippet is None
+               for incident in output.iter_incidents())
+
+    # a query that needs messages re-reads the file and caches the full form,
+    # which then answers both kinds of query
+    output, status = load_output(output_yaml)
+    assert status == 'written'
+    assert any(output.message(incident) for incident in output.iter_incidents())
+    assert load_output(output_yaml, with_messages=False)[1] == 'hit'
+    assert load_output(output_yaml)[1] == 'hit'
+
+
+def test_cached_results_match_uncached(output_yaml):
+    for args in (('analyze', output_yaml), ('file', output_yaml, 'viewLayout.tsx'),
+                 ('analyze', output_yaml)):
+        cached = run_script('kantra_output_helper.py', *args)
+        uncached = run_script('kantra_output_helper.py', *args, '--no-cache')
+        assert cached.returncode == uncached.returncode == 0
+        assert json.loads(cached.stdout) == json.loads(uncached.stdout)
+
+
+def test_hit_skips_hashing_until_mtime_changes(output_yaml, monkeypatch):
+    import os
+
+    import kantra_loader
+
+    load_output(output_yaml, with_messages=False)
+    hashed = []
+    blake2b = kantra_loader.hashlib.blake2b
+    monkeypatch.setattr(kantra_loader.hashlib, 'blake2b',
+                        lambda **kwargs: hashed.append(1) or blake2b(**kwargs))
+
+    assert load_output(output_yaml, with_messages=False)[1] == 'hit'
+    assert hashed == []
+
+    # a touched but unchanged file is hashed once, still hits, and the new
+    # mtime is recorded
+    stat = os.stat(output_yaml)
+    os.utime(output_yaml, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert load_output(output_yaml, with_messages=False)[1] == 'hit'
+    assert load_output(output_yaml, with_messages=False)[1] == 'hit'
+    assert hashed == [1]
+
+
+def test_cache_of_wrong_shape_is_a_miss(output_yaml):
+    import marshal
+
+    from kantra_loader import CACHE_MAGIC, CACHE_VERSION, cache_path, output_fingerprint
+
+    fingerprint = output_fingerprint(output_yaml)
+    for payload in ((), ([('x',)], [], []), ([(0, 0)], [], []), 'junk'):
+        with open(cache_path(output_yaml), 'wb') as f:
+            f.write(CACHE_MAGIC + marshal.dumps((CACHE_VERSION, fingerprint, True, payload)))
+        output, status = load_output(output_yaml)
+        assert status == 'written'
+        assert sum(len(rule.incidents) for rule in output.rules) == 461
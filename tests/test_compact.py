@@ -0,0 +1,34 @@
+"""Compact encoding of results whose files sit under several absolute prefixes"""
+
+import json
+
+from conftest import run_script
+from kantra_compact import path_roots, split_root
+
+
+def test_path_roots_per_leading_component():
+    paths = ['/Users/dev/project/src/a/x.tsx', '/Users/dev/project/src/b/y.tsx',
+             '/opt/input/source/src/a/x.tsx', 'relative.tsx']
+    assert path_roots(paths) == ['', '/Users/dev/project/src/', '/opt/input/source/src/a/']
+    assert split_root('/opt/input/source/src/a/x.tsx', path_roots(paths)) == (2, 'x.tsx')
+    assert split_root('relative.tsx', path_roots(paths)) == (0, 'relative.tsx')
+    assert split_root('/elsewhere/z.tsx', ['/opt/']) == (-1, '/elsewhere/z.tsx')
+
+
+def decoded_files(document):
+    return {short_id: document['roots'][index] + rest if index >= 0 else rest
+            for short_id, (index, rest) in document['files'].items()}
+
+
+def test_analyze_compact_has_a_root_per_prefix(output_yaml):
+    plain = json.loads(run_script('kantra_output_helper.py', 'analyze', output_yaml,
+                                  '--no-cache').stdout)
+    compact = json.loads(run_script('kantra_output_helper.py', 'analyze', output_yaml,
+                                    '--compact', '--no-cache').stdout)
+
+    assert [root.split('/')[1] for root in compact['roots']] == ['Users', 'opt']
+    assert all(root.endswith('/src/') for root in compact['roots'])
+
+    files = decoded_files(compact)
+    assert [[files[short_id] for short_id in issue['files']] for issue in compact['issues']] == \
+        [issue['files'] for issue in plain['issues']]
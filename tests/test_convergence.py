@@ -0,0 +1,53 @@
+"""Convergence verdicts of kantra_tracking.convergence()"""
+
+import pytest
+
+from kantra_tracking import convergence
+
+
+def rounds_with_counts(counts):
+    """Rounds of one rule whose incidents sit on lines 1..count of one file"""
+    return [{'rule': {'incident_count': count,
+                      'incidents': [('src/a.tsx', line, 0) for line in range(1, count + 1)]}}
+            for count in counts]
+
+
+def test_steady_decrease_is_converging():
+    report = convergence(rounds_with_counts([461, 460, 435, 424]))
+    assert report['slope'] == pytest.approx(-13.6)
+    assert report['verdict'] == 'converging'
+    assert report['stop'] is False
+    assert report['rounds_left'] == 32
+
+
+@pytest.mark.parametrize('counts, verdict', [
+    ([100, 100, 100], 'stalled'),
+    ([100, 110, 120], 'diverging'),
+    ([100, 90, 95, 85, 90], 'oscillating'),
+    ([20, 10, 0], 'converged'),
+])
+def test_stop_verdicts(counts, verdict):
+    report = convergence(rounds_with_counts(counts))
+    assert report['verdict'] == verdict
+    assert report['stop'] is True
+
+
+def test_single_bump_keeps_converging():
+    report = convergence(rounds_with_counts([100, 80, 85, 60, 40]))
+    assert report['verdict'] == 'converging'
+    assert report['stop'] is False
+
+
+def test_unreadable_newest_round_is_left_out():
+    rounds = rounds_with_counts([30, 20, 10]) + [None]
+    report = convergence(rounds)
+    assert report['unreadable'] == [3]
+    assert [entry['incidents'] for entry in report['history']] == [30, 20, 10]
+    assert report['verdict'] == 'converging'
+
+
+def test_unreadable_rounds_only():
+    report = convergence([None, None])
+    assert report['unreadable'] == [0, 1]
+    assert report['verdict'] == 'insufficient data'
+    assert report['stop'] is False
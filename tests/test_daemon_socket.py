@@ -0,0 +1,78 @@
+"""The query daemon only listens and answers through sockets private to the user"""
+
+import os
+import socket
+import stat
+import subprocess
+import sys
+import time
+
+import pytest
+
+import kantra_daemon
+from conftest import SCRIPTS_DIR, run_script
+
+
+def test_private_dir_is_created_0700(tmp_path):
+    directory = tmp_path / 'sockets'
+    kantra_daemon._private_dir(str(directory))
+    assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+
+
+def test_private_dir_rejects_shared_directory(tmp_path):
+    directory = tmp_path / 'sockets'
+    directory.mkdir(mode=0o755)
+    directory.chmod(0o755)
+    with pytest.raises(PermissionError):
+        kantra_daemon._private_dir(str(directory))
+
+
+def test_send_request_refuses_socket_of_another_user(tmp_path, monkeypatch, capsys):
+    path = str(tmp_path / 'daemon.sock')
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen()
+        uid = os.getuid()
+        monkeypatch.setattr(kantra_daemon.os, 'getuid', lambda: uid + 1)
+        assert kantra_daemon.send_request({'command': 'ping'}, path) is None
+    assert 'owned by another user' in capsys.readouterr().err
+
+
+def test_default_socket_is_private(tmp_path, output_yaml):
+    env = dict(os.environ, TMPDIR=str(tmp_path))
+    env.pop('KANTRA_HELPER_SOCKET', None)
+    helper = os.path.join(SCRIPTS_DIR, 'kantra_output_helper.py')
+    daemon = subprocess.Popen([sys.executable, helper, 'serve', '--idle-timeout', '30'],
+                              env=env, stderr=subprocess.DEVNULL)
+    try:
+        directory = tmp_path / f'kantra-helper-{os.getuid()}'
+        path = directory / 'daemon.sock'
+        for _ in range(100):
+            if path.exists():
+                break
+            time.sleep(0.05)
+        assert stat.S_IMODE(directory.stat().st_mode) == 0o700
+        assert stat.S_IMODE(path.stat().st_mode) == 0o600
+
+        env_client = {'TMPDIR': str(tmp_path), 'KANTRA_HELPER_SOCKET': ''}
+        answered = run_script('kantra_output_helper.py', 'analyze', output_yaml, '--verbose',
+                              env=env_client)
+        assert answered.returncode == 0
+        assert 'Answered by daemon' in answered.stderr
+    finally:
+        run_script('kantra_output_helper.py', 'serve', '--stop',
+                   env={'TMPDIR': str(tmp_path), 'KANTRA_HELPER_SOCKET': ''})
+        daemon.wait(timeout=10)
+
+
+def test_handler_runs_in_client_cwd_and_restores_daemon_cwd(tmp_path):
+    daemon_cwd = os.getcwd()
+
+    def handler(request):
+        print(os.getcwd())
+        raise SystemExit(3)
+
+    response = kantra_daemon._run_handler(handler, {'cwd': str(tmp_path)})
+    assert response['stdout'].strip() == str(tmp_path)
+    assert response['exit_code'] == 3
+    assert os.getcwd() == daemon_cwd
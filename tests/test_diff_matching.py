@@ -0,0 +1,23 @@
+"""match_fingerprints: exact and drift joins over fingerprint tuples"""
+
+from kantra_diff import match_fingerprints
+
+
+def test_drift_join_takes_nearest_unmatched_line():
+    base = [('r', 'u', line, 7) for line in (10, 10, 12, 20)]
+    current = [('r', 'u', line, 7) for line in (11, 11, 11, 40)]
+    result = match_fingerprints(base, current, line_tolerance=3)
+
+    # ties go to the lower line; matched base incidents are not reused
+    assert result['moved'] == [(1, 0), (0, 1), (2, 2)]
+    assert result['fixed'] == [3]
+    assert result['new'] == [3]
+    assert result['exact'] == []
+
+
+def test_drift_join_scales_to_shifted_files():
+    base = [('r', 'u', 10 * line, 0) for line in range(100000)]
+    current = [('r', 'u', 10 * line + 1, 0) for line in range(100000)]
+    result = match_fingerprints(base, current)
+    assert result['moved'] == [(line, line) for line in range(100000)]
+    assert result['fixed'] == result['new'] == []
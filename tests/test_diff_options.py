@@ -0,0 +1,19 @@
+"""Argument validation of the diff command"""
+
+import pytest
+
+from conftest import run_script
+
+
+@pytest.mark.parametrize('tolerance', ['-1', '-10'])
+def test_negative_line_tolerance_is_rejected(output_yaml, tolerance):
+    result = run_script('kantra_output_helper.py', 'diff', output_yaml, output_yaml,
+                        '--line-tolerance', tolerance)
+    assert result.returncode == 2
+    assert 'argument --line-tolerance: must not be negative' in result.stderr
+
+
+def test_zero_line_tolerance_is_accepted(output_yaml):
+    result = run_script('kantra_output_helper.py', 'diff', output_yaml, output_yaml,
+                        '--line-tolerance', '0', '--no-cache')
+    assert result.returncode == 0, result.stderr
@@ -0,0 +1,49 @@
+"""Resolving a target file against the reported paths"""
+
+import json
+
+from conftest import run_script
+
+
+def file_result(*args):
+    result = run_script('kantra_output_helper.py', *args)
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout)
+
+
+def test_query_normalises_target_like_file(output_yaml):
+    assert run_script('kantra_output_helper.py', 'index', output_yaml).returncode == 0
+
+    for target in ('./src/components/actionMenu/actionMenu.tsx',
+                   '/src/components/actionMenu/actionMenu.tsx'):
+        direct = file_result('file', output_yaml, target, '--all-matches', '--no-cache')
+        indexed = file_result('query', output_yaml, 'file', target, '--all-matches')
+        assert direct['matched_files'] == indexed['matched_files']
+        assert len(direct['matched_files']) == 2
+        assert direct['issues'] == indexed['issues']
+
+
+def test_aliases_of_one_file_are_not_ambiguous(output_yaml):
+    # the fixture reports every file under two prefixes
+    result = file_result('file', output_yaml, 'src/components/actionMenu/actionMenu.tsx',
+                         '--no-cache')
+    assert 'error' not in result
+    assert len(result['matched_files']) == 2
+    assert result['total_distinct_issues'] == 3
+
+    result = file_result('range', output_yaml, 'viewScansList.tsx', '1-1000', '--no-cache')
+    assert 'error' not in result
+    assert len(result['matched_files']) == 2
+    assert result['total_incidents'] > 0
+
+
+def test_ambiguous_target_exits_non_zero(output_yaml):
+    assert run_script('kantra_output_helper.py', 'index', output_yaml).returncode == 0
+
+    for args in (('file', output_yaml, 'List.tsx', '--no-cache'),
+                 ('range', output_yaml, 'List.tsx', '1-1000', '--no-cache'),
+                 ('query', output_yaml, 'file', 'List.tsx')):
+        result = run_script('kantra_output_helper.py', *args)
+        assert result.returncode == 1
+        assert json.loads(result.stdout)['error'] == \
+            'Ambiguous file: List.tsx matches 3 files'
@@ -0,0 +1,49 @@
+"""Label selectors match a rule's own labels and its ruleset's"""
+
+import json
+
+import kantra_loader
+from conftest import FIXTURE_OUTPUT, run_script
+
+
+def labelled_output(path, copies=1):
+    """The fixture with ruleset labels, repeated as copies rulesets, plus one unlabelled ruleset"""
+    with open(FIXTURE_OUTPUT, encoding='utf-8') as f:
+        name_line, rest = f.read().split('\n', 1)
+    rulesets = [
+        f"- name: ruleset-{copy}\n  labels:\n  - konveyor.io/source=pf5\n  - team=ui\n{rest}"
+        for copy in range(copies)
+    ]
+    rulesets.append('- name: other\n  violations:\n    own-rule:\n      labels:\n      - team=api\n'
+                    '      incidents:\n      - uri: file:///src/a.ts\n        lineNumber: 1\n')
+    path.write_text(''.join(rulesets), encoding='utf-8')
+    return str(path)
+
+
+def test_selector_matches_ruleset_labels(tmp_path):
+    output_file = labelled_output(tmp_path / 'output.yaml')
+
+    def rule_ids(selector):
+        result = run_script('kantra_output_helper.py', 'analyze', output_file,
+                            '--labels', selector, '--no-cache')
+        assert result.returncode == 0, result.stderr
+        return {issue['rule_id'] for issue in json.loads(result.stdout)['issues']}
+
+    assert len(rule_ids('team=ui')) == 26
+    assert rule_ids('team=api') == {'own-rule'}
+    assert len(rule_ids('team && konveyor.io/source=pf5')) == 26
+
+
+def test_parallel_shards_keep_ruleset_labels(tmp_path, monkeypatch):
+    output_file = labelled_output(tmp_path / 'output.yaml', copies=3)
+    monkeypatch.setattr(kantra_loader, 'MIN_SHARD_BYTES', 64 << 10)
+    assert kantra_loader.plan_shards(output_file, 2) is not None
+
+    def rules(jobs):
+        return [(rule.ruleset, rule.rule_id, rule.labels)
+                for rule in kantra_loader.read_output(output_file, jobs=jobs).rules]
+
+    serial = rules(1)
+    assert serial == rules(2)
+    assert serial[0][2][-2:] == ('konveyor.io/source=pf5', 'team=ui')
+    assert serial[-1] == ('other', 'own-rule', ('team=api',))
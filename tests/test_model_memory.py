@@ -0,0 +1,58 @@
+"""Memory budget of the interned model on a large synthetic Kantra output"""
+
+import tracemalloc
+
+from kantra_loader import read_output
+
+
+INCIDENTS = 100_000
+RULES = 100
+FILES = 2_000
+
+# The model keeps each URI and message body once and incidents in
+# __slots__ records; the namedtuple records it replaced retained ~34 MiB here.
+RETAINED_BUDGET_MIB = 16
+PEAK_BUDGET_MIB = 24
+
+
+def write_synthetic_output(path):
+    """Write a Kantra output with INCIDENTS incidents spread over RULES rules"""
+    per_rule = INCIDENTS // RULES
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('- name: synthetic/ruleset\n  description: Synthetic ruleset\n  violations:\n')
+        for rule in range(RULES):
+            component = f'Foo{rule % 7}'
+            f.write(f'    synthetic-rule-{rule:05d}:\n'
+                    f'      description: Replace {component}\n'
+                    f'      category: mandatory\n'
+                    f'      labels:\n'
+                    f'      - konveyor.io/source=patternfly-v5\n'
+                    f'      - konveyor.io/target=patternfly-v6\n'
+                    f'      incidents:\n')
+            for number in range(per_rule):
+                line_number = 1 + (rule * 31 + number * 17) % 400
+                uri = f'file:///work/project/src/component{(rule + number) % FILES}.tsx'
+                f.write(f'      - uri: {uri}\n'
+                        f'        message: |\n'
+                        f'          Replace `{component}` with `Bar{rule % 7}`.\n'
+                        f'        codeSnip: "{line_number:3d}  <{component} />\\n"\n'
+                        f'        lineNumber: {line_number}\n'
+                        f'        variables:\n'
+                        f'          matchingText: {component}\n')
+            f.write('      effort: 1\n')
+
+
+def test_read_output_memory(tmp_path):
+    path = tmp_path / 'output.yaml'
+    write_synthetic_output(path)
+
+    tracemalloc.start()
+    try:
+        output = read_output(str(path), with_messages=True)
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert sum(len(rule.incidents) for rule in output.rules) == INCIDENTS
+    assert retained < RETAINED_BUDGET_MIB * 2**20, f'retained {retained / 2**20:.1f} MiB'
+    assert peak < PEAK_BUDGET_MIB * 2**20, f'peak {peak / 2**20:.1f} MiB'
@@ -0,0 +1,48 @@
+"""partition keeps every project file in one package, whichever prefix Kantra used"""
+
+import json
+
+import pytest
+
+from conftest import run_script
+from kantra_index import FileIndex
+from kantra_loader import read_output
+from kantra_partition import file_workloads, partition_workloads
+
+
+def test_aliases_are_one_workload(output_yaml):
+    roots, workloads = file_workloads(FileIndex(read_output(output_yaml)))
+
+    assert [root.split('/')[1] for root in roots] == ['Users', 'opt']
+    files = [workload['file'] for workload in workloads]
+    assert len(files) == len(set(files)) == 48
+
+    scans = next(w for w in workloads if w['file'] == 'views/scans/viewScansList.tsx')
+    assert [path.split('/')[1] for path in scans['paths']] == ['Users', 'opt']
+    assert scans['incidents'] == sum(len(incidents) for _, incidents in scans['rules'])
+
+
+@pytest.mark.parametrize('workers', [2, 3, 7])
+def test_packages_are_file_disjoint_across_roots(output_yaml, workers):
+    result = run_script('kantra_output_helper.py', 'partition', output_yaml,
+                        '--workers', str(workers), '--no-cache')
+    assert result.returncode == 0, result.stderr
+    manifests = [json.loads(line) for line in result.stdout.splitlines()]
+
+    owner = {}
+    for manifest in manifests:
+        for assignment in manifest['assignments']:
+            for path in assignment['paths']:
+                relative = next(path[len(root):] for root in manifest['roots']
+                                if path.startswith(root))
+                assert relative == assignment['file']
+                assert owner.setdefault(relative, manifest['worker']) == manifest['worker']
+    assert len(owner) == 48
+    assert sum(manifest['incidents'] for manifest in manifests) == 461
+
+
+def test_partition_workloads_balances_effort():
+    workloads = [{'file': f'f{i}', 'effort': effort, 'incidents': 1}
+                 for i, effort in enumerate([4, 3, 3, 2])]
+    packages = partition_workloads(workloads, 2)
+    assert sorted(sum(w['effort'] for w in package) for package in packages) == [6, 6]
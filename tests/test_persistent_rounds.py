@@ -0,0 +1,118 @@
+"""persistent_issues_analyzer with unreadable rounds in the workspace"""
+
+import json
+import os
+import shutil
+
+import yaml
+
+from conftest import FIXTURE_OUTPUT, run_script
+
+
+def make_workspace(base, rounds):
+    """Create base/round-N/kantra/output.yaml from rounds, oldest first, one minute apart
+
+    Each round is a path to copy or the bytes to write.
+    """
+    for number, content in enumerate(rounds, 1):
+        directory = base / f'round-{number}' / 'kantra'
+        directory.mkdir(parents=True)
+        path = directory / 'output.yaml'
+        if isinstance(content, bytes):
+            path.write_bytes(content)
+        else:
+            shutil.copyfile(content, path)
+        os.utime(path, (1_700_000_000 + 60 * number,) * 2)
+    return str(base)
+
+
+# a round whose output is cut off mid-write, in a place where it no longer parses
+UNPARSEABLE_ROUND = b'- name: x\n  violations: [\n'
+
+
+def test_unparseable_round_is_reported_on_every_run(tmp_path):
+    base = make_workspace(tmp_path, [FIXTURE_OUTPUT, UNPARSEABLE_ROUND])
+
+    for _ in range(2):  # the second run must parse (and warn about) it again
+        result = run_script('persistent_issues_analyzer.py', base, '--min-occurrences', '1')
+        assert result.returncode == 0, result.stderr
+        assert 'Could not parse round output' in result.stdout
+        assert os.path.join('round-2', 'kantra', 'output.yaml') in result.stdout
+        assert 'Could not be read; left out of the analysis' in result.stdout
+
+        with open(tmp_path / '.kantra-rounds.json', encoding='utf-8') as f:
+            assert list(json.load(f)['rounds']) == ['round-1/kantra/output.yaml']
+
+
+def test_unparseable_round_is_not_cached(tmp_path):
+    base = make_workspace(tmp_path, [FIXTURE_OUTPUT, UNPARSEABLE_ROUND])
+    result = run_script('persistent_issues_analyzer.py', base, '--jobs', '2')
+    assert result.returncode == 0, result.stderr
+    assert 'Could not parse round output' in result.stdout
+
+    with open(tmp_path / '.kantra-rounds.json', encoding='utf-8') as f:
+        assert list(json.load(f)['rounds']) == ['round-1/kantra/output.yaml']
+
+
+def summary_line(stdout):
+    return next(line for line in stdout.splitlines() if line.startswith('SUMMARY:'))
+
+
+def test_unreadable_round_does_not_reset_streaks(tmp_path):
+    clean = make_workspace(tmp_path / 'clean', [FIXTURE_OUTPUT] * 3)
+    broken = make_workspace(tmp_path / 'broken',
+                            [FIXTURE_OUTPUT, FIXTURE_OUTPUT, UNPARSEABLE_ROUND, FIXTURE_OUTPUT])
+
+    expected = run_script('persistent_issues_analyzer.py', clean, '--consecutive', '3')
+    result = run_script('persistent_issues_analyzer.py', broken, '--consecutive', '3')
+    assert result.returncode == 0, result.stderr
+    assert summary_line(result.stdout) == summary_line(expected.stdout)
+    stuck = summary_line(result.stdout).split(', ')[1]
+    assert stuck.endswith(' incidents stuck for 3+ consecutive rounds')
+    assert int(stuck.split()[0]) > 0
+
+
+def test_stuck_line_omitted_for_rules_fixed_in_newest_round(tmp_path):
+    with open(FIXTURE_OUTPUT, encoding='utf-8') as f:
+        rulesets = yaml.safe_load(f)
+    fixed_rule = 'patternfly-v5-to-patternfly-v6-cleanup-00000'
+    for ruleset in rulesets:
+        (ruleset.get('violations') or {}).pop(fixed_rule, None)
+    newest = yaml.safe_dump(rulesets, sort_keys=False).encode('utf-8')
+    base = make_workspace(tmp_path, [FIXTURE_OUTPUT, FIXTURE_OUTPUT, FIXTURE_OUTPUT, newest])
+
+    result = run_script('persistent_issues_analyzer.py', base)
+    assert result.returncode == 0, result.stderr
+    section = result.stdout.split(f'Issue: {fixed_rule}\n', 1)[1].split('\n\n', 1)[0]
+    assert 'Occurrences: 3 times' in section
+    assert 'Stuck incidents:' not in section
+    assert 'Stuck incidents: 0 of 0' not in result.stdout
+
+
+def test_convergence_reports_unreadable_newest_round(tmp_path):
+    base = make_workspace(tmp_path, [FIXTURE_OUTPUT, FIXTURE_OUTPUT, UNPARSEABLE_ROUND])
+    result = run_script('persistent_issues_analyzer.py', base, '--convergence')
+    assert result.returncode == 0, result.stderr
+
+    rows = [line for line in result.stdout.splitlines() if line.startswith('round-')]
+    assert len(rows) == 3
+    assert rows[2].endswith('unreadable, left out')
+    assert rows[1].split()[1] == '461'
+    verdict = next(line for line in result.stdout.splitlines() if line.startswith('VERDICT:'))
+    assert 'converged' not in verdict
+
+
+def test_output_without_trailing_newline_is_read(tmp_path):
+    with open(FIXTURE_OUTPUT, 'rb') as f:
+        unterminated = f.read().rstrip(b'\n')
+    expected = run_script('persistent_issues_analyzer.py',
+                          make_workspace(tmp_path / 'clean', [FIXTURE_OUTPUT] * 2),
+                          '--min-occurrences', '2')
+    base = make_workspace(tmp_path / 'unterminated', [FIXTURE_OUTPUT, unterminated])
+
+    result = run_script('persistent_issues_analyzer.py', base, '--min-occurrences', '2')
+    assert result.returncode == 0, result.stderr
+    assert 'Could not parse round output' not in result.stdout
+    assert summary_line(result.stdout) == summary_line(expected.stdout)
+    with open(tmp_path / 'unterminated' / '.kantra-rounds.json', encoding='utf-8') as f:
+        assert len(json.load(f)['rounds']) == 2
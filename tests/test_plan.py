@@ -0,0 +1,24 @@
+"""plan groups count each file once, whichever prefix Kantra reported it under"""
+
+import json
+
+from conftest import run_script
+
+
+def test_plan_merges_files_reported_under_two_roots(output_yaml):
+    result = run_script('kantra_output_helper.py', 'plan', output_yaml, '--format', 'json',
+                        '--no-cache')
+    assert result.returncode == 0, result.stderr
+    plan = json.loads(result.stdout)
+
+    assert [root.split('/')[1] for root in plan['roots']] == ['Users', 'opt']
+    for group in plan['groups']:
+        assert len(group['files']) == len(set(group['files']))
+        assert all(not path.startswith('/') for path in group['files'])
+        assert max(rule['file_count'] for rule in group['rules']) <= len(group['files'])
+
+    modal = next(group for group in plan['groups']
+                 if any(rule['rule_id'].endswith('components-00020') for rule in group['rules']))
+    assert len(modal['files']) == 9
+    assert modal['shared_files'] == 9
+    assert 'views/scans/viewScansList.tsx' in modal['files']
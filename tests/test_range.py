@@ -0,0 +1,32 @@
+"""The range command reports matched code as Kantra recorded it"""
+
+import json
+
+import yaml
+
+from conftest import run_script
+
+
+def test_range_returns_raw_matching_text(output_yaml):
+    with open(output_yaml, encoding='utf-8') as f:
+        rulesets = yaml.safe_load(f)
+    expected = sorted(
+        (incident['lineNumber'], rule_id, incident['variables']['matchingText'])
+        for ruleset in rulesets
+        for rule_id, violation in (ruleset.get('violations') or {}).items()
+        for incident in violation.get('incidents') or ()
+        if incident['uri'].endswith('/viewLayout/viewLayout.tsx')
+        and isinstance((incident.get('variables') or {}).get('matchingText'), str)
+    )
+    assert any('\n' in text for _, _, text in expected)
+
+    result = run_script('kantra_output_helper.py', 'range', output_yaml, 'viewLayout.tsx',
+                        '1-10000', '--all-matches', '--no-cache')
+    assert result.returncode == 0, result.stderr
+    incidents = json.loads(result.stdout)['incidents']
+
+    assert sorted((incident['line'], incident['rule_id'], incident['matching_text'])
+                  for incident in incidents if 'matching_text' in incident) == expected
+    for incident in incidents:
+        if 'matching_text' in incident:
+            assert incident['snippet'] == ' '.join(incident['matching_text'].split())
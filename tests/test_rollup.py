@@ -0,0 +1,27 @@
+"""rollup counts a file once, whichever prefix Kantra reported it under"""
+
+import json
+
+from conftest import run_script
+from kantra_loader import read_output
+from kantra_rollup import compute_rollup
+
+
+def test_directories_relative_to_each_root(output_yaml):
+    rollup = compute_rollup(read_output(output_yaml))
+
+    assert [root.split('/')[1] for root in rollup['roots']] == ['Users', 'opt']
+    assert rollup['totals'] == {'incidents': 461, 'files': 48, 'effort': 1909}
+    assert rollup['directory']['views/scans']['files'] == 3
+    assert not any(directory.startswith(('Users', 'opt')) for directory in rollup['directory'])
+    top_level = [value['incidents'] for directory, value in rollup['directory'].items()
+                 if '/' not in directory]
+    assert sum(top_level) == 461
+
+
+def test_cached_rollup_matches(output_yaml):
+    first = run_script('kantra_output_helper.py', 'rollup', output_yaml)
+    cached = run_script('kantra_output_helper.py', 'rollup', output_yaml)
+    assert first.returncode == cached.returncode == 0
+    assert json.loads(first.stdout) == json.loads(cached.stdout)
+    assert json.loads(cached.stdout) == compute_rollup(read_output(output_yaml))
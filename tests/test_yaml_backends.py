@@ -0,0 +1,27 @@
+"""The libyaml (CSafeLoader) and pure-Python YAML backends must agree"""
+
+import pytest
+
+from conftest import run_script
+from kantra_loader import get_safe_loader
+
+
+pytestmark = pytest.mark.skipif(
+    get_safe_loader('auto')[1] != 'libyaml', reason='PyYAML was built without libyaml')
+
+
+@pytest.mark.parametrize('args', [
+    ('analyze',),
+    ('analyze', '--format', 'text'),
+    ('file', 'viewLayout.tsx', '--all-matches'),
+    ('file', '/opt/input/source/src/views/scans/viewScansList.tsx'),
+])
+def test_backends_give_identical_output(output_yaml, args):
+    command, *rest = args
+    outputs = []
+    for backend in ('libyaml', 'python'):
+        result = run_script('kantra_output_helper.py', command, output_yaml, *rest,
+                            '--yaml-backend', backend, '--no-cache')
+        assert result.returncode == 0, result.stderr
+        outputs.append(result.stdout)
+    assert outputs[0] == outputs[1]